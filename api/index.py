@@ -1,2 +1,9 @@
 # api/index.py
+import os
+
+# Cold starts skip schema creation and migrations; deploys run app.commands.migrate.
+os.environ.setdefault("SERVERLESS", "true")
+# Instances are frozen between requests, so no job pollers here; run app.commands.scan_worker.
+os.environ.setdefault("SCAN_JOB_WORKERS", "0")
+
 from app.main import app
@@ -1,88 +1,79 @@
 import os
 from datetime import datetime, timedelta
 from typing import Optional
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, status
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from jose import jwt, JWTError
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
-from dotenv import load_dotenv
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.tracing import debug, span
 from app.database.models import User
 from app.database.schemas import UserCreate, UserResponse, Token, TokenData
-from app.database.database import SessionLocal
-
-load_dotenv()
+from app.database.database import get_db
+from app.services.principal_cache import Principal, principal_cache
+from app.services import password_hasher
 
 SECRET_KEY = os.getenv("SECRET_KEY")  # Change this to your production secret key!
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 router = APIRouter(tags=["Auth"])
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # OAuth2 scheme for token extraction
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
+# bcrypt runs in the dedicated password hashing pool, never on the event loop or request threads.
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    with span("auth.verify_password"):
+        return await password_hasher.verify_password(plain_password, hashed_password)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    print("Debug: Verifying password")
-    return pwd_context.verify(plain_password, hashed_password)
 
-
-def get_password_hash(password: str) -> str:
-    print("Debug: Getting password hash")
-    return pwd_context.hash(password)
+async def get_password_hash(password: str) -> str:
+    with span("auth.hash_password"):
+        return await password_hasher.hash_password(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-    print("Debug: Creating access token")
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
+    from jose import jwt  # Deferred, as python-jose and its crypto backend are slow to import.
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def authenticate_user(db: Session, email: str, password: str):
-    print("Debug: Authenticating user")
-    user = db.query(User).filter(User.email == email).first()
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    user = await db.scalar(select(User).where(User.email == email))
     if not user:
         return False
-    if not verify_password(password, user.password):
+    if not await verify_password(password, user.password):
         return False
+    # Upgrade hashes made with an older cost factor while we have the plain password.
+    if password_hasher.needs_rehash(user.password):
+        user.password = await get_password_hash(password)
+        await db.commit()
     return user
 
 
 @router.post("/signup", response_model=UserResponse, tags=["Auth"])
-def signup(user: UserCreate, db: Session = Depends(get_db)):
-    print("Debug: Signup")
-    db_user = db.query(User).filter(User.email == user.email).first()
+async def signup(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    db_user = await db.scalar(select(User).where(User.email == user.email))
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash(user.password)
     new_user = User(email=user.email, password=hashed_password)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
     return new_user
 
 
 @router.post("/login", response_model=Token, tags=["Auth"])
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    print("Debug: login")
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -97,13 +88,29 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
 
 
 # Dependency to get the current user from the token
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    print("Debug: Getting current user")
+async def get_current_user(
+    request: Request, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)
+) -> Principal:
+    """
+    Resolve the bearer token to a Principal. The result is kept on the request, so
+    router-level and endpoint-level dependencies share it, and in the principal cache,
+    so repeat requests with the same token skip the JWT decode and the users lookup.
+    """
+    principal = getattr(request.state, "principal", None)
+    if principal is not None:
+        return principal
+    principal = principal_cache.get(token)
+    if principal is not None:
+        request.state.principal = principal
+        return principal
+
+    debug("auth.principal_cache_miss")
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    from jose import JWTError, jwt
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
@@ -112,13 +119,16 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         token_data = TokenData(email=email)
     except JWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.email == token_data.email).first()
+    user = await db.scalar(select(User).where(User.email == token_data.email))
     if user is None:
         raise credentials_exception
-    return user
+    principal = Principal(id=user.id, email=user.email)
+    principal_cache.set(token, principal, token_exp=payload.get("exp"))
+    request.state.principal = principal
+    return principal
 
 
 # /me endpoint to return the current user's information
 @router.get("/me", response_model=UserResponse, tags=["Auth"])
-def read_users_me(current_user: User = Depends(get_current_user)):
+def read_users_me(current_user: Principal = Depends(get_current_user)):
     return current_user
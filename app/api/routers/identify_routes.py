@@ -1,49 +1,51 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
 from typing import List, Annotated
-import requests
-import os
-from dotenv import load_dotenv
-from io import BytesIO
+import httpx
 from app.api.routers.auth import get_current_user
-
-load_dotenv()
+from app.core.tracing import debug
+from app.services.plantnet_client import plantnet_client
+from app.services.identification_cache import identification_cache, make_cache_key
+from app.services.resilience import CircuitOpenError, unavailable
+from app.services.uploads import ingest_uploads, close_uploads, PLANTNET_IMAGE_TYPES
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
-API_KEY = os.getenv("PLANETNET_API_KEY")
-PROJECT = "all"
-API_ENDPOINT = f"https://my-api.plantnet.org/v2/identify/{PROJECT}?api-key={API_KEY}"
 
-# Maximum allowed file size in bytes (50 MB)
-MAX_FILE_SIZE = 52428800
 
-@router.post("/", tags=["Identify"])
-async def identify_plant(
-        organs: Annotated[List[str], Form(...)],
-        images: Annotated[List[UploadFile], File(...)]
-):
-    print("Debug: Identifying plant")
-    if not images:
-        raise HTTPException(status_code=400, detail="No images provided")
-
-    files = []
-    for image in images:
-        # Validate that the file type is acceptable.
-        if image.content_type not in ("image/jpeg", "image/png"):
-            raise HTTPException(status_code=400, detail="Unsupported file type. Only JPEG and PNG are allowed.")
+async def _read_images(images: list) -> list:
+    return [(image.filename, await image.read(), image.content_type) for image in images]
 
-        contents = await image.read()
 
-        # Check that the file does not exceed the maximum allowed size.
-        if len(contents) > MAX_FILE_SIZE:
-            raise HTTPException(status_code=400, detail="File size exceeds allowed limit of 50MB.")
+async def _query_plantnet(files: list, organs: List[str]) -> dict:
+    # Identical images + organs give identical answers: serve repeats from the cache.
+    cache_key = make_cache_key([contents for _, contents, _ in files], organs)
+    cached = await identification_cache.get(cache_key)
+    if cached is not None:
+        debug("plantnet.cache_hit")
+        return cached
 
-        # Wrap the bytes in a BytesIO object so requests can correctly encode it.
-        files.append(('images', (image.filename, BytesIO(contents), image.content_type)))
-
-    data = [('organs', organ) for organ in organs]
+    try:
+        response = await plantnet_client.identify(files, organs)
+        failure = None
+        if response.status_code == 429 or response.status_code >= 500:
+            failure = HTTPException(
+                status_code=response.status_code,
+                detail=f"PlantNet API error {response.status_code}: {response.text}"
+            )
+    except CircuitOpenError as e:
+        failure = unavailable(e)
+    except httpx.TimeoutException as e:
+        failure = HTTPException(status_code=504, detail=f"PlantNet timed out: {str(e) or type(e).__name__}")
+    except httpx.HTTPError as e:
+        failure = HTTPException(status_code=500, detail=f"Request error: {str(e)}")
+    if failure is not None:
+        # PlantNet is down or overloaded: an expired answer beats no answer.
+        stale = identification_cache.get_stale(cache_key)
+        if stale is None:
+            raise failure
+        debug("plantnet.stale_cache_hit")
+        return stale
 
     try:
-        response = requests.post(API_ENDPOINT, files=files, data=data)
         if response.status_code != 200:
             error_detail = f"PlantNet API error {response.status_code}: {response.text}"
             raise HTTPException(status_code=response.status_code, detail=error_detail)
@@ -51,64 +53,60 @@ async def identify_plant(
         result = response.json()
         if not result.get('results'):
             raise HTTPException(status_code=404, detail="No identification results found.")
+        await identification_cache.set(cache_key, result)
+        return result
 
-        top_result = result['results'][0]
-        species_name = top_result['species']['scientificNameWithoutAuthor']
-        family_name = top_result['species']['family']['scientificNameWithoutAuthor']
-        common_names = top_result['species']['commonNames']
-
-
-        return {
-            "species_name": species_name,
-            "family_name": family_name,
-            "common_names": common_names
-        }
-
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Request error: {str(e)}")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
 
 
-@router.post("/all-info", tags=["Identify"])
-async def get_all_info(
-        organs: Annotated[List[str], Form(...)],
-        images: Annotated[List[UploadFile], File(...)]
-):
-    print("Debug: Getting all plant info")
-    if not images:
-        raise HTTPException(status_code=400, detail="No images provided")
+async def identify_images(organs: List[str], images: list) -> dict:
+    """
+    Identify already validated images (spooled uploads or converted JPEGs)
+    and return the top PlantNet match.
+    """
+    files = await _read_images(images)
+    result = await _query_plantnet(files, organs)
 
-    files = []
-    for image in images:
-        # Validate that the file type is acceptable.
-        if image.content_type not in ("image/jpeg", "image/png"):
-            raise HTTPException(status_code=400, detail="Unsupported file type. Only JPEG and PNG are allowed.")
+    top_result = result['results'][0]
+    species_name = top_result['species']['scientificNameWithoutAuthor']
+    family_name = top_result['species']['family']['scientificNameWithoutAuthor']
+    common_names = top_result['species']['commonNames']
 
-        contents = await image.read()
+    return {
+        "species_name": species_name,
+        "family_name": family_name,
+        "common_names": common_names
+    }
 
-        # Check that the file does not exceed the maximum allowed size.
-        if len(contents) > MAX_FILE_SIZE:
-            raise HTTPException(status_code=400, detail="File size exceeds allowed limit of 50MB.")
 
-        # Wrap the bytes in a BytesIO object so requests can correctly encode it.
-        files.append(('images', (image.filename, BytesIO(contents), image.content_type)))
+@router.post("/", tags=["Identify"])
+async def identify_plant(
+        organs: Annotated[List[str], Form(...)],
+        images: Annotated[List[UploadFile], File(...)]
+):
+    uploads = await ingest_uploads(images, allowed_types=PLANTNET_IMAGE_TYPES)
+    try:
+        return await identify_images(organs, uploads)
+    finally:
+        close_uploads(uploads)
 
-    data = [('organs', organ) for organ in organs]
 
+@router.post("/all-info", tags=["Identify"])
+async def get_all_info(
+        organs: Annotated[List[str], Form(...)],
+        images: Annotated[List[UploadFile], File(...)]
+):
+    uploads = await ingest_uploads(images, allowed_types=PLANTNET_IMAGE_TYPES)
     try:
-        response = requests.post(API_ENDPOINT, files=files, data=data)
-        if response.status_code != 200:
-            error_detail = f"PlantNet API error {response.status_code}: {response.text}"
-            raise HTTPException(status_code=response.status_code, detail=error_detail)
+        files = await _read_images(uploads)
+        return await _query_plantnet(files, organs)
+    finally:
+        close_uploads(uploads)
 
-        all_result = response.json()
-        if not all_result.get('results'):
-            raise HTTPException(status_code=404, detail="No identification results found.")
-
-        return all_result
 
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=500, detail=f"Request error: {str(e)}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
+@router.get("/cache/stats", tags=["Identify"])
+def identification_cache_stats():
+    return identification_cache.stats()
@@ -1,72 +1,75 @@
 # app/api/routers/image_convert_routes.py
 
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from typing import List
+import asyncio
+from typing import List, Optional
 from io import BytesIO
-from PIL import Image
 from app.api.routers.auth import get_current_user
+from app.core.tracing import debug
+from app.services.image_engine import convert_image
+from app.services.uploads import ingest_uploads, close_uploads
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
 class ConvertedImage:
-    print("Debug: Converting image class")
     """
     A minimal stand-in for UploadFile that holds JPEG bytes,
     plus filename and content_type attributes.
     """
-    def __init__(self, filename: str, data: bytes, content_type: str):
+    def __init__(self, filename: str, data: bytes, content_type: str, timings: Optional[dict] = None):
         self.filename = filename
         self.content_type = content_type
         self._data = data
+        self.timings = timings or {}
 
     async def read(self) -> bytes:
         return self._data
 
+    @property
+    def data(self) -> bytes:
+        return self._data
+
     @property
     def file(self) -> BytesIO:
         return BytesIO(self._data)
 
 
+async def _convert_one(image: UploadFile) -> ConvertedImage:
+    raw = await image.read()
+    try:
+        jpeg_bytes, timings = await convert_image(raw)
+    except Exception as e:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Failed to convert image {image.filename}: {e}"
+        )
+    new_name = f"{image.filename.rsplit('.', 1)[0]}.jpg"
+    return ConvertedImage(new_name, jpeg_bytes, "image/jpeg", timings)
+
+
 async def convert_images_for_plantnet(images: List[UploadFile]) -> List[ConvertedImage]:
     """
     Convert uploaded images to JPEG/RGB format as required by PlantNet.
-    Returns a list of ConvertedImage instances.
+    Images are decoded, downscaled and re-encoded in parallel in the image worker pool.
+    Returns a list of ConvertedImage instances, in upload order.
     """
-    converted_images: List[ConvertedImage] = []
-    print("Debug: Converting img for plantnet")
-
-    for image in images:
-        raw = await image.read()
-        try:
-            img = Image.open(BytesIO(raw))
-            if img.mode != "RGB":
-                img = img.convert("RGB")
-
-            buf = BytesIO()
-            img.save(buf, format="JPEG")
-            jpeg_bytes = buf.getvalue()
-            new_name = f"{image.filename.rsplit('.', 1)[0]}.jpg"
-
-            converted_images.append(
-                ConvertedImage(new_name, jpeg_bytes, "image/jpeg")
-            )
-
-        except Exception as e:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Failed to convert image {image.filename}: {e}"
-            )
-
-    return converted_images
+    debug("image.convert", images=len(images))
+    return list(await asyncio.gather(*(_convert_one(image) for image in images)))
 
 
 @router.post("/", summary="Convert images for PlantNet API")
 async def convert_route(
     images: List[UploadFile] = File(...)
 ):
-    print("Debug: Convert route")
     """
     Endpoint to convert one or more images into PlantNet-compatible JPEGs.
     """
-    out = await convert_images_for_plantnet(images)
-    return {"converted_filenames": [img.filename for img in out]}
+    uploads = await ingest_uploads(images)
+    try:
+        out = await convert_images_for_plantnet(uploads)
+    finally:
+        close_uploads(uploads)
+    return {
+        "converted_filenames": [img.filename for img in out],
+        "timings": [{"filename": img.filename, **img.timings} for img in out],
+    }
@@ -0,0 +1,61 @@
+# app/api/routers/image_routes.py
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.routers.auth import get_current_user
+from app.database.database import get_db
+from app.database.operations import owns_image
+from app.services.image_store import image_store, is_valid_key
+from app.services.thumbnails import THUMBNAIL_FORMATS, THUMBNAIL_WIDTHS, get_thumbnail
+
+router = APIRouter(dependencies=[Depends(get_current_user)])
+
+# Keys are content hashes: a URL's bytes never change. Private, as they are users' photos.
+IMAGE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+@router.get("/{key}", tags=["Images"], summary="A stored sighting photo, or a thumbnail of it")
+async def read_image(
+    key: str,
+    request: Request,
+    w: Optional[int] = Query(None, description=f"Thumbnail width in pixels, one of {list(THUMBNAIL_WIDTHS)}"),
+    format: Literal["jpeg", "webp"] = Query("jpeg", description="Thumbnail format (with `w`)"),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Without `w`, the original JPEG, served straight from disk (with Range support) when
+    possible. With `w`, a thumbnail rendered on first request and cached on disk.
+    """
+    if not is_valid_key(key):
+        raise HTTPException(status_code=404, detail="Image not found")
+    if w is not None and w not in THUMBNAIL_WIDTHS:
+        raise HTTPException(status_code=400, detail=f"w must be one of {list(THUMBNAIL_WIDTHS)}")
+    # Only the uploader may read a key: knowing it (e.g. from another user's sighting) is not enough.
+    if not await owns_image(db, current_user.id, key):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    variant = key if w is None else f"{key}-{w}.{format}"
+    headers = {"Cache-Control": IMAGE_CACHE_CONTROL, "ETag": f'"{variant}"'}
+    if request.headers.get("if-none-match", "").strip().removeprefix("W/") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+
+    if w is not None:
+        data = await get_thumbnail(key, w, format)
+        if data is None:
+            raise HTTPException(status_code=404, detail="Image not found")
+        return Response(data, media_type=THUMBNAIL_FORMATS[format][1], headers=headers)
+
+    path = image_store.local_path(key)
+    if path is not None:
+        if not await image_store.exists(key):
+            raise HTTPException(status_code=404, detail="Image not found")
+        return FileResponse(path, media_type="image/jpeg", headers=headers)
+
+    data = await image_store.get(key)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return Response(data, media_type="image/jpeg", headers=headers)
@@ -1,90 +1,170 @@
 # app/api/routers/plant_routes.py
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from dotenv import load_dotenv
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
 
-from app.database.models import Plant
-from app.database.database import SessionLocal
-from app.database.schemas import PlantCreate, PlantResponse
+from app.database.models import Plant, PlantCommonName
+from app.database.database import get_db
+from app.database.schemas import PlantCreate, PlantResponse, PlantSearchResult
+from app.database.pagination import paginate, MAX_PAGE_SIZE
+from app.database.search import search_plants
+from app.database.bulk import CatalogImport, aiter_lines, iter_export
+from app.database.operations import normalize_edible_parts, edible_part_filter
+from app.services.http_cache import conditional_get
+from app.services.plant_cache import plant_cache
 from app.api.routers.auth import get_current_user
 
-load_dotenv()
-
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
-def get_db():
-    print("Debug: Getting DB")
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# One instance, so read_plant can also take its value (the catalog version behind the ETag).
+plants_etag = conditional_get("plants")
 
 # CREATE plant manually
 @router.post("/", response_model=PlantResponse, tags=["Plants"])
-def create_plant(plant: PlantCreate, db: Session = Depends(get_db)):
-    print("Debug: Creating plant")
-    db_plant = db.query(Plant).filter(Plant.scientific_name == plant.scientific_name).first()
+async def create_plant(plant: PlantCreate, db: AsyncSession = Depends(get_db)):
+    db_plant = await db.scalar(select(Plant).where(Plant.scientific_name == plant.scientific_name))
     if db_plant:
         raise HTTPException(status_code=400, detail="Plant already registered")
     new_plant = Plant(
         scientific_name=plant.scientific_name,
         family=plant.family,
         is_edible=plant.is_edible,
-        edible_parts=",".join(plant.edible_parts) if plant.edible_parts else None,
+        edible_parts=normalize_edible_parts(plant.edible_parts),
         safety=plant.safety
     )
     db.add(new_plant)
-    db.commit()
-    db.refresh(new_plant)
-    if new_plant.edible_parts:
-        new_plant.edible_parts = new_plant.edible_parts.split(",")
+    await db.commit()
+    await plant_cache.invalidate(new_plant.id, new_plant.scientific_name)
     return new_plant
 
-# READ all plants
-@router.get("/", response_model=List[PlantResponse], tags=["Plants"])
-def read_plants(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    print("Debug: Reading plants")
-    plants = db.query(Plant).offset(skip).limit(limit).all()
-    for plant in plants:
-        plant.edible_parts = plant.edible_parts.split(",") if plant.edible_parts else []
-    return plants
+# READ all plants, optionally filtered by edible part, edibility and family
+@router.get("/", response_model=List[PlantResponse], tags=["Plants"], dependencies=[Depends(plants_etag)])
+async def read_plants(
+    response: Response,
+    edible_part: Optional[str] = None,
+    is_edible: Optional[bool] = None,
+    family: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1),
+    sort: Literal["id", "created_at"] = "id",
+    count: Optional[Literal["exact", "estimated"]] = None,
+    skip: int = Query(0, ge=0, deprecated=True),
+    db: AsyncSession = Depends(get_db)
+):
+    query = select(Plant)
+    # Each filter is served by an index: GIN on edible_parts, b-tree on is_edible and family.
+    if edible_part:
+        query = query.where(edible_part_filter(db, edible_part))
+    if is_edible is not None:
+        query = query.where(Plant.is_edible == is_edible)
+    if family:
+        query = query.where(Plant.family == family)
+    return await paginate(
+        db, query, response,
+        id_column=Plant.id, sort=sort, sort_column=getattr(Plant, sort),
+        cursor=cursor, limit=limit, count=count, skip=skip
+    )
+
+# EXPORT the whole catalog, streamed from a server-side cursor
+@router.get("/export", tags=["Plants"])
+def export_plants(format: Literal["ndjson", "csv"] = "ndjson"):
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        iter_export(format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="plants.{format}"'},
+    )
+
+# IMPORT plants from a streamed NDJSON/CSV body, upserting on scientific_name
+@router.post("/import", tags=["Plants"])
+async def import_plants(
+    request: Request,
+    format: Optional[Literal["ndjson", "csv"]] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    if format is None:
+        format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    importer = CatalogImport(db, format)
+    try:
+        async for line in aiter_lines(request.stream()):
+            if importer.feed(line):
+                await importer.flush()
+        importer.finish()
+        await importer.flush()
+    finally:
+        if importer.inserted or importer.updated:
+            await plant_cache.invalidate_all()
+    return importer.result()
+
+# SEARCH plants by scientific name, family or common name (typo tolerant, prefix aware)
+@router.get("/search", response_model=List[PlantSearchResult], tags=["Plants"])
+async def search_plants_route(
+    q: str = Query(..., min_length=2, max_length=100),
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db)
+):
+    ranked = await search_plants(db, q, limit)
+    if not ranked:
+        return []
+    ids = [plant_id for plant_id, _ in ranked]
+    plants = {plant.id: plant for plant in await db.scalars(select(Plant).where(Plant.id.in_(ids)))}
+    names = {}
+    for plant_id, name in await db.execute(
+        select(PlantCommonName.plant_id, PlantCommonName.name)
+        .where(PlantCommonName.plant_id.in_(ids))
+        .order_by(PlantCommonName.id)
+    ):
+        names.setdefault(plant_id, []).append(name)
+    return [
+        PlantSearchResult(
+            **PlantResponse.model_validate(plants[plant_id]).model_dump(),
+            score=round(score, 4),
+            common_names=names.get(plant_id, []),
+        )
+        for plant_id, score in ranked
+        if plant_id in plants
+    ]
 
 # READ a single plant by ID
 @router.get("/{plant_id}", response_model=PlantResponse, tags=["Plants"])
-def read_plant(plant_id: int, db: Session = Depends(get_db)):
-    print("Debug: Reading plants by id")
-    plant = db.query(Plant).filter(Plant.id == plant_id).first()
+async def read_plant(
+    plant_id: int,
+    db: AsyncSession = Depends(get_db),
+    catalog_version: Optional[int] = Depends(plants_etag)
+):
+    # A cached copy older than the ETag's version would be sent, and then kept, under the new tag.
+    plant = await plant_cache.get_by_id(db, plant_id, version=catalog_version)
     if not plant:
         raise HTTPException(status_code=404, detail="Plant not found")
-    plant.edible_parts = plant.edible_parts.split(",") if plant.edible_parts else []
     return plant
 
 # UPDATE plant
 @router.put("/{plant_id}", response_model=PlantResponse, tags=["Plants"])
-def update_plant(plant_id: int, plant: PlantCreate, db: Session = Depends(get_db)):
-    print("Debug: Updating plant")
-    db_plant = db.query(Plant).filter(Plant.id == plant_id).first()
+async def update_plant(plant_id: int, plant: PlantCreate, db: AsyncSession = Depends(get_db)):
+    db_plant = await db.get(Plant, plant_id)
     if not db_plant:
         raise HTTPException(status_code=404, detail="Plant not found")
+    old_name = db_plant.scientific_name
     db_plant.scientific_name = plant.scientific_name
     db_plant.family = plant.family
     db_plant.is_edible = plant.is_edible
-    db_plant.edible_parts = ",".join(plant.edible_parts) if plant.edible_parts else None
+    db_plant.edible_parts = normalize_edible_parts(plant.edible_parts)
     db_plant.safety = plant.safety
-    db.commit()
-    db.refresh(db_plant)
-    db_plant.edible_parts = db_plant.edible_parts.split(",") if db_plant.edible_parts else []
+    await db.commit()
+    await plant_cache.invalidate(plant_id, old_name)
+    if db_plant.scientific_name != old_name:
+        await plant_cache.invalidate(scientific_name=db_plant.scientific_name)
     return db_plant
 
 # DELETE plant
 @router.delete("/{plant_id}", tags=["Plants"])
-def delete_plant(plant_id: int, db: Session = Depends(get_db)):
-    print("Debug: Deleting plant")
-    plant = db.query(Plant).filter(Plant.id == plant_id).first()
+async def delete_plant(plant_id: int, db: AsyncSession = Depends(get_db)):
+    plant = await db.get(Plant, plant_id)
     if not plant:
         raise HTTPException(status_code=404, detail="Plant not found")
-    db.delete(plant)
-    db.commit()
+    await db.delete(plant)
+    await db.commit()
+    await plant_cache.invalidate(plant_id, plant.scientific_name)
     return {"detail": "Plant deleted successfully"}
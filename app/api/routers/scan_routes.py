@@ -1,42 +1,51 @@
-from doctest import debug
-
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
-from fastapi.concurrency import run_in_threadpool
-from typing import List, Annotated
-from sqlalchemy.orm import Session
+import asyncio
+import os
+from contextlib import contextmanager
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Query
+from fastapi.responses import JSONResponse
+from typing import Dict, List, Annotated, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from app.api.routers.auth import get_current_user
-from app.api.routers.image_convert_routes import convert_images_for_plantnet
-from app.api.routers.identify_routes import identify_plant
-from app.database.database import SessionLocal
-from app.database.operations import get_plant_by_scientific_name, add_plant
-from app.services.ai_service import get_detailed_plant_info
-from app.database.models import UserPlant
+from app.core.metrics import SCAN_STAGE_DURATION
+from app.core.tracing import debug, span
+from app.api.routers.image_convert_routes import ConvertedImage, convert_images_for_plantnet
+from app.api.routers.identify_routes import identify_images
+from app.database.database import AsyncSessionLocal, get_db
+from app.database.operations import get_plant_by_scientific_name, add_common_names, record_image_uploads
+from app.services.enrichment import enrich_plant
+from app.services.image_store import image_store
+from app.services.resilience import CircuitOpenError, unavailable
+from app.services.uploads import ingest_uploads, close_uploads
+from app.services.scan_jobs import enqueue_scan_job, get_scan_job
+from app.services.plant_cache import plant_cache, PlantSnapshot
+from app.database.models import ScanJob, UserPlant
+from app.database.schemas import ScanJobResponse
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
-def get_db():
-    print("Debug: Getting DB")
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Batch scans: specimens processed at once, and the largest batch accepted.
+SCAN_BATCH_CONCURRENCY = int(os.getenv("SCAN_BATCH_CONCURRENCY", "4"))
+SCAN_BATCH_MAX_SPECIMENS = int(os.getenv("SCAN_BATCH_MAX_SPECIMENS", "50"))
 
-@router.post("/", tags=["Scan"], summary="Scan images, identify plant, enrich and save")
-async def scan_and_chain(
-    organs: Annotated[List[str], Form(...)],
-    images: Annotated[List[UploadFile], File(...)],
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
-):
-    print("Debug: Scan and chain")
-    # Step 0: Convert images into PlantNet-compatible JPEGs
-    converted_images = await convert_images_for_plantnet(images)
 
+@contextmanager
+def scan_stage(stage: str):
+    """Time a scan stage for /metrics and trace it as a span."""
+    with SCAN_STAGE_DURATION.time(stage), span(f"scan.{stage}"):
+        yield
+
+
+async def identify_and_enrich(organs: List[str], converted_images: list, db: AsyncSession):
+    """
+    Steps 1-4 of a scan: identify, look up and (if new) enrich the plant.
+    Returns a snapshot of the stored plant and the common names reported by PlantNet.
+    """
     # Step 1: Identify the plant using the PlantNet API.
-    plant_info = await identify_plant(organs, converted_images)
-    print(f"Plant info: {plant_info}")
+    with scan_stage("identify"):
+        plant_info = await identify_images(organs, converted_images)
+    debug("scan.identified", species=plant_info.get("species_name"), family=plant_info.get("family_name"))
     scientific_name = plant_info.get("species_name")
     family_name = plant_info.get("family_name")
     common_names = plant_info.get("common_names")
@@ -47,49 +56,35 @@ async def scan_and_chain(
         )
 
     # Step 2: Look up the plant in the database.
-    print("Debug: Looking for plant in DB")
-    plant = get_plant_by_scientific_name(db, scientific_name)
-    if plant:
-        edible_parts_list = plant.edible_parts.split(",") if plant.edible_parts else []
-    else:
-        # Step 3: Get detailed plant info via OpenAI
-        ai_response = await run_in_threadpool(get_detailed_plant_info, scientific_name)
-        print(f"Debug - Ai response: {ai_response}")
-        is_edible = ai_response.get("edible")
-        print(f"Debug: is edible = {is_edible}")
-        edible_parts = ai_response.get("edible_parts")  # May be None or list or comma string
-        print(f"Debug: Edible parts = {edible_parts}")
-        edible_parts_list = (
-            edible_parts if isinstance(edible_parts, list)
-            else edible_parts.split(",") if edible_parts
-            else []
-        )
-        print(f"Debug: Edible parts list = {edible_parts_list}")
-        safety = ai_response.get("safety")
-
-        # Step 4: Save the new plant in the database.
-        print(f"Debug: Creating plant")
-        plant = add_plant(
-            db=db,
-            scientific_name=scientific_name,
-            family=family_name,
-            is_edible=is_edible,
-            edible_parts=edible_parts,
-            safety=safety
-        )
-        print(f"Debug: plant created = {plant}")
+    with scan_stage("lookup"):
+        plant = await get_plant_by_scientific_name(db, scientific_name)
+    if not plant:
+        # Step 3 + 4: Get detailed plant info via OpenAI and save the new plant.
+        # Concurrent scans of the same new species share one enrichment call.
+        with scan_stage("enrich"):
+            try:
+                plant_id = await enrich_plant(scientific_name, family_name)
+            except CircuitOpenError as e:
+                raise unavailable(e)
+            except Exception as e:
+                raise HTTPException(status_code=502, detail=f"Plant enrichment failed: {e}")
+            plant = await plant_cache.get_by_id(db, plant_id)
 
-    # Step 5: Associate the plant with the current user.
-    print(f"Debug: Link plant to user")
-    user_plant = UserPlant(user_id=current_user.id, plant_id=plant.id)
-    print(f"Debug: link = {user_plant}")
-    print(f"Debug: Adding to db")
-    db.add(user_plant)
-    db.commit()
-    print(f"Debug: Added to db")
+    # Keep PlantNet's common names so the catalog can be searched by them.
+    # Its own stage: "persist" is the caller's sighting write, observed once per scan.
+    with scan_stage("names"):
+        await add_common_names(db, plant.id, common_names)
+    return plant, common_names
 
-    # Step 6: Build and return the response.
-    response_data = {
+
+async def store_images(converted_images: list) -> List[str]:
+    """Keep every photo of a scan; returns their image-store keys in upload order."""
+    return list(await asyncio.gather(*(image_store.put(image.data) for image in converted_images)))
+
+
+def build_scan_response(plant: PlantSnapshot, common_names) -> dict:
+    edible_parts_list = list(plant.edible_parts)
+    return {
         "plant": {
             "Scientific name: ": plant.scientific_name,
             "Family name: ": plant.family,
@@ -100,5 +95,150 @@ async def scan_and_chain(
             "Created at: ": plant.created_at.isoformat()
         }
     }
-    print(f"Debug: DB response = {response_data}")
+
+
+@router.post("/", tags=["Scan"], summary="Scan images, identify plant, enrich and save")
+async def scan_and_chain(
+    organs: Annotated[List[str], Form(...)],
+    images: Annotated[List[UploadFile], File(...)],
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user),
+    run_async: bool = Query(False, alias="async", description="Queue the scan and return a job id")
+):
+    # Step 0: Stream the uploads in and convert them into PlantNet-compatible JPEGs
+    uploads = await ingest_uploads(images)
+    try:
+        with scan_stage("convert"):
+            converted_images = await convert_images_for_plantnet(uploads)
+    finally:
+        close_uploads(uploads)
+
+    if run_async:
+        # Queue the rest of the pipeline and answer right away; poll /scan/jobs/{id}.
+        job = await enqueue_scan_job(db, current_user.id, organs, converted_images)
+        return JSONResponse(
+            status_code=202,
+            content={"job_id": job.id, "status": job.status, "status_url": f"/scan/jobs/{job.id}"}
+        )
+
+    plant, common_names = await identify_and_enrich(organs, converted_images, db)
+
+    # Step 5: Keep the photos and associate the plant with the current user.
+    with scan_stage("persist"):
+        image_keys = await store_images(converted_images)
+        await record_image_uploads(db, current_user.id, image_keys)
+        db.add(UserPlant(user_id=current_user.id, plant_id=plant.id, image=image_keys[0], images=image_keys))
+        await db.commit()
+    debug("scan.saved", plant_id=plant.id)
+
+    # Step 6: Build and return the response.
+    response_data = build_scan_response(plant, common_names)
+    debug("scan.response", response=response_data)
     return response_data
+
+
+@router.post("/batch", tags=["Scan"], summary="Scan several specimens in one request")
+async def scan_batch(
+    specimens: Annotated[List[str], Form(..., description="Specimen label for each image")],
+    organs: Annotated[List[str], Form(..., description="Organ for each image")],
+    images: Annotated[List[UploadFile], File(...)],
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Every image comes with a specimen label and an organ; images sharing a label are
+    identified together. Specimens are processed concurrently (SCAN_BATCH_CONCURRENCY at a time)
+    and all sightings are saved in one transaction. Failures are reported per specimen.
+    """
+    if not (len(specimens) == len(organs) == len(images)):
+        raise HTTPException(
+            status_code=400,
+            detail="specimens, organs and images must have one entry per image."
+        )
+
+    groups: Dict[str, Tuple[List[str], List[UploadFile]]] = {}
+    for label, organ, image in zip(specimens, organs, images):
+        group_organs, group_images = groups.setdefault(label, ([], []))
+        group_organs.append(organ)
+        group_images.append(image)
+    if len(groups) > SCAN_BATCH_MAX_SPECIMENS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"A batch may contain at most {SCAN_BATCH_MAX_SPECIMENS} specimens."
+        )
+
+    semaphore = asyncio.Semaphore(SCAN_BATCH_CONCURRENCY)
+
+    async def run_one(label: str, group_organs: List[str], group_images: List[UploadFile]):
+        async with semaphore:
+            uploads = []
+            try:
+                uploads = await ingest_uploads(group_images)
+                with scan_stage("convert"):
+                    converted_images = await convert_images_for_plantnet(uploads)
+                # An AsyncSession cannot be shared by concurrent tasks: one per specimen.
+                async with AsyncSessionLocal() as specimen_db:
+                    plant, common_names = await identify_and_enrich(group_organs, converted_images, specimen_db)
+                image_keys = await store_images(converted_images)
+                return label, plant, common_names, image_keys, None
+            except HTTPException as e:
+                return label, None, None, None, {"status_code": e.status_code, "detail": e.detail}
+            except Exception as e:
+                return label, None, None, None, {"status_code": 500, "detail": f"Internal error: {str(e)}"}
+            finally:
+                close_uploads(uploads)
+
+    outcomes = await asyncio.gather(*(
+        run_one(label, group_organs, group_images)
+        for label, (group_organs, group_images) in groups.items()
+    ))
+
+    # Save every identified specimen for the user in a single transaction.
+    with scan_stage("persist"):
+        await record_image_uploads(db, current_user.id, [
+            key for _, _, _, image_keys, error in outcomes if error is None for key in image_keys
+        ])
+        db.add_all([
+            UserPlant(user_id=current_user.id, plant_id=plant.id, image=image_keys[0], images=image_keys)
+            for _, plant, _, image_keys, error in outcomes if error is None
+        ])
+        await db.commit()
+
+    results = []
+    for label, plant, common_names, _, error in outcomes:
+        if error is None:
+            results.append({"specimen": label, **build_scan_response(plant, common_names)})
+        else:
+            results.append({"specimen": label, "error": error})
+    return {
+        "results": results,
+        "succeeded": sum(1 for outcome in outcomes if outcome[-1] is None),
+        "failed": sum(1 for outcome in outcomes if outcome[-1] is not None),
+    }
+
+
+@router.get("/jobs/{job_id}", response_model=ScanJobResponse, tags=["Scan"], summary="Status and result of a scan job")
+async def read_scan_job(job_id: str, db: AsyncSession = Depends(get_db), current_user = Depends(get_current_user)):
+    job = await get_scan_job(db, job_id, current_user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return job
+
+
+async def process_scan_job(job_id: str) -> dict:
+    """Run steps 1-5 of a queued scan; called by the scan job workers."""
+    async with AsyncSessionLocal() as db:
+        job = await db.get(ScanJob, job_id, options=[selectinload(ScanJob.images)])
+        if job is None:
+            # Purged or deleted after it was claimed; a 4xx is not retried.
+            raise HTTPException(status_code=410, detail=f"Scan job {job_id} no longer exists")
+        converted_images = [
+            ConvertedImage(image.filename, image.data, "image/jpeg") for image in job.images
+        ]
+        plant, common_names = await identify_and_enrich(job.organs, converted_images, db)
+        with scan_stage("persist"):
+            image_keys = await store_images(converted_images)
+            await record_image_uploads(db, job.user_id, image_keys)
+            db.add(UserPlant(user_id=job.user_id, plant_id=plant.id, image=image_keys[0], images=image_keys))
+            await db.commit()
+        return build_scan_response(plant, common_names)
@@ -1,33 +1,40 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from typing import List, Literal, Optional
 from app.database.models import UserPlant, User, Plant
-from app.database.database import SessionLocal
-from app.database.schemas import UserPlantCreate, UserPlantResponse
+from app.database.database import get_db
+from app.database.schemas import UserPlantCreate, UserPlantResponse, UserPlantWithPlant
+from app.database.operations import owns_image
+from app.database.pagination import paginate
 from app.api.routers.auth import get_current_user
+from app.services.principal_cache import Principal
 from datetime import datetime
 
 # All endpoints in this router require authentication
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
 
-# Dependency to get a DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def check_image(db: AsyncSession, current_user: Principal, image: Optional[str]) -> None:
+    """A sighting may only carry an image-store key its caller uploaded."""
+    if image is not None and not await owns_image(db, current_user.id, image):
+        raise HTTPException(status_code=400, detail="Unknown image: upload it with a scan first.")
 
 
 # CREATE a user-plant relationship
 @router.post("/", response_model=UserPlantResponse, tags=["User-Plants"])
-def create_user_plant(user_plant: UserPlantCreate, db: Session = Depends(get_db)):
+async def create_user_plant(
+    user_plant: UserPlantCreate,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    await check_image(db, current_user, user_plant.image)
     # Check if the plant-user relationship already exists
-    db_user_plant = db.query(UserPlant).filter(
+    db_user_plant = await db.scalar(select(UserPlant).where(
         UserPlant.user_id == user_plant.user_id,
         UserPlant.plant_id == user_plant.plant_id
-    ).first()
+    ))
 
     if db_user_plant:
         raise HTTPException(status_code=400, detail="User already has this plant registered.")
@@ -37,28 +44,63 @@ def create_user_plant(user_plant: UserPlantCreate, db: Session = Depends(get_db)
         user_id=user_plant.user_id,
         plant_id=user_plant.plant_id,
         image=user_plant.image,
+        images=[user_plant.image] if user_plant.image else None,
         date=user_plant.date or datetime.utcnow(),
         description=user_plant.description
     )
 
     db.add(new_user_plant)
-    db.commit()
-    db.refresh(new_user_plant)
+    await db.commit()
 
     return new_user_plant
 
 
 # READ all user-plant relationships
 @router.get("/", response_model=List[UserPlantResponse], tags=["User-Plants"])
-def read_user_plants(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    user_plants = db.query(UserPlant).offset(skip).limit(limit).all()
+async def read_user_plants(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1),
+    sort: Literal["id", "date"] = "id",
+    count: Optional[Literal["exact", "estimated"]] = None,
+    skip: int = Query(0, ge=0, deprecated=True),
+    db: AsyncSession = Depends(get_db)
+):
+    user_plants = await paginate(
+        db, select(UserPlant), response,
+        id_column=UserPlant.id, sort=sort, sort_column=getattr(UserPlant, sort),
+        cursor=cursor, limit=limit, count=count, skip=skip
+    )
     return user_plants
 
 
+# READ the current user's sightings, newest first, with plant details
+@router.get("/me", response_model=List[UserPlantWithPlant], tags=["User-Plants"])
+async def read_my_user_plants(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1),
+    count: Optional[Literal["exact", "estimated"]] = None,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # One query: the plant is joined in, and (user_id, date) serves the filter and the order.
+    query = (
+        select(UserPlant)
+        .options(joinedload(UserPlant.plant, innerjoin=True))
+        .where(UserPlant.user_id == current_user.id)
+    )
+    return await paginate(
+        db, query, response,
+        id_column=UserPlant.id, sort="-date", sort_column=UserPlant.date,
+        cursor=cursor, limit=limit, count=count, descending=True
+    )
+
+
 # READ a specific user-plant relationship by ID
 @router.get("/{user_plant_id}", response_model=UserPlantResponse, tags=["User-Plants"])
-def read_user_plant(user_plant_id: int, db: Session = Depends(get_db)):
-    user_plant = db.query(UserPlant).filter(UserPlant.id == user_plant_id).first()
+async def read_user_plant(user_plant_id: int, db: AsyncSession = Depends(get_db)):
+    user_plant = await db.get(UserPlant, user_plant_id)
     if not user_plant:
         raise HTTPException(status_code=404, detail="User-Plant relationship not found")
     return user_plant
@@ -66,28 +108,37 @@ def read_user_plant(user_plant_id: int, db: Session = Depends(get_db)):
 
 # UPDATE a user-plant relationship
 @router.put("/{user_plant_id}", response_model=UserPlantResponse, tags=["User-Plants"])
-def update_user_plant(user_plant_id: int, user_plant: UserPlantCreate, db: Session = Depends(get_db)):
-    db_user_plant = db.query(UserPlant).filter(UserPlant.id == user_plant_id).first()
+async def update_user_plant(
+    user_plant_id: int,
+    user_plant: UserPlantCreate,
+    current_user: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    db_user_plant = await db.get(UserPlant, user_plant_id)
     if not db_user_plant:
         raise HTTPException(status_code=404, detail="User-Plant relationship not found")
+    if user_plant.image != db_user_plant.image:
+        await check_image(db, current_user, user_plant.image)
 
     db_user_plant.image = user_plant.image
+    if user_plant.image and user_plant.image not in (db_user_plant.images or []):
+        # A new cover joins the sighting's photos (a JSON column: reassign, don't mutate).
+        db_user_plant.images = [*(db_user_plant.images or []), user_plant.image]
     db_user_plant.date = user_plant.date or datetime.utcnow()
     db_user_plant.description = user_plant.description
-    db.commit()
-    db.refresh(db_user_plant)
+    await db.commit()
 
     return db_user_plant
 
 
 # DELETE a user-plant relationship
 @router.delete("/{user_plant_id}", tags=["User-Plants"])
-def delete_user_plant(user_plant_id: int, db: Session = Depends(get_db)):
-    user_plant = db.query(UserPlant).filter(UserPlant.id == user_plant_id).first()
+async def delete_user_plant(user_plant_id: int, db: AsyncSession = Depends(get_db)):
+    user_plant = await db.get(UserPlant, user_plant_id)
     if not user_plant:
         raise HTTPException(status_code=404, detail="User-Plant relationship not found")
 
-    db.delete(user_plant)
-    db.commit()
+    await db.delete(user_plant)
+    await db.commit()
 
     return {"detail": "User-Plant relationship deleted successfully"}
@@ -1,53 +1,54 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List
-from dotenv import load_dotenv
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
 
-from app.database.database import SessionLocal
+from app.database.database import get_db
 from app.database.models import User
 from app.database.schemas import UserCreate, UserResponse
+from app.database.pagination import paginate
 from app.api.routers.auth import get_current_user, get_password_hash
-
-load_dotenv()
+from app.services.principal_cache import principal_cache
 
 # All endpoints in this router require authentication
 router = APIRouter(dependencies=[Depends(get_current_user)])
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 # CREATE user (e.g. admin creating users)
 @router.post("/", response_model=UserResponse, tags=["Users"])
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    db_user = await db.scalar(select(User).where(User.email == user.email))
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash(user.password)
     new_user = User(email=user.email, password=hashed_password)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
     return new_user
 
 
 # READ all users
 @router.get("/", response_model=List[UserResponse], tags=["Users"])
-def read_users(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    users = db.query(User).offset(skip).limit(limit).all()
+async def read_users(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1),
+    count: Optional[Literal["exact", "estimated"]] = None,
+    skip: int = Query(0, ge=0, deprecated=True),
+    db: AsyncSession = Depends(get_db)
+):
+    users = await paginate(
+        db, select(User), response,
+        id_column=User.id, cursor=cursor, limit=limit, count=count, skip=skip
+    )
     return users
 
 
 # READ a single user by ID
 @router.get("/{user_id}", response_model=UserResponse, tags=["Users"])
-def read_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def read_user(user_id: int, db: AsyncSession = Depends(get_db)):
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
@@ -55,24 +56,26 @@ def read_user(user_id: int, db: Session = Depends(get_db)):
 
 # UPDATE user
 @router.put("/{user_id}", response_model=UserResponse, tags=["Users"])
-def update_user(user_id: int, user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.id == user_id).first()
+async def update_user(user_id: int, user: UserCreate, db: AsyncSession = Depends(get_db)):
+    db_user = await db.get(User, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
 
     db_user.email = user.email
-    db_user.password = get_password_hash(user.password)
-    db.commit()
-    db.refresh(db_user)
+    db_user.password = await get_password_hash(user.password)
+    await db.commit()
+    # Tokens issued to this user must not keep resolving to the old row.
+    principal_cache.invalidate_user(user_id)
     return db_user
 
 
 # DELETE user
 @router.delete("/{user_id}", tags=["Users"])
-def delete_user(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    db.delete(user)
-    db.commit()
+    await db.delete(user)
+    await db.commit()
+    principal_cache.invalidate_user(user_id)
     return {"detail": "User deleted successfully"}
@@ -0,0 +1,214 @@
+# app/commands/enrich_catalog.py
+"""
+Pre-enrich the plant catalog from a list of species so first scans skip the OpenAI call.
+
+    python -m app.commands.enrich_catalog flora.txt --concurrency 8 --rate 5
+    cat flora.txt | python -m app.commands.enrich_catalog -
+
+One species per line, "Scientific name" or "Scientific name,Family"; blank lines and
+lines starting with "#" are ignored. Names already in `plants` are skipped. Progress is
+saved to a checkpoint file after every batch, so an interrupted run resumes where it
+stopped; names that failed are retried on the next run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from app.database.database import AsyncSessionLocal, async_engine
+from app.database.models import Plant
+from app.database.operations import add_plants
+from app.services import ai_service
+from app.services.enrichment import edible_flag
+
+ENRICH_CONCURRENCY = int(os.getenv("ENRICH_CONCURRENCY", "8"))
+# OpenAI requests per second across all workers.
+ENRICH_RATE = float(os.getenv("ENRICH_RATE", "5"))
+ENRICH_BATCH_SIZE = int(os.getenv("ENRICH_BATCH_SIZE", "50"))
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, with bursts up to `capacity`."""
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Checkpoint:
+    """Names already handled by earlier runs, persisted as JSON and replaced atomically."""
+    def __init__(self, path: str):
+        self.path = path
+        self.done: set = set()
+        self.failed: Dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            self.done = set(data.get("done", []))
+            self.failed = data.get("failed", {})
+
+    def save(self) -> None:
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"done": sorted(self.done), "failed": self.failed}, f, indent=1)
+        os.replace(tmp, self.path)
+
+
+def read_species(lines) -> List[Tuple[str, Optional[str]]]:
+    species = {}
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        name, _, family = (part.strip() for part in line.partition(","))
+        species.setdefault(name, family or None)
+    return list(species.items())
+
+
+async def existing_names(names: List[str]) -> set:
+    async with AsyncSessionLocal() as db:
+        found = set()
+        for i in range(0, len(names), 500):
+            chunk = names[i:i + 500]
+            found.update(await db.scalars(select(Plant.scientific_name).where(Plant.scientific_name.in_(chunk))))
+        return found
+
+
+async def write_batch(rows: List[dict]) -> int:
+    async with AsyncSessionLocal() as db:
+        return len(await add_plants(db, rows))
+
+
+async def enrich_catalog(
+    species: List[Tuple[str, Optional[str]]],
+    checkpoint: Checkpoint,
+    concurrency: int = ENRICH_CONCURRENCY,
+    rate: float = ENRICH_RATE,
+    batch_size: int = ENRICH_BATCH_SIZE,
+) -> dict:
+    loop = asyncio.get_running_loop()
+    # The OpenAI client is synchronous; give it exactly one thread per concurrent request.
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="enrich"))
+
+    todo = [(name, family) for name, family in species if name not in checkpoint.done]
+    stored = await existing_names([name for name, _ in todo])
+    checkpoint.done.update(stored)
+    todo = [(name, family) for name, family in todo if name not in stored]
+    print(f"{len(species)} species, {len(species) - len(todo)} already done, {len(todo)} to enrich")
+
+    bucket = TokenBucket(rate)
+    semaphore = asyncio.Semaphore(concurrency)
+    pending: List[dict] = []
+    write_lock = asyncio.Lock()
+    totals = {"enriched": 0, "failed": 0, "already_stored": 0}
+
+    async def flush() -> None:
+        async with write_lock:
+            if not pending:
+                return
+            rows = pending[:]
+            pending.clear()
+            inserted = await write_batch(rows)
+            checkpoint.done.update(row["scientific_name"] for row in rows)
+            for row in rows:
+                checkpoint.failed.pop(row["scientific_name"], None)
+            checkpoint.save()
+            # Rows another writer stored since we checked are skipped by add_plants.
+            totals["enriched"] += inserted
+            totals["already_stored"] += len(rows) - inserted
+            print(f"Stored {totals['enriched']}/{len(todo)} ({totals['failed']} failed)")
+
+    async def enrich_one(name: str, family: Optional[str]) -> None:
+        async with semaphore:
+            await bucket.acquire()
+            try:
+                info = await asyncio.to_thread(ai_service.get_detailed_plant_info, name)
+                # Checked here: a bad value reaching write_batch would fail the whole batch.
+                is_edible = edible_flag(name, info)
+                family = family or info.get("family")
+                if not family:
+                    raise ValueError("No family given and none returned")
+            except Exception as e:
+                totals["failed"] += 1
+                checkpoint.failed[name] = str(e)
+                return
+        pending.append({
+            "scientific_name": name,
+            "family": family,
+            "is_edible": is_edible,
+            "edible_parts": info.get("edible_parts"),
+            "safety": info.get("safety"),
+        })
+        if len(pending) >= batch_size:
+            await flush()
+
+    try:
+        await asyncio.gather(*(enrich_one(name, family) for name, family in todo))
+    finally:
+        # Keep what was enriched before an interruption.
+        await flush()
+        checkpoint.save()
+        await async_engine.dispose()
+    return {**totals, "skipped": len(species) - len(todo)}
+
+
+def _positive(convert):
+    def parse(value: str):
+        number = convert(value)
+        if number <= 0:
+            raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+        return number
+    return parse
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Pre-enrich the plant catalog via OpenAI.")
+    parser.add_argument("names", help="File with one species per line, or - for stdin")
+    parser.add_argument("--concurrency", type=_positive(int), default=ENRICH_CONCURRENCY)
+    parser.add_argument("--rate", type=_positive(float), default=ENRICH_RATE, help="OpenAI requests per second")
+    parser.add_argument("--batch-size", type=_positive(int), default=ENRICH_BATCH_SIZE)
+    parser.add_argument("--checkpoint", help="Progress file (default: <names>.checkpoint.json)")
+    args = parser.parse_args(argv)
+
+    if args.names == "-":
+        species = read_species(sys.stdin)
+        checkpoint_path = args.checkpoint or "enrich_catalog.checkpoint.json"
+    else:
+        with open(args.names) as f:
+            species = read_species(f)
+        checkpoint_path = args.checkpoint or f"{args.names}.checkpoint.json"
+
+    checkpoint = Checkpoint(checkpoint_path)
+    try:
+        totals = asyncio.run(enrich_catalog(
+            species, checkpoint,
+            concurrency=args.concurrency, rate=args.rate, batch_size=args.batch_size,
+        ))
+    except KeyboardInterrupt:
+        print(f"Interrupted; progress saved to {checkpoint_path}")
+        return 130
+    print(json.dumps(totals))
+    return 1 if totals["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+# app/commands/import_report.py
+"""
+Report the cold-start cost of importing the app, per module and per package.
+
+    python -m app.commands.import_report
+    python -m app.commands.import_report --module app.main --top 30
+    python -m app.commands.import_report --json import-times.json
+
+Imports `--module` (by default the serverless entry point, api/index.py) in a fresh
+interpreter under `python -X importtime` and prints the wall time, the app modules by
+cumulative time, and third-party packages by their own import time. Save --json output
+from each release to track cold-start milliseconds over time.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+_PROBE = (
+    "import time\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "print((time.perf_counter() - start) * 1000)\n"
+)
+
+
+def _parse(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) for each line of -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # The header line.
+        rows.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    return rows
+
+
+def measure(module: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module)],
+        capture_output=True, text=True, env=os.environ.copy(),
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr[-2000:]}")
+    rows = _parse(result.stderr)
+
+    app_modules = {name: cumulative for name, _, cumulative in rows if name == "app" or name.startswith("app.")}
+    packages: Dict[str, int] = defaultdict(int)
+    for name, own, _ in rows:
+        root = name.split(".")[0]
+        if root not in ("app", "api"):
+            packages[root] += own
+    return {
+        "module": module,
+        "wall_ms": round(float(result.stdout.strip().splitlines()[-1]), 1),
+        "app_modules_ms": {name: round(us / 1000, 1) for name, us in app_modules.items()},
+        "packages_ms": {name: round(us / 1000, 1) for name, us in packages.items()},
+    }
+
+
+def _print_top(title: str, values: Dict[str, float], top: int) -> None:
+    print(f"\n{title}")
+    for name, ms in sorted(values.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"  {ms:>9.1f} ms  {name}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Report import (cold-start) time per module.")
+    parser.add_argument("--module", default="api.index", help="Module to import (default: api.index)")
+    parser.add_argument("--top", type=int, default=20, help="Rows per table")
+    parser.add_argument("--json", metavar="PATH", help="Also write the full report as JSON")
+    args = parser.parse_args(argv)
+
+    report = measure(args.module)
+    print(f"import {report['module']}: {report['wall_ms']:.1f} ms")
+    _print_top("App modules (cumulative, includes their imports)", report["app_modules_ms"], args.top)
+    _print_top("Packages (own time, summed over submodules)", report["packages_ms"], args.top)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+# app/commands/migrate.py
+"""
+Create missing tables and apply pending schema migrations.
+
+    python -m app.commands.migrate
+    python -m app.commands.migrate --reset    # drop every table first: destroys all data
+
+Long-running servers do this at startup; serverless deployments (SERVERLESS=true, as
+set by api/index.py) do not, so run this once per deploy, before traffic arrives.
+Safe to run repeatedly: applied migrations are recorded in `schema_migrations`.
+"""
+import argparse
+import logging
+import sys
+
+from sqlalchemy.engine import make_url
+
+from app.database.database import DATABASE_URL, engine
+from app.database.migrations import init_schema
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Create tables and apply pending migrations.")
+    parser.add_argument("--reset", action="store_true", help="Drop and recreate every table (destroys all data)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    print(f"Database: {make_url(DATABASE_URL).render_as_string(hide_password=True)}")
+    if args.reset:
+        print("Dropping all tables")
+    try:
+        applied = init_schema(engine, reset=args.reset)
+    finally:
+        engine.dispose()
+    print(f"Applied {len(applied)} migration(s)" + (f": {', '.join(applied)}" if applied else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+# app/commands/scan_worker.py
+"""
+Run scan job workers in their own process, for deployments whose web instances cannot.
+
+    python -m app.commands.scan_worker
+    python -m app.commands.scan_worker --concurrency 4
+
+Serverless instances (api/index.py) run no workers: they are frozen between requests.
+Queued scans (POST /scan/?mode=queued) are then processed by this command, which polls
+the scan_jobs table until it receives SIGINT or SIGTERM and lets running jobs finish
+or be retried. Schema changes are not applied here; run app.commands.migrate first.
+"""
+import argparse
+import asyncio
+import logging
+import signal
+import sys
+
+from app.api.routers.scan_routes import process_scan_job
+from app.core.tracing import configure_logging, shutdown_tracing
+from app.database.database import async_engine
+from app.services.image_engine import shutdown_executor
+from app.services.plant_cache import plant_cache
+from app.services.plantnet_client import plantnet_client
+from app.services.scan_jobs import SCAN_JOB_WORKERS, ScanJobWorkers
+
+logger = logging.getLogger(__name__)
+
+
+async def run(concurrency: int) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    workers = ScanJobWorkers(concurrency=concurrency)
+    await plantnet_client.start()
+    plant_cache.start_listener()
+    try:
+        workers.start(process_scan_job)
+        await stop.wait()
+        logger.info("Stopping scan job workers...")
+    finally:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+        await workers.stop()
+        plant_cache.stop_listener()
+        await plantnet_client.close()
+        shutdown_executor()
+        await async_engine.dispose()
+        shutdown_tracing()
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+    return number
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Process queued scan jobs until interrupted.")
+    # SCAN_JOB_WORKERS is often 0 for the web tier; this process exists to run workers.
+    parser.add_argument("--concurrency", type=_positive_int, default=SCAN_JOB_WORKERS or 2,
+                        help="Jobs processed at once (default: SCAN_JOB_WORKERS, or 2 when that is 0)")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    logger.info("Scan worker starting with %d workers", args.concurrency)
+    asyncio.run(run(args.concurrency))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+# app/core/metrics.py
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+Counters and histograms are updated inline (a lock, a dict lookup and a bisect);
+gauges are computed from callbacks only when /metrics is scraped. Values are
+per worker process, so scrape every worker or run a single worker per container.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Seconds; spans a cache hit (~1 ms) to a cold scan with OpenAI enrichment (tens of seconds).
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *labels: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        lines = self.header()
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+Samples = Callable[[], Iterable[Tuple[Sequence[str], float]]]
+
+
+class CallbackMetric(_Metric):
+    """
+    Samples read at scrape time from callbacks returning [(label values, value)].
+    For values that already live elsewhere (pool sizes, cache counters).
+    """
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], kind: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.callbacks: List[Samples] = []
+
+    def collect(self) -> List[str]:
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+            for callback in self.callbacks
+            for labels, value in callback()
+        ]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def register_callback(self, name: str, documentation: str, labelnames: Sequence[str],
+                          callback: Samples, kind: str = "gauge") -> None:
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self.register(CallbackMetric(name, documentation, labelnames, kind))
+        metric.callbacks.append(callback)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            try:
+                lines.extend(metric.collect())
+            except Exception as e:
+                # One broken gauge callback must not take the whole scrape down.
+                lines.append(f"# {metric.name} unavailable: {_escape(e)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status")
+))
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route")
+))
+SCAN_STAGE_DURATION = REGISTRY.register(Histogram(
+    "scan_stage_duration_seconds",
+    "Time spent in each scan stage (convert, identify, lookup, enrich, names, persist).", ("stage",)
+))
+IMAGE_CONVERSION_DURATION = REGISTRY.register(Histogram(
+    "image_conversion_seconds", "Per-image conversion time by phase (decode, resize, encode).", ("phase",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+))
+EXTERNAL_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "external_request_duration_seconds", "Latency of calls to external APIs.", ("service",)
+))
+EXTERNAL_REQUEST_ERRORS = REGISTRY.register(Counter(
+    "external_request_errors_total", "Failed calls to external APIs by reason.", ("service", "reason")
+))
+EXTERNAL_REQUEST_RETRIES = REGISTRY.register(Counter(
+    "external_request_retries_total", "Calls to external APIs retried after a transient failure.", ("service",)
+))
+
+
+@contextmanager
+def track_external(service: str):
+    """Time a call to an external API; exceptions are counted by class name and re-raised."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        EXTERNAL_REQUEST_ERRORS.inc(service, type(e).__name__)
+        raise
+    finally:
+        EXTERNAL_REQUEST_DURATION.observe(time.perf_counter() - start, service)
+
+
+def register_cache(cache_name: str, stats: Callable[[], dict]) -> None:
+    """Expose a cache's `stats()` (hits, misses, entries) as cache_* metrics labelled by cache."""
+    def sample(key: str):
+        return lambda: [((cache_name,), stats()[key])]
+
+    REGISTRY.register_callback("cache_hits_total", "Cache lookups served from the cache.",
+                               ("cache",), sample("hits"), kind="counter")
+    REGISTRY.register_callback("cache_misses_total", "Cache lookups that fell through.",
+                               ("cache",), sample("misses"), kind="counter")
+    REGISTRY.register_callback("cache_hit_ratio", "hits / (hits + misses) since start.",
+                               ("cache",), sample("hit_ratio"))
+    REGISTRY.register_callback("cache_entries", "Entries currently held.", ("cache",), sample("entries"))
+
+
+def route_template(scope) -> str:
+    """The matched route's path template; templates, not raw paths, keep label cardinality bounded."""
+    # Routes of included routers carry their prefix only in FastAPI's effective route context.
+    context = (scope.get("fastapi") or {}).get("effective_route_context")
+    return getattr(context, "path", None) or getattr(scope.get("route"), "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency and status per route template."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            template = route_template(scope)
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, scope["method"], template)
+            HTTP_REQUESTS.inc(scope["method"], template, str(status["code"]))
@@ -0,0 +1,465 @@
+# app/core/tracing.py
+"""
+Request tracing: a request id and nested spans carried in context variables.
+
+    with span("scan.identify", organs=len(organs)):
+        ...
+    debug("scan.identified", species=name)
+
+Every HTTP request gets an id (taken from X-Request-ID or generated), echoed in the
+response and stamped on every log record. Spans are only recorded for sampled
+requests and only when an exporter is configured; otherwise `span()` hands back a
+shared no-op span and `debug()` returns after one flag check. Finished spans are
+queued and exported in batches by a background thread, as OTLP/JSON, either to a
+collector (TRACE_EXPORTER=otlp) or appended to a file (TRACE_EXPORTER=file).
+
+Log records go through a QueueHandler as well, so handlers never block the event loop.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, List, Optional
+
+import httpx
+
+from app.core.metrics import REGISTRY, route_template
+
+SERVICE_NAME = os.getenv("SERVICE_NAME", "food-around-us")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# none | file | otlp | console. With "none" only request ids are tracked.
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none").lower()
+# Fraction of requests (root spans) recorded; children follow their root's decision.
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+# "debug" also records debug() events on spans; anything else drops them.
+TRACE_LEVEL = os.getenv("TRACE_LEVEL", "info").lower()
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACE_BATCH_SIZE = int(os.getenv("TRACE_BATCH_SIZE", "256"))
+TRACE_FLUSH_INTERVAL = float(os.getenv("TRACE_FLUSH_INTERVAL", "2.0"))
+# Spans waiting for export; further spans are dropped (and counted) rather than blocking.
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "10000"))
+TRACE_MAX_ATTRIBUTE_LENGTH = int(os.getenv("TRACE_MAX_ATTRIBUTE_LENGTH", "1024"))
+
+TRACING_ENABLED = TRACE_EXPORTER != "none" and TRACE_SAMPLE_RATE > 0
+DEBUG_EVENTS = TRACE_LEVEL == "debug"
+
+# OTLP span kinds and status codes.
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+logger = logging.getLogger(__name__)
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "start", "end",
+                 "attributes", "events", "status", "status_message")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: int, attributes: dict):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.start = time.time_ns()
+        self.end = 0
+        self.attributes = attributes
+        self.events: List[tuple] = []
+        self.status = STATUS_UNSET
+        self.status_message = ""
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def event(self, name: str, **attributes) -> None:
+        self.events.append((time.time_ns(), name, attributes))
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.status, self.status_message = STATUS_ERROR, f"{type(exc).__name__}: {exc}"
+        self.event("exception", **{"exception.type": type(exc).__name__, "exception.message": str(exc)})
+
+    def set_error(self, message: str) -> None:
+        self.status, self.status_message = STATUS_ERROR, message
+
+
+class _NoopSpan:
+    """Stands in for a span when nothing is recorded; every method does nothing."""
+    __slots__ = ()
+    name = ""
+
+    def set(self, **attributes) -> None:
+        pass
+
+    def event(self, name: str, **attributes) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+    def set_error(self, message: str) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+# --- export ------------------------------------------------------------------
+
+def _value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_value(item) for item in value]}}
+    return {"stringValue": str(value)[:TRACE_MAX_ATTRIBUTE_LENGTH]}
+
+
+def _attributes(attributes: dict) -> List[dict]:
+    return [{"key": key, "value": _value(value)} for key, value in attributes.items() if value is not None]
+
+
+def otlp_payload(spans: List[Span]) -> dict:
+    """An OTLP/JSON ExportTraceServiceRequest holding `spans`."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": _attributes({"service.name": SERVICE_NAME})},
+        "scopeSpans": [{
+            "scope": {"name": "app.core.tracing"},
+            "spans": [{
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "parentSpanId": s.parent_id or "",
+                "name": s.name,
+                "kind": s.kind,
+                "startTimeUnixNano": str(s.start),
+                "endTimeUnixNano": str(s.end),
+                "attributes": _attributes(s.attributes),
+                "events": [
+                    {"timeUnixNano": str(ts), "name": name, "attributes": _attributes(attrs)}
+                    for ts, name, attrs in s.events
+                ],
+                "status": {"code": s.status, "message": s.status_message},
+            } for s in spans],
+        }],
+    }]}
+
+
+class FileExporter:
+    """Appends one OTLP/JSON request per batch, one per line (readable by the collector's otlpjsonfile receiver)."""
+    def __init__(self, path: str = TRACE_FILE):
+        self.path = path
+
+    def export(self, spans: List[Span]) -> None:
+        with open(self.path, "a") as f:
+            f.write(json.dumps(otlp_payload(spans), separators=(",", ":")) + "\n")
+
+    def close(self) -> None:
+        pass
+
+
+class ConsoleExporter:
+    """One line per span on the log, for local debugging."""
+    def export(self, spans: List[Span]) -> None:
+        for s in spans:
+            logger.info("span %s %.1fms trace=%s attrs=%s", s.name, (s.end - s.start) / 1e6, s.trace_id, s.attributes)
+
+    def close(self) -> None:
+        pass
+
+
+class OTLPExporter:
+    """POSTs batches to an OTLP/HTTP collector endpoint as JSON."""
+    def __init__(self, endpoint: str = TRACE_OTLP_ENDPOINT, timeout: float = 10.0):
+        self.endpoint = endpoint
+        self._client = httpx.Client(timeout=timeout)
+
+    def export(self, spans: List[Span]) -> None:
+        response = self._client.post(self.endpoint, json=otlp_payload(spans))
+        response.raise_for_status()
+
+    def close(self) -> None:
+        self._client.close()
+
+
+_STOP = object()
+
+
+class BatchSpanProcessor:
+    """
+    Collects finished spans on a bounded queue and exports them from a daemon thread,
+    every `batch_size` spans or `flush_interval` seconds, whichever comes first.
+    """
+    def __init__(self, exporter, batch_size: int = TRACE_BATCH_SIZE,
+                 flush_interval: float = TRACE_FLUSH_INTERVAL, max_queue: int = TRACE_QUEUE_SIZE):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.exported = 0
+        self._queue: queue.Queue = queue.Queue(max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, span: Span) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+                self._thread.start()
+
+    def _export(self, batch: List[Span]) -> None:
+        try:
+            self.exporter.export(batch)
+            self.exported += len(batch)
+        except Exception as e:
+            self.dropped += len(batch)
+            logger.warning("Trace export of %d spans failed: %s", len(batch), e)
+
+    def _run(self) -> None:
+        batch: List[Span] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                if batch:
+                    self._export(batch)
+                return
+            if item is not None:
+                batch.append(item)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                if batch:
+                    self._export(batch)
+                    batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        if self._thread is not None:
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                pass
+            self._thread.join(timeout)
+            self._thread = None
+        self.exporter.close()
+
+
+def _make_exporter(kind: str):
+    if kind == "file":
+        return FileExporter()
+    if kind == "otlp":
+        return OTLPExporter()
+    if kind == "console":
+        return ConsoleExporter()
+    raise ValueError(f"Unknown TRACE_EXPORTER {kind!r} (expected none, file, otlp or console)")
+
+
+processor: Optional[BatchSpanProcessor] = BatchSpanProcessor(_make_exporter(TRACE_EXPORTER)) if TRACING_ENABLED else None
+
+if processor is not None:
+    REGISTRY.register_callback(
+        "trace_spans_total", "Spans handed to the trace exporter, by outcome.", ("outcome",),
+        lambda: [(("exported",), processor.exported), (("dropped",), processor.dropped)], kind="counter",
+    )
+
+
+# --- spans -------------------------------------------------------------------
+
+def current_span():
+    return _current_span.get() or NOOP_SPAN
+
+
+def _finish(s: Span, token) -> None:
+    _current_span.reset(token)
+    s.end = time.time_ns()
+    processor.submit(s)
+
+
+@contextmanager
+def span(name: str, kind: int = INTERNAL, **attributes):
+    """A child of the current span; a no-op outside a sampled trace."""
+    parent = _current_span.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+    s = Span(name, parent.trace_id, parent.span_id, kind, attributes)
+    token = _current_span.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.record_exception(e)
+        raise
+    finally:
+        _finish(s, token)
+
+
+def _parse_traceparent(header: Optional[str]):
+    match = _TRACEPARENT.match(header or "")
+    if not match:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    return trace_id, parent_id, int(flags, 16) & 1 == 1
+
+
+@contextmanager
+def trace(name: str, request_id: Optional[str] = None, traceparent: Optional[str] = None,
+          kind: int = INTERNAL, **attributes):
+    """
+    Start a new trace (an HTTP request, a background job) and bind `request_id` for its
+    duration. A W3C `traceparent` continues the caller's trace and sampling decision.
+    """
+    token = request_id_var.set(request_id) if request_id is not None else None
+    try:
+        if not TRACING_ENABLED:
+            yield NOOP_SPAN
+            return
+        parent = _parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id = uuid.uuid4().hex, None
+            sampled = random.random() < TRACE_SAMPLE_RATE
+        if not sampled:
+            yield NOOP_SPAN
+            return
+        if request_id is not None:
+            attributes["request.id"] = request_id
+        s = Span(name, trace_id, parent_id, kind, attributes)
+        span_token = _current_span.set(s)
+        try:
+            yield s
+        except BaseException as e:
+            s.record_exception(e)
+            raise
+        finally:
+            _finish(s, span_token)
+    finally:
+        if token is not None:
+            request_id_var.reset(token)
+
+
+def debug(name: str, **attributes) -> None:
+    """
+    Record a debug event on the current span. Off unless TRACE_LEVEL=debug; pass values
+    as attributes rather than formatted strings so disabled events cost nothing.
+    """
+    if not DEBUG_EVENTS:
+        return
+    s = _current_span.get()
+    if s is not None:
+        s.event(name, **attributes)
+    elif logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s %s", name, attributes)
+
+
+# --- HTTP --------------------------------------------------------------------
+
+class TracingMiddleware:
+    """
+    Pure ASGI middleware: binds the request id (X-Request-ID, or a new one), opens the
+    request's root span and echoes the id on the response.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        incoming = headers.get(b"x-request-id", b"").decode("latin-1")
+        request_id = incoming if _REQUEST_ID.match(incoming) else uuid.uuid4().hex
+        traceparent = headers.get(b"traceparent", b"").decode("latin-1") or None
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", request_id.encode())]
+            await send(message)
+
+        with trace(scope["method"], request_id=request_id, traceparent=traceparent, kind=SERVER,
+                   **{"http.method": scope["method"], "http.target": scope["path"]}) as root:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                template = route_template(scope)
+                if root is not NOOP_SPAN:
+                    root.name = f"{scope['method']} {template}"
+                root.set(**{"http.route": template, "http.status_code": status["code"]})
+                if status["code"] >= 500:
+                    root.set_error(f"HTTP {status['code']}")
+
+
+# --- logging -----------------------------------------------------------------
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the current request id; runs in the logging thread, before queueing."""
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging(level: str = LOG_LEVEL) -> None:
+    """
+    Route the root logger through a queue: callers only enqueue the record and a
+    listener thread formats and writes it to stderr.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_tracing() -> None:
+    """Export what is still queued and flush the log listener."""
+    global _listener
+    if processor is not None:
+        processor.shutdown()
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        logging.getLogger().handlers = [logging.StreamHandler()]
+
+
+atexit.register(shutdown_tracing)
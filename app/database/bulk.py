@@ -0,0 +1,215 @@
+# app/database/bulk.py
+"""
+Streaming export and batched upsert import of the plant catalog (NDJSON or CSV).
+"""
+import codecs
+import csv
+import io
+import json
+import os
+from typing import AsyncIterator, List, Optional
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.database import AsyncSessionLocal
+from app.database.models import Plant
+from app.database.operations import normalize_edible_parts
+from app.database.schemas import PlantCreate
+
+# Rows fetched per round trip from the server-side cursor while exporting.
+CATALOG_EXPORT_BATCH_SIZE = int(os.getenv("CATALOG_EXPORT_BATCH_SIZE", "1000"))
+# Rows per multi-row upsert (and per commit) while importing.
+CATALOG_IMPORT_BATCH_SIZE = int(os.getenv("CATALOG_IMPORT_BATCH_SIZE", "1000"))
+# Rejected rows reported back individually; the rest are only counted.
+CATALOG_IMPORT_MAX_ERRORS = int(os.getenv("CATALOG_IMPORT_MAX_ERRORS", "100"))
+# Longest CSV record, in characters, that may span several lines (quoted newlines).
+CATALOG_IMPORT_MAX_RECORD_CHARS = int(os.getenv("CATALOG_IMPORT_MAX_RECORD_CHARS", str(1024 * 1024)))
+
+FIELDS = ("scientific_name", "family", "is_edible", "edible_parts", "safety")
+_UPDATE_FIELDS = FIELDS[1:]
+
+
+async def iter_export(fmt: str) -> AsyncIterator[str]:
+    """
+    Yield the catalog as NDJSON lines or CSV rows, ordered by id.
+    Opens its own session: request-scoped sessions are closed before a streamed body is sent.
+    """
+    async with AsyncSessionLocal() as db:
+        rows = await db.stream(
+            select(*(getattr(Plant, field) for field in FIELDS))
+            .order_by(Plant.id)
+            .execution_options(yield_per=CATALOG_EXPORT_BATCH_SIZE)
+        )
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(FIELDS)
+            async for row in rows:
+                record = row._asdict()
+                record["edible_parts"] = ",".join(record["edible_parts"] or [])
+                writer.writerow([record[field] for field in FIELDS])
+                if buffer.tell() >= 64 * 1024:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+        else:
+            async for row in rows:
+                record = row._asdict()
+                record["edible_parts"] = list(record["edible_parts"] or [])
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+class CatalogImport:
+    """
+    Accumulates parsed rows and upserts them on scientific_name in batches.
+    Feed it one text line at a time, then call finish(); the first CSV record must be a
+    header row. A CSV record continues over further lines while a quoted field is open.
+    """
+    def __init__(self, db: AsyncSession, fmt: str):
+        self.db = db
+        self.fmt = fmt
+        self.header: Optional[List[str]] = None
+        self.batch: dict = {}
+        self.line_no = 0
+        self.record_line = 0  # First line of the record being parsed, for error reports.
+        self._partial: Optional[List[str]] = None
+        self._quotes = 0
+        self.inserted = 0
+        self.updated = 0
+        self.rejected = 0
+        self.errors: list = []
+
+    def _reject(self, detail: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < CATALOG_IMPORT_MAX_ERRORS:
+            self.errors.append({"line": self.record_line, "detail": detail})
+
+    def _csv_record(self, line: str) -> Optional[str]:
+        """Join lines until the quotes balance: csv.writer quotes fields with newlines in them."""
+        if self._partial is None:
+            self.record_line = self.line_no
+            self._partial, self._quotes = [], 0
+        self._partial.append(line)
+        self._quotes += line.count('"')
+        if self._quotes % 2 == 0:
+            record, self._partial = "\n".join(self._partial), None
+            return record
+        if sum(len(part) + 1 for part in self._partial) > CATALOG_IMPORT_MAX_RECORD_CHARS:
+            self._partial = None
+            self._reject(f"Record longer than {CATALOG_IMPORT_MAX_RECORD_CHARS} characters (unbalanced quotes?)")
+        return None
+
+    def _parse(self, line: str) -> Optional[dict]:
+        if self.fmt == "csv":
+            values = next(csv.reader([line]))
+            if self.header is None:
+                self.header = [value.strip() for value in values]
+                missing = {"scientific_name", "family", "is_edible"} - set(self.header)
+                if missing:
+                    raise HTTPException(status_code=400, detail=f"CSV header is missing {', '.join(sorted(missing))}")
+                return None
+            if len(values) != len(self.header):
+                raise ValueError(f"Expected {len(self.header)} fields, got {len(values)}")
+            record = {key: (value if value != "" else None) for key, value in zip(self.header, values)}
+        else:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("Expected a JSON object")
+        if isinstance(record.get("edible_parts"), str):
+            record["edible_parts"] = normalize_edible_parts(record["edible_parts"])
+        return record
+
+    def feed(self, line: str) -> bool:
+        """Parse one line; returns True when a full batch is ready to flush."""
+        self.line_no += 1
+        if self.fmt == "csv":
+            line = self._csv_record(line)
+            if line is None:
+                return False
+        else:
+            self.record_line = self.line_no
+        line = line.strip()
+        if not line:
+            return False
+        try:
+            record = self._parse(line)
+            if record is None:
+                return False
+            plant = PlantCreate.model_validate(record)
+        except ValidationError as e:
+            self._reject("; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+            return False
+        except (ValueError, csv.Error) as e:
+            self._reject(str(e))
+            return False
+        values = plant.model_dump()
+        values["edible_parts"] = normalize_edible_parts(values["edible_parts"])
+        # Last occurrence wins: one statement cannot upsert the same key twice.
+        self.batch[values["scientific_name"]] = values
+        return len(self.batch) >= CATALOG_IMPORT_BATCH_SIZE
+
+    def finish(self) -> None:
+        """Call at the end of the input: a record still inside a quoted field is rejected."""
+        if self._partial is not None:
+            self._partial = None
+            self._reject("Unterminated quoted field at end of input")
+
+    async def flush(self) -> List[str]:
+        """Upsert the pending batch and commit; returns the scientific names written."""
+        if not self.batch:
+            return []
+        rows = list(self.batch.values())
+        self.batch = {}
+        names = [row["scientific_name"] for row in rows]
+        existing = set(
+            await self.db.scalars(select(Plant.scientific_name).where(Plant.scientific_name.in_(names)))
+        )
+        dialect = self.db.get_bind().dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            if dialect == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            statement = insert(Plant).values(rows)
+            await self.db.execute(statement.on_conflict_do_update(
+                index_elements=["scientific_name"],
+                set_={field: statement.excluded[field] for field in _UPDATE_FIELDS},
+            ))
+        else:
+            for row in rows:
+                plant = await self.db.scalar(select(Plant).where(Plant.scientific_name == row["scientific_name"]))
+                if plant is None:
+                    self.db.add(Plant(**row))
+                else:
+                    for field in _UPDATE_FIELDS:
+                        setattr(plant, field, row[field])
+        await self.db.commit()
+        self.updated += len(existing)
+        self.inserted += len(rows) - len(existing)
+        return names
+
+    def result(self) -> dict:
+        return {
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
+
+
+async def aiter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a UTF-8 byte stream into lines without buffering more than one partial line."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
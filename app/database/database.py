@@ -1,11 +1,11 @@
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
 
-
-load_dotenv()
+from app.core.metrics import REGISTRY
 
 # POSTGRES_USER = os.getenv("POSTGRES_USER")
 # POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
@@ -14,7 +14,79 @@ load_dotenv()
 # POSTGRES_PORT = os.getenv("POSTGRES_PORT", 5432)
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Connection pool, per engine and per process.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Seconds after which a connection is replaced; keep below any server/proxy idle timeout.
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# asyncpg prepared statements cached per connection; set 0 behind pgbouncer in transaction mode.
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+
+def _async_url(url: str) -> str:
+    """The asyncpg / aiosqlite flavour of a sync database URL."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    elif backend == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+# Used by the API. The sync engine below stays for migrations, the cache listener thread and startup.
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+
+
+def _pool_options(url: str) -> dict:
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    return options
+
+
+def _async_connect_args(url: str) -> dict:
+    if make_url(url).get_dialect().driver == "asyncpg":
+        return {
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        }
+    return {}
 
-engine = create_engine(DATABASE_URL)
+
+engine = create_engine(DATABASE_URL, **_pool_options(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args=_async_connect_args(ASYNC_DATABASE_URL),
+    **_pool_options(ASYNC_DATABASE_URL),
+)
+# Objects stay usable after commit, as async sessions cannot lazily refresh them.
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
+
+
+def _pool_samples():
+    for name, pool in (("async", async_engine.pool), ("sync", engine.pool)):
+        if not hasattr(pool, "checkedout"):
+            continue  # NullPool / StaticPool keep no counts.
+        yield (name, "checked_out"), pool.checkedout()
+        yield (name, "idle"), pool.checkedin()
+        yield (name, "overflow"), max(pool.overflow(), 0)
+        yield (name, "size"), pool.size()
+
+
+REGISTRY.register_callback(
+    "db_pool_connections", "Connection pool usage per engine (checked_out, idle, overflow, size).",
+    ("engine", "state"), _pool_samples,
+)
+
+
+async def get_db():
+    """Request-scoped async session, shared by every router."""
+    async with AsyncSessionLocal() as db:
+        yield db
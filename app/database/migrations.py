@@ -0,0 +1,223 @@
+# app/database/migrations.py
+"""
+Ordered, idempotent schema/data migrations for changes `create_all` cannot make
+to existing tables (column type changes, new indexes, backfills).
+Each migration runs once per database and is recorded in `schema_migrations`.
+"""
+import json
+import logging
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.database.database import Base
+from app.database.models import ImageUpload
+from app.database.operations import normalize_edible_parts
+from app.services.image_store import is_valid_key
+
+logger = logging.getLogger(__name__)
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _metadata,
+    Column("name", String, primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def _column_type(conn: Connection, table: str, column: str):
+    return conn.execute(
+        text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_name = :table AND column_name = :column"
+        ),
+        {"table": table, "column": column},
+    ).scalar()
+
+
+def edible_parts_to_array(conn: Connection) -> None:
+    """plants.edible_parts: comma-separated string -> lower-cased array with a GIN index."""
+    if conn.dialect.name == "postgresql":
+        if _column_type(conn, "plants", "edible_parts") in ("character varying", "text"):
+            conn.execute(text(
+                "ALTER TABLE plants ALTER COLUMN edible_parts TYPE varchar[] USING "
+                "CASE WHEN edible_parts IS NULL OR btrim(edible_parts) = '' THEN '{}'::varchar[] "
+                "ELSE regexp_split_to_array(lower(btrim(edible_parts)), '\\s*,\\s*')::varchar[] END"
+            ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_plants_edible_parts ON plants USING gin (edible_parts)"
+        ))
+    else:
+        rows = conn.execute(text("SELECT id, edible_parts FROM plants")).all()
+        for plant_id, value in rows:
+            if value is None or not str(value).startswith("["):
+                conn.execute(
+                    text("UPDATE plants SET edible_parts = :parts WHERE id = :id"),
+                    {"parts": json.dumps(normalize_edible_parts(value)), "id": plant_id},
+                )
+
+
+def plant_search_indexes(conn: Connection) -> None:
+    """Trigram indexes (Postgres) or an FTS5 trigram table (SQLite) behind /plants/search."""
+    if conn.dialect.name == "postgresql":
+        try:
+            with conn.begin_nested():
+                conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        except Exception as e:
+            logger.warning("Could not create pg_trgm (%s); search falls back to sequential scans", e)
+            return
+        for name, table, column in (
+            ("ix_plants_scientific_name_trgm", "plants", "scientific_name"),
+            ("ix_plants_family_trgm", "plants", "family"),
+            ("ix_plant_common_names_name_trgm", "plant_common_names", "name"),
+        ):
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (lower({column}) gin_trgm_ops)"
+            ))
+    elif conn.dialect.name == "sqlite":
+        # rowid 2*id / 2*id+1 hold a plant's scientific name / family, -id a common name,
+        # so the triggers can maintain rows without scanning the unindexed columns.
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS plant_search_fts "
+            "USING fts5(plant_id UNINDEXED, kind UNINDEXED, name, tokenize='trigram')"
+        ))
+        for statement in (
+            "CREATE TRIGGER IF NOT EXISTS plants_search_ai AFTER INSERT ON plants BEGIN "
+            "INSERT INTO plant_search_fts(rowid, plant_id, kind, name) VALUES "
+            "(2 * new.id, new.id, 'scientific_name', new.scientific_name), "
+            "(2 * new.id + 1, new.id, 'family', new.family); END",
+            "CREATE TRIGGER IF NOT EXISTS plants_search_au AFTER UPDATE OF scientific_name, family ON plants BEGIN "
+            "DELETE FROM plant_search_fts WHERE rowid IN (2 * old.id, 2 * old.id + 1); "
+            "INSERT INTO plant_search_fts(rowid, plant_id, kind, name) VALUES "
+            "(2 * new.id, new.id, 'scientific_name', new.scientific_name), "
+            "(2 * new.id + 1, new.id, 'family', new.family); END",
+            "CREATE TRIGGER IF NOT EXISTS plants_search_ad AFTER DELETE ON plants BEGIN "
+            "DELETE FROM plant_search_fts WHERE rowid IN (2 * old.id, 2 * old.id + 1); END",
+            "CREATE TRIGGER IF NOT EXISTS plant_common_names_search_ai AFTER INSERT ON plant_common_names BEGIN "
+            "INSERT INTO plant_search_fts(rowid, plant_id, kind, name) "
+            "VALUES (-new.id, new.plant_id, 'common_name', new.name); END",
+            "CREATE TRIGGER IF NOT EXISTS plant_common_names_search_ad AFTER DELETE ON plant_common_names BEGIN "
+            "DELETE FROM plant_search_fts WHERE rowid = -old.id; END",
+        ):
+            conn.execute(text(statement))
+        conn.execute(text("DELETE FROM plant_search_fts"))
+        conn.execute(text(
+            "INSERT INTO plant_search_fts(rowid, plant_id, kind, name) "
+            "SELECT 2 * id, id, 'scientific_name', scientific_name FROM plants "
+            "UNION ALL SELECT 2 * id + 1, id, 'family', family FROM plants "
+            "UNION ALL SELECT -id, plant_id, 'common_name', name FROM plant_common_names"
+        ))
+
+
+def user_plants_indexes(conn: Connection) -> None:
+    """Composite indexes on user_plants for existing databases (create_all skips existing tables)."""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_user_plants_user_id_date ON user_plants (user_id, date)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_user_plants_user_id_plant_id ON user_plants (user_id, plant_id)"))
+
+
+# scope -> table whose writes bump catalog_versions.version
+CATALOG_SCOPES = {"plants": "plants", "recipes": "recipes"}
+
+
+def image_uploads(conn: Connection) -> None:
+    """
+    Backfill image_uploads from existing sightings. Keys could be attached to any sighting
+    before uploads were recorded, so only the user of the earliest sighting carrying a key
+    (the scan that uploaded it) is granted it. `image` used to be free text set by clients:
+    values that are not store keys were never uploads and are skipped.
+    """
+    ImageUpload.__table__.create(conn, checkfirst=True)
+    rows = conn.execute(text(
+        "SELECT up.user_id, up.image, up.date FROM user_plants up "
+        "WHERE length(up.image) = 64 "
+        "AND up.id = (SELECT MIN(earliest.id) FROM user_plants earliest WHERE earliest.image = up.image)"
+    )).all()
+    grants = [
+        {"user_id": user_id, "key": key, "created_at": created_at}
+        for user_id, key, created_at in rows if is_valid_key(key)
+    ]
+    if grants:
+        conn.execute(text(
+            "INSERT INTO image_uploads (user_id, key, created_at) VALUES (:user_id, :key, :created_at) "
+            "ON CONFLICT DO NOTHING"
+        ), grants)
+
+
+def user_plants_images(conn: Connection) -> None:
+    """user_plants.images: every photo of a sighting; existing rows get their single image."""
+    if "images" not in {column["name"] for column in inspect(conn).get_columns("user_plants")}:
+        conn.execute(text("ALTER TABLE user_plants ADD COLUMN images JSON"))
+    array = "json_build_array" if conn.dialect.name == "postgresql" else "json_array"
+    conn.execute(text(f"UPDATE user_plants SET images = {array}(image) WHERE image IS NOT NULL AND images IS NULL"))
+
+
+def catalog_versions(conn: Connection) -> None:
+    """Version counters behind the catalog ETags, kept current by triggers on every write path."""
+    for scope in CATALOG_SCOPES:
+        conn.execute(
+            text("INSERT INTO catalog_versions (scope, version) "
+                 "SELECT :scope, 0 WHERE NOT EXISTS (SELECT 1 FROM catalog_versions WHERE scope = :scope)"),
+            {"scope": scope},
+        )
+    if conn.dialect.name == "postgresql":
+        # Statement-level, so a bulk import bumps the counter once per statement, not per row.
+        conn.execute(text(
+            "CREATE OR REPLACE FUNCTION bump_catalog_version() RETURNS trigger AS $$ BEGIN "
+            "UPDATE catalog_versions SET version = version + 1 WHERE scope = TG_ARGV[0]; "
+            "RETURN NULL; END $$ LANGUAGE plpgsql"
+        ))
+        for scope, table in CATALOG_SCOPES.items():
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_catalog_version ON {table}"))
+            conn.execute(text(
+                f"CREATE TRIGGER {table}_catalog_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE "
+                f"ON {table} FOR EACH STATEMENT EXECUTE PROCEDURE bump_catalog_version('{scope}')"
+            ))
+    elif conn.dialect.name == "sqlite":
+        for scope, table in CATALOG_SCOPES.items():
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                conn.execute(text(
+                    f"CREATE TRIGGER IF NOT EXISTS {table}_catalog_version_{event.lower()} AFTER {event} ON {table} "
+                    f"BEGIN UPDATE catalog_versions SET version = version + 1 WHERE scope = '{scope}'; END"
+                ))
+
+
+MIGRATIONS = [
+    ("0001_edible_parts_array", edible_parts_to_array),
+    ("0002_plant_search", plant_search_indexes),
+    ("0003_user_plants_indexes", user_plants_indexes),
+    ("0004_catalog_versions", catalog_versions),
+    ("0005_image_uploads", image_uploads),
+    ("0006_user_plants_images", user_plants_images),
+]
+
+
+def run_migrations(engine: Engine) -> list:
+    """Apply pending migrations in order; returns the names applied."""
+    applied_now = []
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Several workers may boot at once; only one migrates.
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('schema_migrations'))"))
+        _metadata.create_all(conn)
+        applied = set(conn.execute(select(schema_migrations.c.name)).scalars())
+        for name, migrate in MIGRATIONS:
+            if name in applied:
+                continue
+            logger.info("Applying migration %s", name)
+            migrate(conn)
+            conn.execute(schema_migrations.insert().values(name=name, applied_at=datetime.utcnow()))
+            applied_now.append(name)
+    return applied_now
+
+
+def init_schema(engine: Engine, reset: bool = False) -> list:
+    """
+    Create missing tables, then apply pending migrations; returns the migrations applied.
+    `reset` drops every table first, destroying all data.
+    """
+    if reset:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    return run_migrations(engine)
@@ -1,5 +1,6 @@
 # app/database/models.py
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, BigInteger, Integer, String, Boolean, ForeignKey, DateTime, JSON, LargeBinary, Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship
 from app.database.database import Base
 from datetime import datetime
@@ -20,11 +21,31 @@ class Plant(Base):
     family = Column(String, index=True, nullable=False)
     is_edible = Column(Boolean, index=True, nullable=False)
     # Optional fields (can be null)
-    edible_parts = Column(String, nullable=True)  # Stored as a comma-separated string.
+    # Postgres text[] (JSON array on SQLite for local runs); always lower-cased, [] when unknown.
+    edible_parts = Column(ARRAY(String).with_variant(JSON(), "sqlite"), nullable=True)
     safety = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     users = relationship("UserPlant", back_populates="plant")
+    common_names = relationship(
+        "PlantCommonName", back_populates="plant", cascade="all, delete-orphan", passive_deletes=True
+    )
+
+    __table_args__ = (
+        # Serves `edible_parts @> ARRAY[...]` containment filters.
+        Index("ix_plants_edible_parts", "edible_parts", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
+
+
+class PlantCommonName(Base):
+    __tablename__ = "plant_common_names"
+    id = Column(Integer, primary_key=True)
+    plant_id = Column(Integer, ForeignKey("plants.id", ondelete="CASCADE"), nullable=False, index=True)
+    name = Column(String, nullable=False)  # As reported by PlantNet, e.g. "Stinging nettle"
+
+    plant = relationship("Plant", back_populates="common_names")
+
+    __table_args__ = (UniqueConstraint("plant_id", "name", name="uq_plant_common_names_plant_name"),)
 
 
 class Recipe(Base):
@@ -34,14 +55,74 @@ class Recipe(Base):
     content = Column(String, unique=True, index=True, nullable=False)
 
 
+class CatalogVersion(Base):
+    __tablename__ = "catalog_versions"
+    scope = Column(String, primary_key=True)  # "plants" or "recipes"
+    version = Column(BigInteger, nullable=False, default=0)  # Bumped by triggers on every write
+
+
 class UserPlant(Base):
     __tablename__ = "user_plants"
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     plant_id = Column(Integer, ForeignKey("plants.id"), nullable=False)
-    image = Column(String, nullable=True)  # Ignored for now (set to null)
+    image = Column(String, nullable=True)  # Cover photo: content key in the image store (app/services/image_store.py)
+    images = Column(JSON, nullable=True)  # Keys of every photo of the sighting, in upload order
     date = Column(DateTime, default=datetime.utcnow)
     description = Column(String, nullable=True)
 
     user = relationship("User", back_populates="plants")
     plant = relationship("Plant", back_populates="users")
+
+    __table_args__ = (
+        # "My sightings" keyset paging, and the duplicate check in create_user_plant.
+        Index("ix_user_plants_user_id_date", "user_id", "date"),
+        Index("ix_user_plants_user_id_plant_id", "user_id", "plant_id"),
+    )
+
+
+class ImageUpload(Base):
+    """
+    Who uploaded an image-store key. The store is shared and deduplicated, so access to a
+    key (GET /images/{key}, attaching it to a sighting) is granted per uploader.
+    """
+    __tablename__ = "image_uploads"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    key = Column(String(64), primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class IdentificationCacheEntry(Base):
+    __tablename__ = "identification_cache"
+    key = Column(String(64), primary_key=True)  # SHA-256 of image bytes + organs
+    response = Column(JSON, nullable=False)  # Parsed PlantNet response
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class ScanJob(Base):
+    __tablename__ = "scan_jobs"
+    id = Column(String(36), primary_key=True)  # UUID4
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    status = Column(String, nullable=False, index=True, default="queued")  # queued, running, succeeded, failed
+    organs = Column(JSON, nullable=False)
+    result = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    not_before = Column(DateTime, nullable=True)  # A retried job is not claimed again before this
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    images = relationship(
+        "ScanJobImage", back_populates="job", cascade="all, delete-orphan", order_by="ScanJobImage.position"
+    )
+
+
+class ScanJobImage(Base):
+    __tablename__ = "scan_job_images"
+    id = Column(Integer, primary_key=True)
+    job_id = Column(String(36), ForeignKey("scan_jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    position = Column(Integer, nullable=False)
+    filename = Column(String, nullable=False)
+    data = Column(LargeBinary, nullable=False)  # Converted JPEG bytes
+
+    job = relationship("ScanJob", back_populates="images")
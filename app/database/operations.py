@@ -1,29 +1,145 @@
 # app/database/operations.py
+import hashlib
+from contextlib import asynccontextmanager
 from typing import Optional, List
-from sqlalchemy.orm import Session
-from app.database.models import Plant
+from sqlalchemy import select, text
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database.database import async_engine
+from app.database.models import ImageUpload, Plant, PlantCommonName
+from app.services.plant_cache import plant_cache, PlantSnapshot
 
-def get_plant_by_scientific_name(db: Session, scientific_name: str):
-    return db.query(Plant).filter(Plant.scientific_name == scientific_name).first()
+async def get_plant_by_scientific_name(db: AsyncSession, scientific_name: str) -> Optional[PlantSnapshot]:
+    # Read-through the in-process catalog cache; returns an immutable snapshot.
+    return await plant_cache.get_by_scientific_name(db, scientific_name)
 
-def add_plant(
-    db: Session,
+def normalize_edible_parts(edible_parts) -> List[str]:
+    # Accepts a list, a comma-separated string or nothing (AI answers vary); stored lower-cased.
+    if isinstance(edible_parts, str):
+        edible_parts = edible_parts.split(",")
+    parts = []
+    for part in edible_parts or []:
+        part = str(part).strip().lower()
+        if part and part not in parts:
+            parts.append(part)
+    return parts
+
+
+def edible_part_filter(db: AsyncSession, part: str) -> ColumnElement:
+    """WHERE clause matching plants with `part` among their edible parts."""
+    part = part.strip().lower()
+    if db.get_bind().dialect.name == "postgresql":
+        return Plant.edible_parts.contains([part])
+    return text(
+        "EXISTS (SELECT 1 FROM json_each(plants.edible_parts) WHERE json_each.value = :edible_part)"
+    ).bindparams(edible_part=part)
+
+
+async def add_plant(
+    db: AsyncSession,
     scientific_name: str,
     family: str,
     is_edible: bool,
     edible_parts: Optional[List[str]] = None,
     safety: Optional[str] = None
 ) -> Plant:
-    # Convert the list of edible_parts into a comma-separated string for storage, if provided.
-    edible_parts_str = ",".join(edible_parts) if edible_parts else None
     new_plant = Plant(
         scientific_name=scientific_name,
         family=family,
         is_edible=is_edible,
-        edible_parts=edible_parts_str,
+        edible_parts=normalize_edible_parts(edible_parts),
         safety=safety
     )
     db.add(new_plant)
-    db.commit()
-    db.refresh(new_plant)
+    await db.commit()
+    await plant_cache.invalidate(new_plant.id, scientific_name)
     return new_plant
+
+
+async def add_plants(db: AsyncSession, plants: List[dict]) -> List[Plant]:
+    """
+    `add_plant` for many rows with a single commit. Rows whose scientific name is already
+    stored are skipped. Each dict takes add_plant's keyword arguments.
+    """
+    names = [plant["scientific_name"] for plant in plants]
+    existing = set(await db.scalars(select(Plant.scientific_name).where(Plant.scientific_name.in_(names))))
+    new_plants = [
+        Plant(
+            scientific_name=plant["scientific_name"],
+            family=plant["family"],
+            is_edible=plant["is_edible"],
+            edible_parts=normalize_edible_parts(plant.get("edible_parts")),
+            safety=plant.get("safety")
+        )
+        for plant in plants
+        if plant["scientific_name"] not in existing
+    ]
+    db.add_all(new_plants)
+    await db.commit()
+    for plant in new_plants:
+        await plant_cache.invalidate(plant.id, plant.scientific_name)
+    return new_plants
+
+
+async def add_common_names(db: AsyncSession, plant_id: int, names: Optional[List[str]]) -> None:
+    """Remember the common names PlantNet reported for a plant; known names are skipped."""
+    rows = [{"plant_id": plant_id, "name": name.strip()} for name in dict.fromkeys(names or []) if name.strip()]
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        known = set(await db.scalars(select(PlantCommonName.name).where(PlantCommonName.plant_id == plant_id)))
+        db.add_all([PlantCommonName(**row) for row in rows if row["name"] not in known])
+        await db.commit()
+        return
+    await db.execute(insert(PlantCommonName).values(rows).on_conflict_do_nothing(
+        index_elements=["plant_id", "name"]
+    ))
+    await db.commit()
+
+
+async def record_image_uploads(db: AsyncSession, user_id: int, keys: List[str]) -> None:
+    """Grant `user_id` the image-store keys it uploaded. Part of the caller's transaction: not committed."""
+    rows = [{"user_id": user_id, "key": key} for key in dict.fromkeys(keys)]
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        known = set(await db.scalars(select(ImageUpload.key).where(
+            ImageUpload.user_id == user_id, ImageUpload.key.in_([row["key"] for row in rows])
+        )))
+        db.add_all([ImageUpload(**row) for row in rows if row["key"] not in known])
+        return
+    await db.execute(insert(ImageUpload).values(rows).on_conflict_do_nothing(index_elements=["user_id", "key"]))
+
+
+async def owns_image(db: AsyncSession, user_id: int, key: str) -> bool:
+    return await db.get(ImageUpload, (user_id, key)) is not None
+
+
+def _lock_id(key: str) -> int:
+    # Postgres advisory locks take a signed 64-bit key.
+    return int.from_bytes(hashlib.sha256(key.encode("utf-8")).digest()[:8], "big", signed=True)
+
+
+@asynccontextmanager
+async def advisory_lock(key: str, enabled: bool = True):
+    """
+    Hold a Postgres transaction-level advisory lock on `key` for the duration of the block,
+    serialising the block across worker processes. No-op on other databases or when disabled.
+    Uses its own connection so commits on other sessions do not release it.
+    """
+    if not enabled or async_engine.dialect.name != "postgresql":
+        yield
+        return
+    async with async_engine.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _lock_id(key)})
+        yield
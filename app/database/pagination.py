@@ -0,0 +1,113 @@
+# app/database/pagination.py
+import base64
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, Response
+from sqlalchemy import Select, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Largest page any list endpoint returns, whatever `limit` the client asks for.
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "100"))
+
+
+def encode_cursor(sort: str, key, row_id: int) -> str:
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    raw = json.dumps({"s": sort, "k": key, "id": row_id}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        if data["s"] != sort:
+            # A cursor is only valid for the sort order it was issued for.
+            raise ValueError(data["s"])
+        return data["k"], int(data["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def exact_count(db: AsyncSession, query: Select) -> int:
+    return await db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+
+
+async def estimated_count(db: AsyncSession, query: Select) -> Optional[int]:
+    """Row estimate from the Postgres planner statistics; None on other databases."""
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    try:
+        # asyncpg takes numbered parameters, so the filter values are inlined for EXPLAIN.
+        compiled = query.order_by(None).compile(dialect=bind.dialect, compile_kwargs={"literal_binds": True})
+    except Exception:
+        return None
+    conn = await db.connection()
+    plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def paginate(
+    db: AsyncSession,
+    query: Select,
+    response: Response,
+    *,
+    id_column,
+    cursor: Optional[str] = None,
+    limit: int = 10,
+    sort: str = "id",
+    sort_column=None,
+    count: Optional[str] = None,
+    skip: int = 0,
+    descending: bool = False,
+) -> list:
+    """
+    Keyset pagination on (sort_column, id), ascending unless `descending`. Returns the page rows and sets
+    X-Next-Cursor (absent on the last page) and, when `count` is requested,
+    X-Total-Count plus X-Count-Method (exact or estimated).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if sort_column is None:
+        sort_column = id_column
+
+    if count == "estimated":
+        total = await estimated_count(db, query)
+        method = "estimated"
+        if total is None:
+            total, method = await exact_count(db, query), "exact"
+        response.headers["X-Total-Count"] = str(total)
+        response.headers["X-Count-Method"] = method
+    elif count == "exact":
+        response.headers["X-Total-Count"] = str(await exact_count(db, query))
+        response.headers["X-Count-Method"] = "exact"
+
+    if cursor:
+        key, last_id = decode_cursor(cursor, sort)
+        if sort_column is id_column:
+            query = query.where(id_column < last_id if descending else id_column > last_id)
+        else:
+            if sort_column.type.python_type is datetime and key is not None:
+                key = datetime.fromisoformat(key)
+            row_key, after = tuple_(sort_column, id_column), tuple_(key, last_id)
+            query = query.where(row_key < after if descending else row_key > after)
+
+    order = [id_column] if sort_column is id_column else [sort_column, id_column]
+    query = query.order_by(*[column.desc() for column in order] if descending else order)
+    if skip and not cursor:
+        # Legacy offset paging: only honoured for the first page.
+        query = query.offset(skip)
+    rows = list((await db.scalars(query.limit(limit + 1))).unique())
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            sort, getattr(last, sort_column.key), getattr(last, id_column.key)
+        )
+    return rows
@@ -1,6 +1,6 @@
 # app/database/schemas.py
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Any, Optional, List
 from datetime import datetime
 
 class UserCreate(BaseModel):
@@ -39,6 +39,11 @@ class PlantResponse(BaseModel):
         from_attributes = True
 
 
+class PlantSearchResult(PlantResponse):
+    score: float
+    common_names: List[str] = []
+
+
 class UserPlantCreate(BaseModel):
     user_id: int
     plant_id: int
@@ -52,6 +57,7 @@ class UserPlantResponse(BaseModel):
     user_id: int
     plant_id: int
     image: Optional[str]
+    images: Optional[List[str]] = None
     date: datetime
     description: Optional[str]
 
@@ -59,6 +65,23 @@ class UserPlantResponse(BaseModel):
         from_attributes = True
 
 
+class UserPlantWithPlant(UserPlantResponse):
+    plant: PlantResponse
+
+
+class ScanJobResponse(BaseModel):
+    id: str
+    status: str
+    attempts: int
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
 class RecipeCreate(BaseModel):
     name: str
     content: str
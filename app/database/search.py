@@ -0,0 +1,131 @@
+# app/database/search.py
+"""
+Typo-tolerant, prefix-aware plant search over scientific names, families and common names.
+Postgres ranks with pg_trgm word similarity; SQLite narrows candidates with its FTS5
+trigram table and ranks them in Python. Both rely on migration 0002_plant_search.
+"""
+import os
+import re
+from difflib import SequenceMatcher
+from typing import List, Tuple
+
+from sqlalchemy import func, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import Plant, PlantCommonName
+
+# Candidates pulled from the FTS index before ranking (SQLite only).
+PLANT_SEARCH_CANDIDATES = int(os.getenv("PLANT_SEARCH_CANDIDATES", "200"))
+# Matches scoring below this are dropped (SQLite only; Postgres uses pg_trgm's own threshold).
+PLANT_SEARCH_MIN_SCORE = float(os.getenv("PLANT_SEARCH_MIN_SCORE", "0.5"))
+
+# A name that starts with the query outranks any fuzzy match.
+PREFIX_BONUS = 1.0
+
+_PG_SEARCH = text("""
+    SELECT plant_id, max(score) AS score FROM (
+        SELECT id AS plant_id,
+               word_similarity(:q, lower(scientific_name))
+               + CASE WHEN lower(scientific_name) LIKE :prefix THEN :bonus ELSE 0 END AS score
+        FROM plants
+        WHERE :q <% lower(scientific_name) OR lower(scientific_name) LIKE :prefix
+        UNION ALL
+        SELECT id,
+               word_similarity(:q, lower(family))
+               + CASE WHEN lower(family) LIKE :prefix THEN :bonus ELSE 0 END
+        FROM plants
+        WHERE :q <% lower(family) OR lower(family) LIKE :prefix
+        UNION ALL
+        SELECT plant_id,
+               word_similarity(:q, lower(name))
+               + CASE WHEN lower(name) LIKE :prefix THEN :bonus ELSE 0 END
+        FROM plant_common_names
+        WHERE :q <% lower(name) OR lower(name) LIKE :prefix
+    ) AS matches
+    GROUP BY plant_id
+    ORDER BY score DESC, plant_id
+    LIMIT :limit
+""")
+
+_FTS_CANDIDATES = text("""
+    SELECT plant_id, name FROM plant_search_fts
+    WHERE plant_search_fts MATCH :match
+    ORDER BY rank
+    LIMIT :candidates
+""")
+
+_FTS_PREFIX = text("""
+    SELECT plant_id, name FROM plant_search_fts
+    WHERE name LIKE :prefix ESCAPE '\\'
+    LIMIT :candidates
+""")
+
+
+def _like_prefix(q: str) -> str:
+    return re.sub(r"([\\%_])", r"\\\1", q) + "%"
+
+
+def _score(q: str, name: str) -> float:
+    """Best similarity of the query to the whole name or any word in it, plus the prefix bonus."""
+    name = name.lower()
+    words = name.split()
+    best = max(SequenceMatcher(None, q, part).ratio() for part in [name, *words])
+    if name.startswith(q) or any(word.startswith(q) for word in words):
+        best += PREFIX_BONUS
+    return best
+
+
+async def _search_postgres(db: AsyncSession, q: str, limit: int) -> List[Tuple[int, float]]:
+    rows = (await db.execute(
+        _PG_SEARCH, {"q": q, "prefix": _like_prefix(q), "bonus": PREFIX_BONUS, "limit": limit}
+    )).all()
+    return [(plant_id, float(score)) for plant_id, score in rows]
+
+
+async def _search_sqlite(db: AsyncSession, q: str, limit: int) -> List[Tuple[int, float]]:
+    trigrams = {q[i:i + 3] for i in range(len(q) - 2)}
+    if trigrams:
+        # Any shared trigram makes a candidate; that is what lets typos still match.
+        match = " OR ".join('"{}"'.format(t.replace('"', '""')) for t in sorted(trigrams))
+        rows = (await db.execute(_FTS_CANDIDATES, {"match": match, "candidates": PLANT_SEARCH_CANDIDATES})).all()
+    else:
+        rows = (await db.execute(
+            _FTS_PREFIX, {"prefix": _like_prefix(q), "candidates": PLANT_SEARCH_CANDIDATES}
+        )).all()
+
+    scores = {}
+    for plant_id, name in rows:
+        score = _score(q, name)
+        if score >= PLANT_SEARCH_MIN_SCORE and score > scores.get(plant_id, 0.0):
+            scores[plant_id] = score
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+
+
+async def _search_like(db: AsyncSession, q: str, limit: int) -> List[Tuple[int, float]]:
+    pattern = f"%{q}%"
+    rows = await db.scalars(
+        select(Plant.id)
+        .outerjoin(PlantCommonName, PlantCommonName.plant_id == Plant.id)
+        .where(or_(
+            func.lower(Plant.scientific_name).like(pattern),
+            func.lower(Plant.family).like(pattern),
+            func.lower(PlantCommonName.name).like(pattern),
+        ))
+        .distinct()
+        .order_by(Plant.id)
+        .limit(limit)
+    )
+    return [(plant_id, 1.0) for plant_id in rows]
+
+
+async def search_plants(db: AsyncSession, q: str, limit: int = 10) -> List[Tuple[int, float]]:
+    """Return up to `limit` (plant_id, score) pairs, best match first."""
+    q = " ".join(q.lower().split())
+    if not q:
+        return []
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return await _search_postgres(db, q, limit)
+    if dialect == "sqlite":
+        return await _search_sqlite(db, q, limit)
+    return await _search_like(db, q, limit)
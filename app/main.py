@@ -1,11 +1,13 @@
 import os
 import logging
-from dotenv import load_dotenv
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.database.database import engine, Base
+from app.core.metrics import CONTENT_TYPE, METRICS_ENABLED, REGISTRY, MetricsMiddleware
+from app.core.tracing import TracingMiddleware, configure_logging, shutdown_tracing
+from app.database.database import async_engine, engine
+from app.database.migrations import init_schema
 
 from app.api.routers import (
     plant_routes,
@@ -15,18 +17,25 @@ from app.api.routers import (
     recipe_routes,
     identify_routes,
     scan_routes,
+    image_routes,
 )
 # ← NEW: import your image-conversion router
 from app.api.routers.image_convert_routes import router as image_convert_router
+from app.services.plantnet_client import plantnet_client
+from app.services.image_engine import shutdown_executor
+from app.services import password_hasher
+from app.services.uploads import UploadLimitMiddleware
+from app.services.scan_jobs import scan_job_workers
+from app.services.resilience import upstream_states
+from app.services.plant_cache import plant_cache
 
-load_dotenv()
+# Serverless instances (api/index.py) skip schema work at boot: it would run on every
+# cold start. Run `python -m app.commands.migrate` on deploy instead.
+SERVERLESS = os.getenv("SERVERLESS", "false").lower() == "true"
 
-# WARNING: Do not drop tables in production!
-if os.getenv("RUN_DB_INIT", "false").lower() == "true":
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
-else:
-    Base.metadata.create_all(bind=engine)
+if not SERVERLESS:
+    # WARNING: Do not drop tables in production!
+    init_schema(engine, reset=os.getenv("RUN_DB_INIT", "false").lower() == "true")
 
 tags_metadata = [
     {"name": "Users", "description": "CRUD Operations related to users."},
@@ -37,14 +46,24 @@ tags_metadata = [
     {"name": "Auth", "description": "Auth related Operations"},
 ]
 
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("FastAPI is starting up...")
+    await plantnet_client.start()
+    scan_job_workers.start(scan_routes.process_scan_job)
+    plant_cache.start_listener()
     yield
     logger.info("FastAPI is shutting down...")
+    await scan_job_workers.stop()
+    plant_cache.stop_listener()
+    await plantnet_client.close()
+    shutdown_executor()
+    password_hasher.shutdown_executor()
+    await async_engine.dispose()
+    shutdown_tracing()
 
 app = FastAPI(openapi_tags=tags_metadata, lifespan=lifespan)
 
@@ -64,6 +83,10 @@ app = FastAPI(openapi_tags=tags_metadata, lifespan=lifespan)
 #     expose_headers=["*"],
 # )
 
+# Cap upload request bodies while they stream in, before multipart parsing buffers them.
+# Added before CORS so CORS wraps it: browsers can only read a 413 that carries CORS headers.
+app.add_middleware(UploadLimitMiddleware)
+
 # Correct CORS setup — only one allow_origins, include all your front-end URLs (and localhost for testing)
 app.add_middleware(
     CORSMiddleware,
@@ -78,10 +101,26 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Added last so it wraps everything and also times rejected requests.
+app.add_middleware(MetricsMiddleware)
+# Outermost: the request id is bound before anything else runs, including metrics.
+app.add_middleware(TracingMiddleware)
+
 @app.get("/")
 def healthcheck():
     return "FastAPI is up and running!"
 
+# Circuit breaker state of each external API (PlantNet, OpenAI), for dashboards and probes.
+@app.get("/health/upstreams")
+def upstream_health():
+    return upstream_states()
+
+# Prometheus scrape endpoint; keep it reachable from the monitoring network only.
+if METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 # API routes
 app.include_router(identify_routes.router, prefix="/identify", tags=["Identify"])
 app.include_router(scan_routes.router,      prefix="/scan",     tags=["Scan"])
@@ -91,3 +130,4 @@ app.include_router(user_routes.router,      prefix="/users",    tags=["Users"])
 app.include_router(user_plants_routes.router, prefix="/user_plants", tags=["User-Plants"])
 app.include_router(recipe_routes.router,    prefix="/recipes",  tags=["Recipes"])
 app.include_router(auth.router,             prefix="/auth",     tags=["Auth"])
+app.include_router(image_routes.router,     prefix="/images",   tags=["Images"])
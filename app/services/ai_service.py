@@ -1,12 +1,67 @@
 # app/services/ai_service.py
 import os
 import json
+import logging
 import re
-from dotenv import load_dotenv
-from openai import OpenAI
+import threading
+import httpx
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from app.core.metrics import track_external
+from app.core.tracing import CLIENT, debug, span
+from app.services.resilience import CircuitOpenError, Upstream
+
+logger = logging.getLogger(__name__)
+# Point at a compatible server (e.g. stubs/openai_stub.py) instead of api.openai.com.
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+# Seconds to connect, and to wait for each read once connected (completions can be slow).
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+# Extra attempts after a timeout, connection error, 429 or 5xx.
+OPENAI_RETRIES = int(os.getenv("OPENAI_RETRIES", "2"))
+OPENAI_BREAKER_THRESHOLD = int(os.getenv("OPENAI_BREAKER_THRESHOLD", "5"))
+OPENAI_BREAKER_RESET = float(os.getenv("OPENAI_BREAKER_RESET", "60"))
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    The shared OpenAI client, created on first use. Importing the SDK is the largest
+    part of a cold start, so processes that never call OpenAI never pay for it.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                # Retries are ours (with jitter and the breaker), not the SDK's.
+                _client = OpenAI(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    base_url=OPENAI_BASE_URL,
+                    timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+                    max_retries=0,
+                )
+    return _client
+
+
+def _retryable(exc: BaseException) -> bool:
+    import openai  # Already loaded: only OpenAI calls raise here.
+    # APITimeoutError is an APIConnectionError; InternalServerError covers every 5xx.
+    return isinstance(exc, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError))
+
+
+openai_upstream = Upstream(
+    "openai", _retryable, retries=OPENAI_RETRIES,
+    failure_threshold=OPENAI_BREAKER_THRESHOLD, reset_timeout=OPENAI_BREAKER_RESET,
+)
+
+
+def _create_completion(**kwargs):
+    def attempt():
+        with track_external("openai"):
+            return get_client().chat.completions.create(**kwargs)
+    return openai_upstream.call_sync(attempt)
 
 def get_plant_edibility(scientific_name: str) -> dict:
     prompt = (
@@ -34,18 +89,21 @@ def get_plant_edibility(scientific_name: str) -> dict:
     ]
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4-0613",
-            messages=messages,
-            functions=functions,
-            function_call="auto"
-        )
+        with span("openai.chat.completions", kind=CLIENT, model="gpt-4-0613"):
+            response = _create_completion(
+                model="gpt-4-0613",
+                messages=messages,
+                functions=functions,
+                function_call="auto"
+            )
         function_response = response.choices[0].message.function_call
         if function_response:
             arguments = json.loads(function_response.arguments)
             return arguments.get('is_edible')
         else:
             raise Exception("No function call returned from the API response.")
+    except CircuitOpenError:
+        raise
     except Exception as e:
         raise Exception(f"Error when calling OpenAI API: {e}")
 
@@ -77,6 +135,10 @@ def get_detailed_plant_info(scientific_name: str) -> dict:
                     "safety": {
                         "type": "string",
                         "description": "Preparation and safety considerations for consuming the plant."
+                    },
+                    "family": {
+                        "type": "string",
+                        "description": "Botanical family of the plant."
                     }
                 },
                 "required": ["edible", "edible_parts", "safety"]
@@ -85,25 +147,25 @@ def get_detailed_plant_info(scientific_name: str) -> dict:
     ]
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4-0613",
-            messages=messages,
-            functions=functions,
-            function_call="auto"
-        )
+        with span("openai.chat.completions", kind=CLIENT, model="gpt-4-0613", scientific_name=scientific_name):
+            response = _create_completion(
+                model="gpt-4-0613",
+                messages=messages,
+                functions=functions,
+                function_call="auto"
+            )
         message = response.choices[0].message
 
         if message.function_call:
-            print("[AI] Got function_call")
             try:
                 arguments = json.loads(message.function_call.arguments)
-                print("[AI] Parsed function_call JSON:", arguments)
+                debug("openai.function_call", arguments=arguments)
                 return arguments
             except Exception as e:
                 raise Exception(f"[AI] Failed to parse function_call JSON: {e}")
 
         elif message.content:
-            print("[AI] Got content:", message.content)
+            debug("openai.content", content=message.content)
             try:
                 return json.loads(message.content)
             except json.JSONDecodeError:
@@ -113,7 +175,7 @@ def get_detailed_plant_info(scientific_name: str) -> dict:
                 json_str = json_match.group(0)
                 try:
                     arguments = json.loads(json_str)
-                    print("[AI] Parsed extracted JSON:", arguments)
+                    debug("openai.extracted_json", arguments=arguments)
                     return arguments
                 except json.JSONDecodeError as je:
                     raise Exception(f"[AI] Failed to parse extracted JSON: {je}")
@@ -123,6 +185,8 @@ def get_detailed_plant_info(scientific_name: str) -> dict:
         else:
             raise Exception("[AI] OpenAI response had no function_call and no content")
 
+    except CircuitOpenError:
+        raise
     except Exception as e:
-        print("[get_detailed_plant_info] ERROR:", e)
+        logger.warning("OpenAI plant info for %s failed: %s", scientific_name, e)
         raise Exception(f"Error when calling OpenAI API: {e}")
@@ -0,0 +1,69 @@
+# app/services/enrichment.py
+import os
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+
+from app.core.tracing import debug
+from app.database.database import AsyncSessionLocal
+from app.database.operations import get_plant_by_scientific_name, add_plant, advisory_lock, normalize_edible_parts
+from app.services import ai_service
+from app.services.singleflight import SingleFlight
+
+# Serialise enrichment of a species across worker processes with a Postgres advisory lock.
+ENRICH_ADVISORY_LOCK = os.getenv("ENRICH_ADVISORY_LOCK", "false").lower() == "true"
+
+enrichment_flight = SingleFlight()
+
+
+def edible_flag(scientific_name: str, ai_response) -> bool:
+    """
+    The AI answer's `edible`. Anything but a real boolean is refused: is_edible is
+    NOT NULL, and a guess would be stored for good.
+    """
+    is_edible = ai_response.get("edible") if isinstance(ai_response, dict) else None
+    if not isinstance(is_edible, bool):
+        raise ValueError(f"AI response for {scientific_name} has no boolean 'edible'")
+    return is_edible
+
+
+async def _enrich_and_store(scientific_name: str, family_name: str) -> int:
+    async with AsyncSessionLocal() as db:
+        async with advisory_lock(f"enrich:{scientific_name}", enabled=ENRICH_ADVISORY_LOCK):
+            # Another worker may have stored the plant while we waited for the lock.
+            plant = await get_plant_by_scientific_name(db, scientific_name)
+            if plant:
+                return plant.id
+
+            # The OpenAI client is synchronous: keep it off the event loop.
+            ai_response = await run_in_threadpool(ai_service.get_detailed_plant_info, scientific_name)
+            debug("enrich.ai_response", scientific_name=scientific_name, response=ai_response)
+            is_edible = edible_flag(scientific_name, ai_response)
+            try:
+                plant = await add_plant(
+                    db=db,
+                    scientific_name=scientific_name,
+                    family=family_name,
+                    is_edible=is_edible,
+                    edible_parts=normalize_edible_parts(ai_response.get("edible_parts")),
+                    safety=ai_response.get("safety")
+                )
+            except IntegrityError:
+                await db.rollback()
+                # Lost the race on the unique scientific_name: use the winner's row.
+                plant = await get_plant_by_scientific_name(db, scientific_name)
+                if plant is None:
+                    raise  # Not a race: the row itself was rejected (e.g. no family).
+            debug("enrich.stored", plant_id=plant.id)
+            return plant.id
+
+
+async def enrich_plant(scientific_name: str, family_name: str) -> int:
+    """
+    Fetch AI details for a species missing from `plants`, store it and return its id.
+    Concurrent calls for the same species share a single OpenAI call.
+    """
+    return await enrichment_flight.do(
+        scientific_name,
+        lambda: _enrich_and_store(scientific_name, family_name),
+    )
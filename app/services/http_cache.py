@@ -0,0 +1,88 @@
+# app/services/http_cache.py
+"""
+Conditional GET (ETag / If-None-Match) and Cache-Control for catalog reads.
+
+`catalog_versions` holds one counter per scope (plants, recipes), bumped by database
+triggers on every write to the scope's table (migration 0004_catalog_versions), so all
+workers and write paths (API, bulk import, enrich_catalog) agree on it. An ETag is
+that counter plus a digest of the request path and query; when If-None-Match matches,
+the dependency answers 304 before the endpoint runs a single query.
+
+Each worker remembers a scope's version for CATALOG_VERSION_TTL seconds, so a 304 may
+lag a write by at most that long. The default Cache-Control keeps responses out of
+shared caches because these endpoints require a login; set CATALOG_CACHE_CONTROL to
+e.g. "public, max-age=60, s-maxage=300, stale-while-revalidate=60" to let a CDN serve
+the catalog (to anyone who has the URL).
+"""
+import hashlib
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.database import get_db
+
+CATALOG_CACHE_CONTROL = os.getenv("CATALOG_CACHE_CONTROL", "private, no-cache")
+CATALOG_VERSION_TTL = float(os.getenv("CATALOG_VERSION_TTL", "1.0"))
+
+# Dialects where migration 0004 installs the version triggers.
+_VERSIONED_DIALECTS = ("postgresql", "sqlite")
+_VERSION = text("SELECT version FROM catalog_versions WHERE scope = :scope")
+
+# scope -> (expires at, version)
+_versions: Dict[str, Tuple[float, Optional[int]]] = {}
+
+
+async def catalog_version(db: AsyncSession, scope: str) -> Optional[int]:
+    """The scope's current version, or None when versions are not maintained (no ETags then)."""
+    now = time.monotonic()
+    cached = _versions.get(scope)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    version = None
+    if db.get_bind().dialect.name in _VERSIONED_DIALECTS:
+        version = await db.scalar(_VERSION, {"scope": scope})
+    _versions[scope] = (now + CATALOG_VERSION_TTL, version)
+    return version
+
+
+def make_etag(scope: str, version: int, path: str, query: str) -> str:
+    # Parameter order does not change the response, so it does not change the tag either.
+    canonical = "&".join(sorted(part for part in query.split("&") if part))
+    digest = hashlib.blake2b(f"{path}?{canonical}".encode(), digest_size=8).hexdigest()
+    return f'"{scope}-{version}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/"x" matches "x"."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def conditional_get(scope: str):
+    """
+    Route dependency: sets ETag and Cache-Control on the response, or ends the
+    request with 304 Not Modified when the client's copy is current. Returns the
+    version the ETag was made from, so endpoints reading through a cache can make
+    sure their body is at least that recent.
+    """
+    async def dependency(request: Request, response: Response, db: AsyncSession = Depends(get_db)) -> Optional[int]:
+        version = await catalog_version(db, scope)
+        if version is None:
+            return None
+        headers = {
+            "ETag": make_etag(scope, version, request.url.path, request.url.query),
+            "Cache-Control": CATALOG_CACHE_CONTROL,
+        }
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return version
+
+    return dependency
@@ -0,0 +1,153 @@
+# app/services/identification_cache.py
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence
+
+from sqlalchemy import delete
+
+from app.core.metrics import register_cache
+from app.database.database import AsyncSessionLocal
+from app.database.models import IdentificationCacheEntry
+
+logger = logging.getLogger(__name__)
+
+# How long a PlantNet response stays valid, in seconds (default 1 day).
+IDENTIFY_CACHE_TTL = int(os.getenv("IDENTIFY_CACHE_TTL", "86400"))
+# Expired responses stay in memory this much longer, served only while PlantNet is unavailable.
+IDENTIFY_CACHE_STALE_TTL = int(os.getenv("IDENTIFY_CACHE_STALE_TTL", "604800"))
+# Maximum number of responses kept in memory per worker.
+IDENTIFY_CACHE_MAX_ENTRIES = int(os.getenv("IDENTIFY_CACHE_MAX_ENTRIES", "1024"))
+# Also store responses in the identification_cache table so they survive restarts.
+IDENTIFY_CACHE_PERSIST = os.getenv("IDENTIFY_CACHE_PERSIST", "false").lower() == "true"
+
+
+def make_cache_key(images: Sequence[bytes], organs: List[str]) -> str:
+    """
+    Content-addressed key: SHA-256 over the digest of every image
+    (in upload order) followed by the organs list.
+    """
+    h = hashlib.sha256()
+    for data in images:
+        h.update(hashlib.sha256(data).digest())
+    h.update(b"\x00")
+    h.update("\x1f".join(organs).encode("utf-8"))
+    return h.hexdigest()
+
+
+class IdentificationCache:
+    """
+    TTL + LRU cache of parsed PlantNet responses, optionally backed by Postgres.
+    """
+    def __init__(self, ttl: int = IDENTIFY_CACHE_TTL, max_entries: int = IDENTIFY_CACHE_MAX_ENTRIES,
+                 persist: bool = IDENTIFY_CACHE_PERSIST):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.persist = persist
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.persistent_hits = 0
+        self.stale_hits = 0
+
+    def _get_local(self, key: str, allow_stale: bool = False) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            now = time.monotonic()
+            if expires_at + IDENTIFY_CACHE_STALE_TTL < now:
+                del self._entries[key]
+                return None
+            if expires_at < now and not allow_stale:
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set_local(self, key: str, value: dict, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (ttl if ttl is not None else self.ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def _load_persistent(self, key: str) -> Optional[tuple]:
+        async with AsyncSessionLocal() as db:
+            entry = await db.get(IdentificationCacheEntry, key)
+            if entry is None:
+                return None
+            age = (datetime.utcnow() - entry.created_at).total_seconds()
+            if age >= self.ttl:
+                await db.delete(entry)
+                await db.commit()
+                return None
+            return entry.response, self.ttl - age
+
+    async def _store_persistent(self, key: str, value: dict) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.merge(IdentificationCacheEntry(key=key, response=value, created_at=datetime.utcnow()))
+            await db.execute(delete(IdentificationCacheEntry).where(
+                IdentificationCacheEntry.created_at < datetime.utcnow() - timedelta(seconds=self.ttl)
+            ))
+            await db.commit()
+
+    async def get(self, key: str) -> Optional[dict]:
+        value = self._get_local(key)
+        if value is None and self.persist:
+            try:
+                loaded = await self._load_persistent(key)
+            except Exception as e:
+                logger.warning("Identification cache lookup failed: %s", e)
+                loaded = None
+            if loaded is not None:
+                value, remaining = loaded
+                self._set_local(key, value, ttl=remaining)
+                self.persistent_hits += 1
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def get_stale(self, key: str) -> Optional[dict]:
+        """A response past its TTL (but within the stale window), for when PlantNet cannot be reached."""
+        value = self._get_local(key, allow_stale=True)
+        if value is not None:
+            self.stale_hits += 1
+        return value
+
+    async def set(self, key: str, value: dict) -> None:
+        self._set_local(key, value)
+        if self.persist:
+            try:
+                await self._store_persistent(key, value)
+            except Exception as e:
+                logger.warning("Identification cache store failed: %s", e)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "persistent_hits": self.persistent_hits,
+            "stale_hits": self.stale_hits,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "persistent": self.persist,
+        }
+
+
+identification_cache = IdentificationCache()
+register_cache("identification", identification_cache.stats)
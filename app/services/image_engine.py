@@ -0,0 +1,110 @@
+# app/services/image_engine.py
+import asyncio
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from io import BytesIO
+from time import perf_counter
+from typing import Optional, Tuple
+
+
+from app.core.metrics import IMAGE_CONVERSION_DURATION
+
+logger = logging.getLogger(__name__)
+
+# Longest edge sent to PlantNet; larger photos are downscaled while decoding.
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1280"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+# Size of the conversion process pool. 0 runs conversions in the default thread pool instead.
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_executor: Optional[Executor] = None
+
+
+def convert_to_jpeg(raw: bytes, max_edge: int = IMAGE_MAX_EDGE,
+                    quality: int = IMAGE_JPEG_QUALITY) -> Tuple[bytes, dict]:
+    """
+    Decode, downscale to `max_edge` and re-encode as RGB JPEG.
+    Runs inside the worker pool; returns the JPEG bytes and per-step timings in ms.
+    """
+    # PIL is imported where it is used, in the workers, to keep it out of the server's cold start.
+    from PIL import Image
+
+    start = perf_counter()
+    img = Image.open(BytesIO(raw))
+    original_size = img.size
+    if max_edge and img.format == "JPEG":
+        # Let libjpeg decode at 1/2, 1/4 or 1/8 scale instead of full resolution.
+        img.draft("RGB", (max_edge, max_edge))
+    img.load()
+    decoded = perf_counter()
+
+    if max_edge and max(img.size) > max_edge:
+        factor = max(img.size) // max_edge
+        if factor >= 2:
+            img = img.reduce(factor)
+        if max(img.size) > max_edge:
+            img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    resized = perf_counter()
+
+    buf = BytesIO()
+    img.save(buf, format="JPEG", quality=quality)
+    jpeg_bytes = buf.getvalue()
+    encoded = perf_counter()
+
+    timings = {
+        "decode_ms": round((decoded - start) * 1000, 2),
+        "resize_ms": round((resized - decoded) * 1000, 2),
+        "encode_ms": round((encoded - resized) * 1000, 2),
+        "total_ms": round((encoded - start) * 1000, 2),
+        "original_size": list(original_size),
+        "size": list(img.size),
+        "bytes": len(jpeg_bytes),
+    }
+    return jpeg_bytes, timings
+
+
+def render_thumbnail(data: bytes, width: int, fmt: str, quality: int) -> bytes:
+    """Scale a stored JPEG down to `width` pixels wide (never up) and encode it as `fmt` (a PIL format)."""
+    from PIL import Image
+
+    img = Image.open(BytesIO(data))
+    if img.width > width:
+        size = (width, max(1, round(img.height * width / img.width)))
+        img.draft("RGB", size)
+        img = img.resize(size, Image.LANCZOS)
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    buf = BytesIO()
+    img.save(buf, format=fmt, quality=quality)
+    return buf.getvalue()
+
+
+def get_executor() -> Optional[Executor]:
+    global _executor
+    if _executor is None and IMAGE_WORKERS > 0:
+        _executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+        logger.info("Image conversion pool started with %d workers", IMAGE_WORKERS)
+    return _executor
+
+
+async def run_in_image_pool(fn, *args):
+    """Run a picklable function in the image worker pool (or the default executor)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), fn, *args)
+
+
+async def convert_image(raw: bytes) -> Tuple[bytes, dict]:
+    data, timings = await run_in_image_pool(convert_to_jpeg, raw, IMAGE_MAX_EDGE, IMAGE_JPEG_QUALITY)
+    for phase in ("decode", "resize", "encode"):
+        IMAGE_CONVERSION_DURATION.observe(timings[f"{phase}_ms"] / 1000, phase)
+    return data, timings
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
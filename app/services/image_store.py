@@ -0,0 +1,108 @@
+# app/services/image_store.py
+"""
+Content-addressed storage for sighting photos.
+
+An image's key is the SHA-256 of its bytes, so identical uploads are stored once and a
+key never changes meaning (its responses can be cached forever). The local backend
+keeps files under IMAGE_STORE_DIR/ab/cd/<key>.jpg. Other backends (object storage)
+plug in through IMAGE_STORE_BACKEND="package.module:ClassName"; a backend without local
+files returns None from `local_path` and is served from `get` instead.
+"""
+import hashlib
+import importlib
+from abc import ABC, abstractmethod
+import os
+import re
+import tempfile
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+# "local" or "package.module:ClassName" for a custom ImageStore subclass.
+IMAGE_STORE_BACKEND = os.getenv("IMAGE_STORE_BACKEND", "local")
+# Root of the local backend; must be writable (on Vercel, somewhere under /tmp).
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", "data/images")
+
+_KEY = re.compile(r"^[0-9a-f]{64}$")
+
+
+def image_key(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def is_valid_key(key: str) -> bool:
+    return bool(_KEY.match(key))
+
+
+class ImageStore(ABC):
+    """Interface of an image backend; keys are always `image_key(data)`."""
+    @abstractmethod
+    async def put(self, data: bytes) -> str:
+        ...
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        ...
+
+    def local_path(self, key: str) -> Optional[str]:
+        """A file that can be sent as-is, or None when the backend keeps no local files."""
+        return None
+
+
+class LocalImageStore(ImageStore):
+    def __init__(self, root: str = IMAGE_STORE_DIR):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], f"{key}.jpg")
+
+    def _write(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        if os.path.exists(path):
+            return  # Already stored: content-addressed, so it is the same bytes.
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write then rename, so readers never see a partial file and racing writers are harmless.
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    async def put(self, data: bytes) -> str:
+        key = image_key(data)
+        await run_in_threadpool(self._write, key, data)
+        return key
+
+    def _read(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await run_in_threadpool(self._read, key)
+
+    async def exists(self, key: str) -> bool:
+        return await run_in_threadpool(os.path.exists, self._path(key))
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self._path(key)
+
+
+def _load_backend(spec: str) -> ImageStore:
+    if spec == "local":
+        return LocalImageStore()
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)()
+
+
+image_store = _load_backend(IMAGE_STORE_BACKEND)
@@ -0,0 +1,97 @@
+# app/services/password_hasher.py
+import asyncio
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+from app.core.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# bcrypt cost factor. Changing it makes existing hashes get upgraded on next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Dedicated workers for hashing, separate from the threadpool serving sync endpoints.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+# "process" runs bcrypt outside the GIL-holding server process; "thread" keeps it in-process.
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "process").lower()
+# Hash/verify operations allowed to be queued or running before new ones are refused.
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
+_pwd_context = None
+_executor: Optional[Executor] = None
+_pending = 0
+
+
+def pwd_context():
+    """The passlib context, built on first use (in each hashing worker process too)."""
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+    return _pwd_context
+
+
+def _hash(password: str) -> str:
+    return pwd_context().hash(password)
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return pwd_context().verify(password, hashed_password)
+
+
+def get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        if PASSWORD_HASH_EXECUTOR == "thread":
+            _executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="pwhash")
+        else:
+            _executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+        logger.info("Password hashing pool started (%s, %d workers)", PASSWORD_HASH_EXECUTOR, PASSWORD_HASH_WORKERS)
+    return _executor
+
+
+async def _submit(fn, *args):
+    global _pending
+    if _pending >= PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, please retry shortly.",
+            headers={"Retry-After": "1"},
+        )
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(get_executor(), fn, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _submit(_hash, password)
+
+
+async def verify_password(password: str, hashed_password: str) -> bool:
+    return await _submit(_verify, password, hashed_password)
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True when the hash was made with another scheme or cost factor than the current one."""
+    return pwd_context().needs_update(hashed_password)
+
+
+def pending() -> int:
+    return _pending
+
+
+REGISTRY.register_callback(
+    "password_hash_pending", "Hash/verify operations queued or running.", (), lambda: [((), _pending)]
+)
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
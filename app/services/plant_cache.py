@@ -0,0 +1,209 @@
+# app/services/plant_cache.py
+import json
+import logging
+import os
+import select as _select  # sqlalchemy's `select` is imported below under the plain name
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.metrics import register_cache
+from app.database.database import async_engine, engine
+from app.database.models import Plant
+
+logger = logging.getLogger(__name__)
+
+PLANT_CACHE_TTL = int(os.getenv("PLANT_CACHE_TTL", "300"))
+PLANT_CACHE_MAX_ENTRIES = int(os.getenv("PLANT_CACHE_MAX_ENTRIES", "5000"))
+# Postgres LISTEN/NOTIFY channel used to tell other workers to drop a plant; empty disables it.
+PLANT_CACHE_NOTIFY_CHANNEL = os.getenv("PLANT_CACHE_NOTIFY_CHANNEL", "")
+
+
+@dataclass(frozen=True)
+class PlantSnapshot:
+    """Read-only copy of a Plant row."""
+    id: int
+    scientific_name: str
+    family: str
+    is_edible: bool
+    edible_parts: Tuple[str, ...]
+    safety: Optional[str]
+    created_at: datetime
+
+    @classmethod
+    def from_plant(cls, plant: Plant) -> "PlantSnapshot":
+        return cls(
+            id=plant.id,
+            scientific_name=plant.scientific_name,
+            family=plant.family,
+            is_edible=plant.is_edible,
+            edible_parts=tuple(plant.edible_parts or ()),
+            safety=plant.safety,
+            created_at=plant.created_at,
+        )
+
+
+class PlantCache:
+    """
+    Read-through LRU + TTL cache of plant snapshots, addressable by id and scientific name.
+
+    Readers that know the catalog version (app/services/http_cache.py) pass it in: an entry
+    loaded under an older version is reloaded, so a body never lags the ETag sent with it,
+    even when another worker or process wrote the plant and no notify reached us.
+    """
+    def __init__(self, ttl: int = PLANT_CACHE_TTL, max_entries: int = PLANT_CACHE_MAX_ENTRIES,
+                 channel: str = PLANT_CACHE_NOTIFY_CHANNEL):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.channel = channel
+        self._by_id: "OrderedDict[int, tuple]" = OrderedDict()
+        self._id_by_name: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, plant_id: Optional[int], version: Optional[int] = None) -> Optional[PlantSnapshot]:
+        with self._lock:
+            entry = self._by_id.get(plant_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, snapshot, loaded_at = entry
+            outdated = version is not None and (loaded_at is None or loaded_at < version)
+            if outdated or expires_at <= time.monotonic():
+                self._drop(plant_id)
+                self.misses += 1
+                return None
+            self._by_id.move_to_end(plant_id)
+            self.hits += 1
+            return snapshot
+
+    def _store(self, plant: Plant, version: Optional[int] = None) -> PlantSnapshot:
+        """`version`: the catalog version read before the row was loaded, if known."""
+        snapshot = PlantSnapshot.from_plant(plant)
+        with self._lock:
+            self._drop(snapshot.id)
+            self._by_id[snapshot.id] = (time.monotonic() + self.ttl, snapshot, version)
+            self._id_by_name[snapshot.scientific_name] = snapshot.id
+            while len(self._by_id) > self.max_entries:
+                self._drop(next(iter(self._by_id)))
+        return snapshot
+
+    def _drop(self, plant_id: int) -> None:
+        entry = self._by_id.pop(plant_id, None)
+        if entry is not None and self._id_by_name.get(entry[1].scientific_name) == plant_id:
+            del self._id_by_name[entry[1].scientific_name]
+
+    async def get_by_id(self, db: AsyncSession, plant_id: int,
+                        version: Optional[int] = None) -> Optional[PlantSnapshot]:
+        """`version`: the plants catalog version the caller answers for (e.g. in its ETag)."""
+        snapshot = self._lookup(plant_id, version)
+        if snapshot is not None:
+            return snapshot
+        plant = await db.get(Plant, plant_id)
+        return self._store(plant, version) if plant else None
+
+    async def get_by_scientific_name(self, db: AsyncSession, scientific_name: str) -> Optional[PlantSnapshot]:
+        snapshot = self._lookup(self._id_by_name.get(scientific_name))
+        if snapshot is not None:
+            return snapshot
+        plant = await db.scalar(select(Plant).where(Plant.scientific_name == scientific_name))
+        return self._store(plant) if plant else None
+
+    def invalidate_local(self, plant_id: Optional[int] = None, scientific_name: Optional[str] = None) -> None:
+        with self._lock:
+            if scientific_name is not None and plant_id is None:
+                plant_id = self._id_by_name.get(scientific_name)
+            if plant_id is not None:
+                self._drop(plant_id)
+            if scientific_name is not None:
+                self._id_by_name.pop(scientific_name, None)
+
+    async def invalidate(self, plant_id: Optional[int] = None, scientific_name: Optional[str] = None) -> None:
+        """Drop a plant here and, when a notify channel is configured, in every other worker."""
+        self.invalidate_local(plant_id, scientific_name)
+        await self._notify({"id": plant_id, "name": scientific_name})
+
+    async def invalidate_all(self) -> None:
+        """Drop every plant here and in every other worker, e.g. after a bulk import."""
+        self.clear()
+        await self._notify({"all": True})
+
+    async def _notify(self, message: dict) -> None:
+        if self.channel and async_engine.dialect.name == "postgresql":
+            payload = json.dumps(message)
+            try:
+                async with async_engine.begin() as conn:
+                    await conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                                       {"channel": self.channel, "payload": payload})
+            except Exception as e:
+                logger.warning("Plant cache invalidation notify failed: %s", e)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_id.clear()
+            self._id_by_name.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._by_id),
+        }
+
+    def start_listener(self) -> None:
+        if not self.channel or engine.dialect.name != "postgresql" or self._listener is not None:
+            return
+        self._stop.clear()
+        self._listener = threading.Thread(target=self._listen, name="plant-cache-listener", daemon=True)
+        self._listener.start()
+
+    def stop_listener(self) -> None:
+        if self._listener is None:
+            return
+        self._stop.set()
+        self._listener.join(timeout=10)
+        self._listener = None
+
+    def _listen(self) -> None:
+        while not self._stop.is_set():
+            raw = None
+            try:
+                raw = engine.raw_connection()
+                conn = raw.driver_connection
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                # Anything may have changed while we were not listening.
+                self.clear()
+                while not self._stop.is_set():
+                    if _select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        data = json.loads(notify.payload)
+                        if data.get("all"):
+                            self.clear()
+                        else:
+                            self.invalidate_local(data.get("id"), data.get("name"))
+            except Exception as e:
+                logger.warning("Plant cache listener error, reconnecting: %s", e)
+                self._stop.wait(5)
+            finally:
+                if raw is not None:
+                    raw.invalidate()
+
+
+plant_cache = PlantCache()
+register_cache("plant", plant_cache.stats)
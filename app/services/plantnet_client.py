@@ -0,0 +1,126 @@
+# app/services/plantnet_client.py
+import asyncio
+import logging
+import os
+from typing import List, Optional, Tuple
+
+import httpx
+
+from app.core.metrics import EXTERNAL_REQUEST_ERRORS, track_external
+from app.core.tracing import CLIENT, span
+from app.services.resilience import RetryableStatus, Upstream
+
+logger = logging.getLogger(__name__)
+
+API_KEY = os.getenv("PLANETNET_API_KEY")
+PROJECT = "all"
+# Point at a compatible server (e.g. stubs/plantnet_stub.py) instead of my-api.plantnet.org.
+API_ENDPOINT = os.getenv("PLANTNET_API_ENDPOINT", f"https://my-api.plantnet.org/v2/identify/{PROJECT}")
+
+# Upper bound on PlantNet calls in flight at once (per worker process).
+PLANTNET_MAX_CONCURRENCY = int(os.getenv("PLANTNET_MAX_CONCURRENCY", "8"))
+# Connection pool sizing for the shared keep-alive client.
+PLANTNET_MAX_CONNECTIONS = int(os.getenv("PLANTNET_MAX_CONNECTIONS", "20"))
+PLANTNET_MAX_KEEPALIVE = int(os.getenv("PLANTNET_MAX_KEEPALIVE", "10"))
+# Seconds to establish a connection, and to wait for each read/write once connected.
+PLANTNET_CONNECT_TIMEOUT = float(os.getenv("PLANTNET_CONNECT_TIMEOUT", "5"))
+PLANTNET_TIMEOUT = float(os.getenv("PLANTNET_TIMEOUT", "30"))
+# Extra attempts after a timeout, connection error, 429 or 5xx (identify is a pure query, safe to repeat).
+PLANTNET_RETRIES = int(os.getenv("PLANTNET_RETRIES", "2"))
+# Consecutive failures that open the breaker, and seconds before a probe is let through.
+PLANTNET_BREAKER_THRESHOLD = int(os.getenv("PLANTNET_BREAKER_THRESHOLD", "5"))
+PLANTNET_BREAKER_RESET = float(os.getenv("PLANTNET_BREAKER_RESET", "30"))
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# (filename, bytes, content_type) as sent in the multipart body.
+ImagePart = Tuple[str, bytes, str]
+
+
+def _retryable(exc: BaseException) -> bool:
+    return isinstance(exc, (httpx.TransportError, RetryableStatus))
+
+
+class PlantNetClient:
+    """
+    Shared async client for the PlantNet identify API.
+    Keeps one pooled httpx.AsyncClient per process, limits concurrent calls, and
+    retries transient failures behind a circuit breaker.
+    """
+    def __init__(
+        self,
+        endpoint: str = API_ENDPOINT,
+        api_key: Optional[str] = API_KEY,
+        max_concurrency: int = PLANTNET_MAX_CONCURRENCY,
+    ):
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.upstream = Upstream(
+            "plantnet", _retryable, retries=PLANTNET_RETRIES,
+            failure_threshold=PLANTNET_BREAKER_THRESHOLD, reset_timeout=PLANTNET_BREAKER_RESET,
+        )
+
+    async def start(self) -> None:
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(PLANTNET_TIMEOUT, connect=PLANTNET_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=PLANTNET_MAX_CONNECTIONS,
+                max_keepalive_connections=PLANTNET_MAX_KEEPALIVE,
+            ),
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        logger.info("PlantNet client started (max concurrency %d)", self.max_concurrency)
+
+    async def close(self) -> None:
+        if self._client is None:
+            return
+        await self._client.aclose()
+        self._client = None
+        self._semaphore = None
+        logger.info("PlantNet client closed")
+
+    async def identify(self, images: List[ImagePart], organs: List[str]) -> httpx.Response:
+        """
+        POST the images and organs to PlantNet and return the raw response (the last
+        one if every attempt got a retryable error status).
+        Raises CircuitOpenError while the breaker is open, httpx errors once retries run out.
+        Starts the client lazily when the app lifespan did not run (e.g. serverless).
+        """
+        if self._client is None:
+            await self.start()
+
+        files = [("images", image) for image in images]
+        data = {"organs": list(organs)}
+
+        async def attempt() -> httpx.Response:
+            async with self._semaphore:
+                with track_external("plantnet"):
+                    response = await self._client.post(
+                        self.endpoint,
+                        params={"api-key": self.api_key},
+                        files=files,
+                        data=data,
+                    )
+            if response.status_code != 200:
+                EXTERNAL_REQUEST_ERRORS.inc("plantnet", f"http_{response.status_code}")
+            if response.status_code in RETRYABLE_STATUSES:
+                raise RetryableStatus(response)
+            return response
+
+        with span("plantnet.identify", kind=CLIENT, images=len(images)) as s:
+            try:
+                response = await self.upstream.call(attempt)
+            except RetryableStatus as e:
+                response = e.response
+            s.set(**{"http.status_code": response.status_code})
+            if response.status_code != 200:
+                s.set_error(f"HTTP {response.status_code}")
+        return response
+
+
+plantnet_client = PlantNetClient()
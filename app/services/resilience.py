@@ -0,0 +1,206 @@
+# app/services/resilience.py
+"""
+Retries and circuit breaking for calls to external APIs (PlantNet, OpenAI).
+
+Each integration owns an `Upstream`: bounded retries with capped exponential backoff
+and full jitter, plus a circuit breaker that opens after consecutive failures, rejects
+calls at once while open, and lets a single probe through after `reset_timeout`.
+Only failures the integration marks as retryable (timeouts, connection errors,
+429/5xx) count against the breaker; a 4xx answer means the upstream is up.
+Connect/read deadlines are set on each integration's HTTP client.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Dict, TypeVar
+
+from fastapi import HTTPException
+
+from app.core.metrics import EXTERNAL_REQUEST_ERRORS, EXTERNAL_REQUEST_RETRIES, REGISTRY
+from app.core.tracing import current_span
+
+logger = logging.getLogger(__name__)
+
+# Backoff before retry n is uniform in [0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2**n)] seconds.
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.25"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "4.0"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """The upstream's breaker is open; the call was not attempted."""
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable (circuit open), retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class RetryableStatus(Exception):
+    """Raised from an attempt whose HTTP response is worth retrying (429, 5xx); keeps the response."""
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+class CircuitBreaker:
+    """Thread-safe: OpenAI calls run on worker threads, PlantNet calls on the event loop."""
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go through now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN:
+                waited = time.monotonic() - self.opened_at
+                if waited < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.reset_timeout - waited)
+                self.state = HALF_OPEN
+            if self._probing:
+                # One probe at a time; everyone else keeps failing fast until it succeeds.
+                self.rejected += 1
+                raise CircuitOpenError(self.name, 1.0)
+            self._probing = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info("Circuit for %s closed", self.name)
+            self.state, self.failures, self._probing = CLOSED, 0, False
+
+    def record_abandoned(self) -> None:
+        """The call ended without an answer either way (e.g. cancelled): free the probe slot."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.state, self.opened_at = OPEN, time.monotonic()
+                self.times_opened += 1
+                logger.warning("Circuit for %s opened after %d consecutive failures", self.name, self.failures)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            retry_after = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)) if self.state == OPEN else 0.0
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout_seconds": self.reset_timeout,
+                "retry_after_seconds": round(retry_after, 1),
+                "times_opened": self.times_opened,
+                "rejected_calls": self.rejected,
+            }
+
+
+UPSTREAMS: Dict[str, "Upstream"] = {}
+
+
+class Upstream:
+    """
+    Runs calls to one external API through its breaker and retry policy.
+    `retryable(exc)` decides whether a failure is transient (and counts against the breaker).
+    """
+    def __init__(self, name: str, retryable: Callable[[BaseException], bool], retries: int,
+                 failure_threshold: int, reset_timeout: float,
+                 base_delay: float = RETRY_BASE_DELAY, max_delay: float = RETRY_MAX_DELAY):
+        self.name = name
+        self.retryable = retryable
+        self.attempts = retries + 1
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        UPSTREAMS[name] = self
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _before(self) -> None:
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            EXTERNAL_REQUEST_ERRORS.inc(self.name, "circuit_open")
+            raise
+
+    def _should_retry(self, exc: BaseException, attempt: int) -> bool:
+        if not self.retryable(exc):
+            self.breaker.record_success()
+            return False
+        self.breaker.record_failure()
+        if attempt + 1 >= self.attempts:
+            return False
+        EXTERNAL_REQUEST_RETRIES.inc(self.name)
+        current_span().event("retry", attempt=attempt + 1, error=str(exc))
+        return True
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        for attempt in range(self.attempts):
+            self._before()
+            try:
+                result = await fn()
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                await asyncio.sleep(self.backoff(attempt))
+                continue
+            except BaseException:
+                # Cancelled (client gone, deadline): says nothing about the upstream, but a
+                # half-open breaker must not wait forever for this probe's verdict.
+                self.breaker.record_abandoned()
+                raise
+            self.breaker.record_success()
+            return result
+
+    def call_sync(self, fn: Callable[[], T]) -> T:
+        """As `call`, for blocking clients running on a worker thread."""
+        for attempt in range(self.attempts):
+            self._before()
+            try:
+                result = fn()
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                time.sleep(self.backoff(attempt))
+                continue
+            except BaseException:
+                self.breaker.record_abandoned()
+                raise
+            self.breaker.record_success()
+            return result
+
+
+def upstream_states() -> dict:
+    return {name: upstream.breaker.snapshot() for name, upstream in UPSTREAMS.items()}
+
+
+def unavailable(e: CircuitOpenError) -> HTTPException:
+    """The 503 answered while an upstream's circuit is open."""
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after) + 1)})
+
+
+_STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+REGISTRY.register_callback(
+    "circuit_breaker_state", "Breaker state per upstream (0 closed, 1 half-open, 2 open).", ("upstream",),
+    lambda: [((name,), _STATE_CODES[upstream.breaker.state]) for name, upstream in UPSTREAMS.items()],
+)
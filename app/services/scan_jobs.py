@@ -0,0 +1,209 @@
+# app/services/scan_jobs.py
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app.core.tracing import trace
+from app.database.database import AsyncSessionLocal
+from app.database.models import ScanJob, ScanJobImage
+
+logger = logging.getLogger(__name__)
+
+# Background workers per process; 0 disables them (e.g. on serverless: run app.commands.scan_worker instead).
+SCAN_JOB_WORKERS = int(os.getenv("SCAN_JOB_WORKERS", "2"))
+SCAN_JOB_POLL_INTERVAL = float(os.getenv("SCAN_JOB_POLL_INTERVAL", "1.0"))
+SCAN_JOB_MAX_ATTEMPTS = int(os.getenv("SCAN_JOB_MAX_ATTEMPTS", "3"))
+# A retry waits SCAN_JOB_RETRY_DELAY * 2**(attempts - 1) seconds, at most SCAN_JOB_RETRY_MAX_DELAY.
+SCAN_JOB_RETRY_DELAY = float(os.getenv("SCAN_JOB_RETRY_DELAY", "30"))
+SCAN_JOB_RETRY_MAX_DELAY = float(os.getenv("SCAN_JOB_RETRY_MAX_DELAY", "600"))
+# Finished jobs are deleted after this many hours.
+SCAN_JOB_RETENTION_HOURS = float(os.getenv("SCAN_JOB_RETENTION_HOURS", "24"))
+# Jobs left "running" longer than this (crashed or hung worker) are retried, or failed once out of attempts.
+SCAN_JOB_STALE_SECONDS = int(os.getenv("SCAN_JOB_STALE_SECONDS", "600"))
+SCAN_JOB_PURGE_INTERVAL = 60
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+
+def retry_at(attempts: int, now: Optional[datetime] = None) -> datetime:
+    """When a job that has been attempted `attempts` times may be claimed again."""
+    delay = min(SCAN_JOB_RETRY_MAX_DELAY, SCAN_JOB_RETRY_DELAY * 2 ** max(attempts - 1, 0))
+    return (now or datetime.utcnow()) + timedelta(seconds=delay)
+
+
+async def enqueue_scan_job(db: AsyncSession, user_id: int, organs: List[str], images: list) -> ScanJob:
+    """Persist a scan job with its converted images; a worker picks it up later."""
+    job = ScanJob(id=str(uuid.uuid4()), user_id=user_id, status=QUEUED, organs=list(organs))
+    job.images = [
+        ScanJobImage(position=position, filename=image.filename, data=image.data)
+        for position, image in enumerate(images)
+    ]
+    db.add(job)
+    await db.commit()
+    return job
+
+
+async def get_scan_job(db: AsyncSession, job_id: str, user_id: int) -> Optional[ScanJob]:
+    return await db.scalar(select(ScanJob).where(ScanJob.id == job_id, ScanJob.user_id == user_id))
+
+
+async def claim_next_job() -> Optional[str]:
+    """
+    Take the oldest queued job that is not waiting out a retry backoff. FOR UPDATE SKIP
+    LOCKED lets workers in other processes claim different rows concurrently; the
+    conditional UPDATE guards databases without it.
+    """
+    async with AsyncSessionLocal() as db:
+        job_id = await db.scalar(
+            select(ScanJob.id)
+            .where(ScanJob.status == QUEUED,
+                   or_(ScanJob.not_before.is_(None), ScanJob.not_before <= datetime.utcnow()))
+            .order_by(ScanJob.created_at)
+            .with_for_update(skip_locked=True)
+            .limit(1)
+        )
+        if job_id is None:
+            await db.rollback()
+            return None
+        claimed = (await db.execute(
+            update(ScanJob)
+            .where(ScanJob.id == job_id, ScanJob.status == QUEUED)
+            .values(status=RUNNING, attempts=ScanJob.attempts + 1, updated_at=datetime.utcnow())
+        )).rowcount
+        await db.commit()
+        return job_id if claimed else None
+
+
+async def finish_job(job_id: str, result: Optional[dict] = None, error: Optional[str] = None,
+                     retry: bool = False) -> None:
+    async with AsyncSessionLocal() as db:
+        job = await db.get(ScanJob, job_id, options=[selectinload(ScanJob.images)])
+        if job is None:
+            return
+        if error is None:
+            job.status, job.result, job.error = SUCCEEDED, result, None
+            job.images = []  # The images are no longer needed once the sighting is saved.
+        elif retry and job.attempts < SCAN_JOB_MAX_ATTEMPTS:
+            job.status, job.error, job.not_before = QUEUED, error, retry_at(job.attempts)
+        else:
+            job.status, job.error = FAILED, error
+            job.images = []
+        await db.commit()
+
+
+async def purge_jobs() -> int:
+    """
+    Delete finished jobs past retention. Jobs stuck in running (their worker died or hung)
+    are requeued with a backoff, or failed once they have used up their attempts.
+    """
+    async with AsyncSessionLocal() as db:
+        now = datetime.utcnow()
+        expired = list(await db.scalars(
+            select(ScanJob.id).where(
+                ScanJob.status.in_((SUCCEEDED, FAILED)),
+                ScanJob.updated_at < now - timedelta(hours=SCAN_JOB_RETENTION_HOURS),
+            )
+        ))
+        if expired:
+            # Finished jobs keep no images, so the rows can go without loading them.
+            await db.execute(delete(ScanJobImage).where(ScanJobImage.job_id.in_(expired)))
+            await db.execute(delete(ScanJob).where(ScanJob.id.in_(expired)))
+        stale = (await db.execute(
+            select(ScanJob.id, ScanJob.attempts).where(
+                ScanJob.status == RUNNING,
+                ScanJob.updated_at < now - timedelta(seconds=SCAN_JOB_STALE_SECONDS),
+            )
+        )).all()
+        exhausted = [job_id for job_id, attempts in stale if attempts >= SCAN_JOB_MAX_ATTEMPTS]
+        for job_id, attempts in stale:
+            if attempts >= SCAN_JOB_MAX_ATTEMPTS:
+                continue
+            # Still conditional on RUNNING: the worker may have finished it since the select.
+            await db.execute(
+                update(ScanJob)
+                .where(ScanJob.id == job_id, ScanJob.status == RUNNING)
+                .values(status=QUEUED, not_before=retry_at(attempts, now), updated_at=now)
+            )
+        if exhausted:
+            await db.execute(
+                update(ScanJob)
+                .where(ScanJob.id.in_(exhausted), ScanJob.status == RUNNING)
+                .values(status=FAILED, updated_at=now,
+                        error=f"Gave up after {SCAN_JOB_MAX_ATTEMPTS} attempts: the worker stopped responding")
+            )
+            await db.execute(delete(ScanJobImage).where(ScanJobImage.job_id.in_(exhausted)))
+        await db.commit()
+        return len(expired)
+
+
+class ScanJobWorkers:
+    """
+    Poll the scan_jobs table and run each claimed job through `handler(job_id) -> result dict`.
+    """
+    def __init__(self, concurrency: int = SCAN_JOB_WORKERS, poll_interval: float = SCAN_JOB_POLL_INTERVAL):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+
+    def start(self, handler: Callable[[str], Awaitable[dict]]) -> None:
+        if self._tasks or self.concurrency <= 0:
+            return
+        self._stopping = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run(index, handler)) for index in range(self.concurrency)]
+        logger.info("Started %d scan job workers", self.concurrency)
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _sleep(self, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self, index: int, handler: Callable[[str], Awaitable[dict]]) -> None:
+        last_purge = 0.0
+        while not self._stopping.is_set():
+            try:
+                # Housekeeping runs on the first worker only, once a minute.
+                if index == 0 and time.monotonic() - last_purge >= SCAN_JOB_PURGE_INTERVAL:
+                    await purge_jobs()
+                    last_purge = time.monotonic()
+                job_id = await claim_next_job()
+            except Exception as e:
+                logger.warning("Scan job queue unavailable: %s", e)
+                await self._sleep(self.poll_interval)
+                continue
+
+            if job_id is None:
+                await self._sleep(self.poll_interval)
+                continue
+
+            try:
+                # Logs and spans of the job carry its id, as a request's carry the request id.
+                with trace("scan_job", request_id=job_id):
+                    result = await handler(job_id)
+                await finish_job(job_id, result)
+            except HTTPException as e:
+                # 4xx means the input itself is bad; retrying cannot help.
+                await finish_job(job_id, None, str(e.detail), e.status_code >= 500)
+            except Exception as e:
+                logger.exception("Scan job %s failed", job_id)
+                await finish_job(job_id, None, f"Internal error: {str(e)}", True)
+
+
+scan_job_workers = ScanJobWorkers()
@@ -0,0 +1,176 @@
+# app/services/thumbnails.py
+"""
+Thumbnails of stored sighting photos, made on first request and kept on disk.
+
+A derivative is identified by (image key, width, format), so, like the original, its
+bytes never change. It is rendered in the image worker pool; concurrent requests for
+the same new derivative share one render (SingleFlight). Rendered files live under
+THUMBNAIL_DIR and are evicted least-recently-used once they exceed
+THUMBNAIL_CACHE_MAX_BYTES. Each worker process tracks usage of the files it has seen
+(adopting files other workers rendered when it first reads them), so with several
+workers the cap is enforced approximately.
+"""
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.metrics import register_cache
+from app.services.image_engine import render_thumbnail, run_in_image_pool
+from app.services.image_store import image_store
+from app.services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Allowed values of ?w=; a fixed set keeps the number of derivatives per image bounded.
+THUMBNAIL_WIDTHS = tuple(int(w) for w in os.getenv("THUMBNAIL_WIDTHS", "128,512").split(","))
+THUMBNAIL_DIR = os.getenv("THUMBNAIL_DIR", "data/thumbnails")
+THUMBNAIL_CACHE_MAX_BYTES = int(os.getenv("THUMBNAIL_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+
+# ?format= value -> (PIL format, media type)
+THUMBNAIL_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+}
+
+
+class DiskLRU:
+    """
+    Files under `root`, evicted least-recently-used past `max_bytes`.
+    Existing files are indexed (oldest access first) on first use, so the cache survives restarts.
+    """
+    def __init__(self, root: str = THUMBNAIL_DIR, max_bytes: int = THUMBNAIL_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._indexed = False
+        self._lock = threading.Lock()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, name[:2], name)
+
+    def _index(self) -> None:
+        found = []
+        for directory, _, files in os.walk(self.root):
+            for file in files:
+                if file.endswith(".tmp"):
+                    continue
+                st = os.stat(os.path.join(directory, file))
+                found.append((st.st_atime, file, st.st_size))
+        for _, name, size in sorted(found):
+            self._sizes[name] = size
+            self._total += size
+        self._indexed = True
+
+    def read(self, name: str, count: bool = True) -> Optional[bytes]:
+        """
+        The cached file's bytes, marking it recently used, or None. `count` records the
+        lookup in the hit/miss stats.
+        """
+        with self._lock:
+            if not self._indexed:
+                self._index()
+            try:
+                # Opened under the lock, so our own evictions cannot pull the file out from under
+                # us; once open, an unlink (ours or another worker's) no longer affects the read.
+                f = open(self.path(name), "rb")
+            except FileNotFoundError:
+                if name in self._sizes:
+                    # Removed behind our back (another worker evicted it).
+                    self._total -= self._sizes.pop(name)
+                self.misses += count
+                return None
+            if name in self._sizes:
+                self._sizes.move_to_end(name)
+            else:
+                # Rendered by another worker: track it here too, or it would never be evicted.
+                size = os.fstat(f.fileno()).st_size
+                self._sizes[name] = size
+                self._total += size
+                self._evict(keep=name)
+            self.hits += count
+        with f:
+            return f.read()
+
+    def put(self, name: str, data: bytes) -> None:
+        path = self.path(name)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        with self._lock:
+            self._total += len(data) - self._sizes.pop(name, 0)
+            self._sizes[name] = len(data)
+            self._evict(keep=name)
+
+    def _evict(self, keep: str) -> None:
+        while self._total > self.max_bytes and len(self._sizes) > 1:
+            name, size = next(iter(self._sizes.items()))
+            if name == keep:
+                break
+            del self._sizes[name]
+            self._total -= size
+            self.evictions += 1
+            try:
+                # Responses already streaming this file keep their open handle.
+                os.unlink(self.path(name))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._sizes),
+            "bytes": self._total,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+
+thumbnail_cache = DiskLRU()
+register_cache("thumbnails", thumbnail_cache.stats)
+
+_renders = SingleFlight()
+
+
+async def _render(key: str, width: int, fmt: str, name: str) -> Optional[bytes]:
+    # A render that finished between our cache miss and this flight starting left its file behind.
+    data = await run_in_threadpool(thumbnail_cache.read, name, False)
+    if data is not None:
+        return data
+    original = await image_store.get(key)
+    if original is None:
+        return None
+    data = await run_in_image_pool(render_thumbnail, original, width, THUMBNAIL_FORMATS[fmt][0], THUMBNAIL_QUALITY)
+    await run_in_threadpool(thumbnail_cache.put, name, data)
+    return data
+
+
+async def get_thumbnail(key: str, width: int, fmt: str) -> Optional[bytes]:
+    """
+    The (key, width, fmt) derivative, rendering it if needed; None if the original is missing.
+    Returned as bytes (thumbnails are small), read from a file opened before any eviction.
+    """
+    name = f"{key}-{width}.{fmt}"
+    data = await run_in_threadpool(thumbnail_cache.read, name)
+    if data is not None:
+        return data
+    return await _renders.do(name, lambda: _render(key, width, fmt, name))
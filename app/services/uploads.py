@@ -0,0 +1,164 @@
+# app/services/uploads.py
+import os
+from tempfile import SpooledTemporaryFile
+from typing import Iterable, List, Optional
+
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+# Maximum size of a single uploaded image (default 50 MB).
+UPLOAD_MAX_FILE_BYTES = int(os.getenv("UPLOAD_MAX_FILE_BYTES", "52428800"))
+# Maximum size of a whole upload request body, all parts included (default 100 MB).
+UPLOAD_MAX_REQUEST_BYTES = int(os.getenv("UPLOAD_MAX_REQUEST_BYTES", "104857600"))
+# Accepted uploads stay in memory up to this size, then spill to a temporary file.
+UPLOAD_SPOOL_THRESHOLD = int(os.getenv("UPLOAD_SPOOL_THRESHOLD", "1048576"))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", "65536"))
+
+PLANTNET_IMAGE_TYPES = ("image/jpeg", "image/png")
+ALL_IMAGE_TYPES = ("image/jpeg", "image/png", "image/webp", "image/gif", "image/bmp", "image/tiff")
+
+# Paths whose request bodies are capped by UploadLimitMiddleware.
+UPLOAD_PATHS = ("/identify", "/convert", "/scan")
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Detect the image type from its magic bytes rather than the client-supplied content_type."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head.startswith(b"BM"):
+        return "image/bmp"
+    if head[:4] in (b"II*\x00", b"MM\x00*"):
+        return "image/tiff"
+    return None
+
+
+def _size_error(limit: int, what: str) -> HTTPException:
+    readable = f"{limit // (1024 * 1024)}MB" if limit >= 1024 * 1024 else f"{limit // 1024}KB"
+    return HTTPException(
+        status_code=413,
+        detail=f"{what} exceeds allowed limit of {readable}."
+    )
+
+
+class SpooledUpload:
+    """
+    An accepted upload held in a SpooledTemporaryFile, with the sniffed content_type.
+    Exposes the same read()/filename/content_type surface as UploadFile.
+    """
+    def __init__(self, filename: str, content_type: str, file: SpooledTemporaryFile, size: int):
+        self.filename = filename
+        self.content_type = content_type
+        self.file = file
+        self.size = size
+
+    async def read(self) -> bytes:
+        return await run_in_threadpool(self._read_all)
+
+    def _read_all(self) -> bytes:
+        self.file.seek(0)
+        return self.file.read()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+async def ingest_uploads(
+    images: List[UploadFile],
+    allowed_types: Iterable[str] = ALL_IMAGE_TYPES,
+    max_file_bytes: int = UPLOAD_MAX_FILE_BYTES,
+    max_request_bytes: int = UPLOAD_MAX_REQUEST_BYTES,
+) -> List[SpooledUpload]:
+    """
+    Copy each upload chunk by chunk into a spooled buffer, aborting as soon as the
+    per-file or per-request budget is exceeded or the first bytes are not an allowed image.
+    """
+    if not images:
+        raise HTTPException(status_code=400, detail="No images provided")
+
+    allowed_types = tuple(allowed_types)
+    accepted: List[SpooledUpload] = []
+    total = 0
+    try:
+        for image in images:
+            spool = SpooledTemporaryFile(max_size=UPLOAD_SPOOL_THRESHOLD)
+            accepted.append(SpooledUpload(image.filename, "", spool, 0))
+            size = 0
+            while True:
+                chunk = await image.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if size == 0:
+                    content_type = sniff_image_type(chunk)
+                    if content_type not in allowed_types:
+                        raise HTTPException(
+                            status_code=415,
+                            detail=f"Unsupported file type for {image.filename}. "
+                                   f"Allowed: {', '.join(t.split('/')[1].upper() for t in allowed_types)}."
+                        )
+                    accepted[-1].content_type = content_type
+                size += len(chunk)
+                total += len(chunk)
+                if size > max_file_bytes:
+                    raise _size_error(max_file_bytes, "File size")
+                if total > max_request_bytes:
+                    raise _size_error(max_request_bytes, "Upload size")
+                spool.write(chunk)
+            if size == 0:
+                raise HTTPException(status_code=400, detail=f"Empty file: {image.filename}")
+            accepted[-1].size = size
+    except BaseException:
+        for upload in accepted:
+            upload.close()
+        raise
+    return accepted
+
+
+def close_uploads(uploads: Iterable[SpooledUpload]) -> None:
+    for upload in uploads:
+        upload.close()
+
+
+class UploadLimitMiddleware:
+    """
+    Reject upload requests whose body exceeds UPLOAD_MAX_REQUEST_BYTES while it is still
+    streaming in: immediately from Content-Length, otherwise as soon as the byte count passes it.
+    """
+    def __init__(self, app, paths=UPLOAD_PATHS, max_bytes: int = UPLOAD_MAX_REQUEST_BYTES):
+        self.app = app
+        self.paths = tuple(paths)
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse(
+                status_code=413,
+                content={"detail": _size_error(self.max_bytes, "Upload size").detail},
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise _size_error(self.max_bytes, "Upload size")
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -0,0 +1,48 @@
+# benchmarks/compare.py
+"""
+Compare two result files from benchmarks.run, endpoint by endpoint.
+
+    python -m benchmarks.compare benchmarks/results/before.json benchmarks/results/after.json
+"""
+import argparse
+import json
+import sys
+
+METRICS = ("rps", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb")
+
+
+def _change(old, new) -> str:
+    if not old or new is None:
+        return f"{old} -> {new}"
+    return f"{old} -> {new} ({(new - old) / old * 100:+.1f}%)"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args(argv)
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+
+    print(f"before: {before['meta'].get('git_revision')}  after: {after['meta'].get('git_revision')}")
+    for workload, new in after["workloads"].items():
+        old = before["workloads"].get(workload)
+        if old is None:
+            print(f"\n{workload}: not in {args.before}")
+            continue
+        print(f"\n{workload}: rps {_change(old['rps'], new['rps'])}, errors {old['errors']} -> {new['errors']}")
+        for label, endpoint in new["endpoints"].items():
+            previous = old["endpoints"].get(label)
+            if previous is None:
+                continue
+            print(f"  {label}")
+            for metric in METRICS:
+                print(f"    {metric:<12} {_change(previous.get(metric), endpoint.get(metric))}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
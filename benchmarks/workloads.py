@@ -0,0 +1,139 @@
+# benchmarks/workloads.py
+"""
+The operations a virtual user can perform, the weighted mixes that make up each
+workload, and the fixtures (users, catalog, images) they draw from.
+"""
+import io
+import json
+import random
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+import httpx
+from PIL import Image
+
+FIXTURE_IMAGE = "app/static/flower1.jpg"
+EDIBLE_PARTS = ["leaves", "roots", "flowers", "fruit", "seeds", "stems"]
+SEARCH_TERMS = ["urtica", "urtika", "taraxa", "plantag", "rumex", "alium", "malva", "stubensis", "brassica", "dand"]
+
+
+@dataclass
+class Fixtures:
+    headers: List[Dict[str, str]] = field(default_factory=list)   # one Authorization header per user
+    credentials: List[Tuple[str, str]] = field(default_factory=list)
+    images: List[bytes] = field(default_factory=list)              # small, byte-distinct JPEGs
+    large_image: bytes = b""
+    plant_ids: List[int] = field(default_factory=list)
+
+
+def image_variants(count: int, path: str = FIXTURE_IMAGE) -> List[bytes]:
+    """
+    `count` JPEGs cropped slightly differently from the fixture, so each has its own
+    bytes (and identification cache key) while still being a realistic photo.
+    """
+    source = Image.open(path).convert("RGB")
+    width, height = source.size
+    variants = []
+    for i in range(count):
+        dx, dy = i % 8, (i // 8) % 8
+        buffer = io.BytesIO()
+        source.crop((dx, dy, width - 8 + dx, height - 8 + dy)).save(buffer, "JPEG", quality=88)
+        variants.append(buffer.getvalue())
+    return variants
+
+
+def large_image(megapixels: float = 24.0, path: str = FIXTURE_IMAGE) -> bytes:
+    """The fixture upscaled to a phone-camera-sized JPEG (several MB)."""
+    source = Image.open(path).convert("RGB")
+    scale = (megapixels * 1_000_000 / (source.width * source.height)) ** 0.5
+    size = (int(source.width * scale), int(source.height * scale))
+    buffer = io.BytesIO()
+    source.resize(size, Image.BILINEAR).save(buffer, "JPEG", quality=95)
+    return buffer.getvalue()
+
+
+def catalog_ndjson(size: int, seed: int = 0) -> bytes:
+    """A deterministic synthetic catalog for POST /plants/import."""
+    rng = random.Random(seed)
+    genera = ["Urtica", "Taraxacum", "Plantago", "Rumex", "Allium", "Malva", "Brassica", "Mentha"]
+    lines = []
+    for i in range(size):
+        genus = genera[i % len(genera)]
+        edible = rng.random() < 0.7
+        lines.append(json.dumps({
+            "scientific_name": f"{genus} benchia{i}",
+            "family": f"{genus}aceae",
+            "is_edible": edible,
+            "edible_parts": rng.sample(EDIBLE_PARTS, rng.randint(1, 3)) if edible else [],
+            "safety": "Wash before eating." if edible else "Do not eat.",
+        }))
+    return ("\n".join(lines) + "\n").encode()
+
+
+Operation = Callable[[httpx.AsyncClient, Fixtures, random.Random], Awaitable[httpx.Response]]
+
+
+async def scan(client, fx, rng):
+    count = rng.randint(1, 2)
+    files = [("images", (f"specimen{i}.jpg", rng.choice(fx.images), "image/jpeg")) for i in range(count)]
+    return await client.post("/scan/", headers=rng.choice(fx.headers), data={"organs": ["leaf"] * count}, files=files)
+
+
+async def scan_large(client, fx, rng):
+    files = [("images", ("camera.jpg", fx.large_image, "image/jpeg"))]
+    return await client.post("/scan/", headers=rng.choice(fx.headers), data={"organs": ["flower"]}, files=files)
+
+
+async def convert_large(client, fx, rng):
+    files = [("images", ("camera.jpg", fx.large_image, "image/jpeg"))]
+    return await client.post("/convert/", headers=rng.choice(fx.headers), files=files)
+
+
+async def plants_list(client, fx, rng):
+    params = {"limit": rng.choice([10, 20, 50])}
+    if rng.random() < 0.5:
+        params["edible_part"] = rng.choice(EDIBLE_PARTS)
+    return await client.get("/plants/", headers=rng.choice(fx.headers), params=params)
+
+
+async def plant_get(client, fx, rng):
+    return await client.get(f"/plants/{rng.choice(fx.plant_ids)}", headers=rng.choice(fx.headers))
+
+
+async def plant_search(client, fx, rng):
+    return await client.get("/plants/search", headers=rng.choice(fx.headers), params={"q": rng.choice(SEARCH_TERMS)})
+
+
+async def my_plants(client, fx, rng):
+    return await client.get("/user_plants/me", headers=rng.choice(fx.headers), params={"limit": 20})
+
+
+async def login(client, fx, rng):
+    email, password = rng.choice(fx.credentials)
+    return await client.post("/auth/login", data={"username": email, "password": password})
+
+
+# name -> (label reported in results, operation)
+OPERATIONS: Dict[str, Tuple[str, Operation]] = {
+    "scan": ("POST /scan/", scan),
+    "scan_large": ("POST /scan/ (large)", scan_large),
+    "convert_large": ("POST /convert/ (large)", convert_large),
+    "plants_list": ("GET /plants/", plants_list),
+    "plant_get": ("GET /plants/{plant_id}", plant_get),
+    "plant_search": ("GET /plants/search", plant_search),
+    "my_plants": ("GET /user_plants/me", my_plants),
+    "login": ("POST /auth/login", login),
+}
+
+# workload -> {operation: weight}
+WORKLOADS: Dict[str, Dict[str, int]] = {
+    "scan-heavy": {"scan": 70, "plant_get": 20, "my_plants": 10},
+    "catalog-read": {"plants_list": 40, "plant_get": 30, "plant_search": 20, "my_plants": 10},
+    "login-burst": {"login": 100},
+    "large-upload": {"convert_large": 70, "scan_large": 30},
+}
+
+
+def picker(mix: Dict[str, int]) -> Callable[[random.Random], str]:
+    names, weights = list(mix), list(mix.values())
+    return lambda rng: rng.choices(names, weights)[0]
@@ -0,0 +1,98 @@
+# stubs/openai_stub.py
+"""
+Minimal stand-in for the OpenAI chat completions API, for local runs and load tests.
+
+    python stubs/openai_stub.py --port 8100 --latency-ms 800 --error-rate 0.05
+    OPENAI_BASE_URL=http://localhost:8100/v1 OPENAI_API_KEY=stub python -m app.commands.enrich_catalog flora.txt
+
+Every request is answered with a `parse_plant_info` function call whose values are
+derived from the species name, so repeated runs give the same answers.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+PARTS = ["leaves", "roots", "flowers", "fruit", "seeds", "stems"]
+
+app = FastAPI(title="OpenAI stub")
+app.state.latency_ms = 0.0
+app.state.jitter_ms = 0.0
+app.state.error_rate = 0.0
+app.state.requests = 0
+
+
+def plant_info(name: str) -> dict:
+    digest = hashlib.sha256(name.encode("utf-8")).digest()
+    edible = digest[0] % 3 != 0
+    return {
+        "edible": edible,
+        "edible_parts": sorted({PARTS[b % len(PARTS)] for b in digest[1:3]}) if edible else [],
+        "safety": "Cook before eating." if edible else "Not for consumption.",
+        "family": f"Stubaceae{digest[3] % 20}",
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    app.state.requests += 1
+    body = await request.json()
+    delay = app.state.latency_ms + random.uniform(0, app.state.jitter_ms)
+    if delay:
+        await asyncio.sleep(delay / 1000)
+    if random.random() < app.state.error_rate:
+        return JSONResponse(
+            status_code=500,
+            content={"error": {"message": "Injected stub error", "type": "server_error"}},
+        )
+
+    prompt = body["messages"][-1]["content"]
+    match = re.search(r"Is the plant (.+?) edible\?", prompt)
+    name = match.group(1) if match else prompt
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "finish_reason": "function_call",
+            "message": {
+                "role": "assistant",
+                "content": None,
+                "function_call": {"name": "parse_plant_info", "arguments": json.dumps(plant_info(name))},
+            },
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+@app.get("/stats")
+async def stats():
+    return {"requests": app.state.requests}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Fixed delay per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Extra random delay, uniform in [0, jitter]")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 500")
+    args = parser.parse_args()
+    app.state.latency_ms = args.latency_ms
+    app.state.jitter_ms = args.jitter_ms
+    app.state.error_rate = args.error_rate
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
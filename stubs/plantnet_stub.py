@@ -0,0 +1,87 @@
+# stubs/plantnet_stub.py
+"""
+Minimal stand-in for the PlantNet identify API, for local runs and load tests.
+
+    python stubs/plantnet_stub.py --port 8101 --latency-ms 400 --error-rate 0.02 --species 50
+    PLANTNET_API_ENDPOINT=http://localhost:8101/v2/identify/all uvicorn app.main:app
+
+The species returned is picked from a pool of `--species` names by hashing the uploaded
+image bytes, so the same image always gets the same answer and different images spread
+over the pool (a mix of catalog hits and new species needing enrichment).
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+GENERA = ["Urtica", "Taraxacum", "Plantago", "Rumex", "Allium", "Malva", "Portulaca", "Chenopodium"]
+
+app = FastAPI(title="PlantNet stub")
+app.state.latency_ms = 0.0
+app.state.jitter_ms = 0.0
+app.state.error_rate = 0.0
+app.state.species = 50
+app.state.requests = 0
+
+
+def species_result(index: int) -> dict:
+    genus = GENERA[index % len(GENERA)]
+    return {
+        "score": 0.9,
+        "species": {
+            "scientificNameWithoutAuthor": f"{genus} stubensis{index}",
+            "family": {"scientificNameWithoutAuthor": f"{genus}aceae"},
+            "commonNames": [f"Stub {genus.lower()} {index}"],
+        },
+    }
+
+
+@app.post("/v2/identify/{project}")
+async def identify(project: str, request: Request):
+    app.state.requests += 1
+    form = await request.form()
+    digest = hashlib.sha256()
+    for image in form.getlist("images"):
+        digest.update(await image.read())
+
+    delay = app.state.latency_ms + random.uniform(0, app.state.jitter_ms)
+    if delay:
+        await asyncio.sleep(delay / 1000)
+    if random.random() < app.state.error_rate:
+        return JSONResponse(status_code=500, content={"message": "Injected stub error"})
+
+    index = int.from_bytes(digest.digest()[:4], "big") % app.state.species
+    return {
+        "query": {"project": project, "organs": form.getlist("organs")},
+        "bestMatch": species_result(index)["species"]["scientificNameWithoutAuthor"],
+        "results": [species_result(index), species_result((index + 1) % app.state.species)],
+    }
+
+
+@app.get("/stats")
+async def stats():
+    return {"requests": app.state.requests}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Fixed delay per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Extra random delay, uniform in [0, jitter]")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 500")
+    parser.add_argument("--species", type=int, default=50, help="Distinct species the stub answers with")
+    args = parser.parse_args()
+    app.state.latency_ms = args.latency_ms
+    app.state.jitter_ms = args.jitter_ms
+    app.state.error_rate = args.error_rate
+    app.state.species = args.species
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# tests/conftest.py
+"""
+Shared fixtures. The app reads its settings at import time, so the environment is set
+here, before anything under app/ is imported: a throwaway SQLite database, in-process
+executors, fast bcrypt and no background workers.
+"""
+import os
+import tempfile
+import uuid
+
+_tmp = tempfile.mkdtemp(prefix="food-around-us-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{os.path.join(_tmp, 'test.db')}",
+    "SECRET_KEY": "test-secret",
+    "ALGORITHM": "HS256",
+    "OPENAI_API_KEY": "sk-test",
+    "PLANETNET_API_KEY": "test",
+    "IMAGE_STORE_DIR": os.path.join(_tmp, "images"),
+    "THUMBNAIL_DIR": os.path.join(_tmp, "thumbnails"),
+    "IMAGE_WORKERS": "0",
+    "PASSWORD_HASH_EXECUTOR": "thread",
+    "BCRYPT_ROUNDS": "4",
+    "SCAN_JOB_WORKERS": "0",
+    "RETRY_BASE_DELAY": "0",
+    "CATALOG_VERSION_TTL": "0",
+    "TRACE_EXPORTER": "none",
+})
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.api.routers import scan_routes  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services import ai_service  # noqa: E402
+
+FLOWER = os.path.join(os.path.dirname(__file__), "..", "app", "static", "flower1.jpg")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture
+def flower_jpeg() -> bytes:
+    with open(FLOWER, "rb") as f:
+        return f.read()
+
+
+def signup_and_login(client: TestClient, email: str = None) -> dict:
+    """Create a user and return its Authorization header."""
+    email = email or f"{uuid.uuid4().hex[:12]}@example.com"
+    client.post("/auth/signup", json={"email": email, "password": "pw"})
+    token = client.post("/auth/login", data={"username": email, "password": "pw"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def auth_headers(client) -> dict:
+    return signup_and_login(client)
+
+
+@pytest.fixture
+def fake_upstreams(monkeypatch):
+    """PlantNet identifies a new species every scan; OpenAI says it is edible."""
+    async def identify(organs, images):
+        return {"species_name": f"Testus {uuid.uuid4().hex[:10]}", "family_name": "Testaceae",
+                "common_names": ["Test weed"]}
+
+    monkeypatch.setattr(scan_routes, "identify_images", identify)
+    monkeypatch.setattr(ai_service, "get_detailed_plant_info",
+                        lambda name: {"edible": True, "edible_parts": ["leaves"], "safety": "cook"})
+
+
+def scan(client, headers, *images):
+    return client.post(
+        "/scan/", headers=headers,
+        files=[("images", (f"{i}.jpg", data, "image/jpeg")) for i, data in enumerate(images)],
+        data={"organs": ["flower"] * len(images)},
+    )
@@ -0,0 +1,58 @@
+# tests/test_bulk.py
+import csv
+import io
+import json
+import uuid
+
+import pytest
+
+
+def species() -> str:
+    return f"Testus {uuid.uuid4().hex[:10]}"
+
+
+def exported(client, auth_headers, fmt: str, name: str) -> dict:
+    response = client.get("/plants/export", params={"format": fmt}, headers=auth_headers)
+    assert response.status_code == 200
+    if fmt == "csv":
+        rows = csv.DictReader(io.StringIO(response.text))
+    else:
+        rows = (json.loads(line) for line in response.text.splitlines())
+    return next(row for row in rows if row["scientific_name"] == name)
+
+
+@pytest.mark.parametrize("fmt", ["csv", "ndjson"])
+def test_export_import_round_trip_keeps_quotes_and_newlines(client, auth_headers, fmt):
+    name = species()
+    safety = 'line one\nline two, with "quotes"\r\nand a trailing space '
+    created = client.post("/plants/", headers=auth_headers, json={
+        "scientific_name": name, "family": "Testaceae", "is_edible": True,
+        "edible_parts": ["leaves", "roots"], "safety": safety,
+    })
+    assert created.status_code == 200
+
+    body = client.get("/plants/export", params={"format": fmt}, headers=auth_headers).content
+    imported = client.post("/plants/import", params={"format": fmt}, content=body, headers=auth_headers)
+    assert imported.status_code == 200
+    result = imported.json()
+    assert result["rejected"] == 0, result["errors"]
+    assert result["inserted"] == 0
+
+    row = exported(client, auth_headers, fmt, name)
+    assert row["safety"] == safety
+    assert row["edible_parts"] in ("leaves,roots", ["leaves", "roots"])
+
+
+def test_csv_errors_are_rejected_rows(client, auth_headers):
+    good, bad = species(), species()
+    body = (
+        "scientific_name,family,is_edible,edible_parts,safety\n"
+        f'{good},Testaceae,true,leaves,"two\nlines"\n'
+        f"{bad},Testaceae,true,leaves,{'x' * (csv.field_size_limit() + 1)}\n"  # csv.Error
+        f'{species()},Testaceae,true,leaves,"never closed\n'
+    )
+    imported = client.post("/plants/import", params={"format": "csv"}, content=body.encode(), headers=auth_headers)
+    assert imported.status_code == 200
+    result = imported.json()
+    assert result["inserted"] == 1
+    assert [error["line"] for error in result["errors"]] == [4, 5]
@@ -0,0 +1,55 @@
+# tests/test_enrich_catalog.py
+import uuid
+
+import pytest
+
+from app.commands import enrich_catalog
+from app.database.database import AsyncSessionLocal
+from app.database.operations import add_plant
+from app.services import ai_service
+
+
+@pytest.mark.anyio
+async def test_counts_only_rows_actually_inserted(monkeypatch, tmp_path):
+    new, raced = f"Testus {uuid.uuid4().hex[:10]}", f"Testus {uuid.uuid4().hex[:10]}"
+    monkeypatch.setattr(ai_service, "get_detailed_plant_info",
+                        lambda name: {"edible": True, "edible_parts": ["leaves"], "safety": None})
+    # Looks new when the run starts, but another writer stores it before our batch is written.
+    monkeypatch.setattr(enrich_catalog, "existing_names", _nothing_stored)
+    async with AsyncSessionLocal() as db:
+        await add_plant(db=db, scientific_name=raced, family="Testaceae", is_edible=False)
+
+    checkpoint = enrich_catalog.Checkpoint(str(tmp_path / "checkpoint.json"))
+    totals = await enrich_catalog.enrich_catalog(
+        [(new, "Testaceae"), (raced, "Testaceae")], checkpoint, concurrency=2, rate=100,
+    )
+    assert totals == {"enriched": 1, "failed": 0, "already_stored": 1, "skipped": 0}
+
+
+@pytest.mark.anyio
+async def test_non_boolean_edible_fails_only_that_plant(monkeypatch, tmp_path):
+    good, bad = f"Testus {uuid.uuid4().hex[:10]}", f"Testus {uuid.uuid4().hex[:10]}"
+    answers = {good: True, bad: "yes"}
+    monkeypatch.setattr(ai_service, "get_detailed_plant_info",
+                        lambda name: {"edible": answers[name], "edible_parts": [], "safety": None})
+
+    checkpoint = enrich_catalog.Checkpoint(str(tmp_path / "checkpoint.json"))
+    totals = await enrich_catalog.enrich_catalog(
+        [(good, "Testaceae"), (bad, "Testaceae")], checkpoint, concurrency=2, rate=100,
+    )
+    assert totals == {"enriched": 1, "failed": 1, "already_stored": 0, "skipped": 0}
+    assert good in checkpoint.done and bad in checkpoint.failed
+
+
+async def _nothing_stored(names):
+    return set()
+
+
+@pytest.mark.parametrize("option", ["--rate", "--concurrency", "--batch-size"])
+@pytest.mark.parametrize("value", ["0", "-1"])
+def test_rejects_non_positive_options(option, value, tmp_path):
+    names = tmp_path / "names.txt"
+    names.write_text("Urtica dioica\n")
+    with pytest.raises(SystemExit) as exit_:
+        enrich_catalog.main([str(names), option, value])
+    assert exit_.value.code == 2
@@ -0,0 +1,104 @@
+# tests/test_enrichment.py
+import asyncio
+import time
+import uuid
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from app.api.routers import scan_routes
+from app.database.database import AsyncSessionLocal
+from app.database.models import Plant
+from app.database.operations import add_plant, get_plant_by_scientific_name
+from app.services import ai_service, enrichment
+
+
+def species() -> str:
+    return f"Testus {uuid.uuid4().hex[:10]}"
+
+
+def ai_answer(monkeypatch, answer: dict) -> None:
+    monkeypatch.setattr(ai_service, "get_detailed_plant_info", lambda name: answer)
+
+
+@pytest.mark.anyio
+async def test_stores_new_species(monkeypatch):
+    ai_answer(monkeypatch, {"edible": True, "edible_parts": "Leaves, Roots", "safety": "cook"})
+    name = species()
+    plant_id = await enrichment.enrich_plant(name, "Testaceae")
+    async with AsyncSessionLocal() as db:
+        plant = await get_plant_by_scientific_name(db, name)
+    assert plant.id == plant_id
+    assert plant.is_edible is True
+    assert list(plant.edible_parts) == ["leaves", "roots"]
+
+
+@pytest.mark.anyio
+async def test_concurrent_lookups_share_one_enrichment(monkeypatch):
+    calls = []
+
+    def slow_answer(name):
+        calls.append(name)
+        time.sleep(0.2)  # Keeps the first call in flight while the others arrive.
+        return {"edible": True, "edible_parts": ["leaves"], "safety": None}
+
+    monkeypatch.setattr(ai_service, "get_detailed_plant_info", slow_answer)
+    name = species()
+    ids = await asyncio.gather(*(enrichment.enrich_plant(name, "Testaceae") for _ in range(10)))
+
+    assert calls == [name]
+    assert len(set(ids)) == 1
+    async with AsyncSessionLocal() as db:
+        assert await db.scalar(select(func.count()).where(Plant.scientific_name == name)) == 1
+
+
+@pytest.mark.anyio
+async def test_rejects_answer_without_boolean_edible(monkeypatch):
+    ai_answer(monkeypatch, {"edible": None, "edible_parts": [], "safety": None})
+    name = species()
+    with pytest.raises(ValueError):
+        await enrichment.enrich_plant(name, "Testaceae")
+    async with AsyncSessionLocal() as db:
+        assert await get_plant_by_scientific_name(db, name) is None
+
+
+@pytest.mark.anyio
+async def test_reraises_integrity_error_without_winning_row(monkeypatch):
+    ai_answer(monkeypatch, {"edible": False, "edible_parts": [], "safety": None})
+    # family is NOT NULL: the insert fails, and no other writer stored the species.
+    with pytest.raises(IntegrityError):
+        await enrichment.enrich_plant(species(), None)
+
+
+@pytest.mark.anyio
+async def test_uses_winner_row_after_losing_the_race(monkeypatch):
+    ai_answer(monkeypatch, {"edible": True, "edible_parts": [], "safety": None})
+    name = species()
+
+    async def add_after_winner(db, **kwargs):
+        # Another worker commits the same species first; our insert then hits the unique index.
+        async with AsyncSessionLocal() as other:
+            await add_plant(db=other, **kwargs)
+        return await add_plant(db=db, **kwargs)
+
+    monkeypatch.setattr(enrichment, "add_plant", add_after_winner)
+    plant_id = await enrichment.enrich_plant(name, "Testaceae")
+    async with AsyncSessionLocal() as db:
+        assert (await get_plant_by_scientific_name(db, name)).id == plant_id
+
+
+def test_scan_answers_502_when_enrichment_is_rejected(monkeypatch, client, auth_headers, flower_jpeg):
+    name = species()
+
+    async def identify(organs, images):
+        return {"species_name": name, "family_name": "Testaceae", "common_names": []}
+
+    monkeypatch.setattr(scan_routes, "identify_images", identify)
+    ai_answer(monkeypatch, {"edible": None})
+    response = client.post(
+        "/scan/", files={"images": ("a.jpg", flower_jpeg, "image/jpeg")}, data={"organs": "flower"},
+        headers=auth_headers,
+    )
+    assert response.status_code == 502
+    assert "Plant enrichment failed" in response.json()["detail"]
@@ -0,0 +1,68 @@
+# tests/test_http_cache.py
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+from app.database.database import engine
+from app.services.http_cache import etag_matches, make_etag
+
+
+def test_etag_ignores_query_parameter_order():
+    assert make_etag("plants", 3, "/plants/", "skip=0&limit=5") == make_etag("plants", 3, "/plants/", "limit=5&skip=0")
+    assert make_etag("plants", 3, "/plants/", "") != make_etag("plants", 4, "/plants/", "")
+
+
+def test_etag_matching_is_weak():
+    etag = '"plants-3-abc"'
+    assert etag_matches('W/"plants-3-abc"', etag)
+    assert etag_matches('"other", "plants-3-abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"plants-2-abc"', etag)
+    assert not etag_matches(None, etag)
+
+
+@pytest.mark.parametrize("path, new", [
+    ("/plants/", {"family": "Testaceae", "is_edible": True}),
+    ("/recipes/", {"content": "Boil the leaves."}),
+])
+def test_conditional_get_answers_304_until_the_catalog_changes(client, auth_headers, path, new):
+    first = client.get(path, headers=auth_headers)
+    etag = first.headers["etag"]
+    assert "cache-control" in first.headers
+
+    repeat = client.get(path, headers={**auth_headers, "If-None-Match": etag})
+    assert repeat.status_code == 304
+    assert repeat.headers["etag"] == etag and not repeat.content
+    assert client.get(path, headers={**auth_headers, "If-None-Match": "W/" + etag}).status_code == 304
+
+    name_field = "scientific_name" if path == "/plants/" else "name"
+    created = client.post(path, json={name_field: f"Testus {uuid.uuid4().hex[:10]}", **new}, headers=auth_headers)
+    assert created.status_code == 200
+    changed = client.get(path, headers={**auth_headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_missing_item_has_no_etag(client, auth_headers):
+    response = client.get("/plants/999999999", headers=auth_headers)
+    assert response.status_code == 404
+    assert "etag" not in response.headers
+
+
+def test_cached_plant_body_follows_the_etag(client, auth_headers):
+    plant_id = client.post("/plants/", headers=auth_headers, json={
+        "scientific_name": f"Testus {uuid.uuid4().hex[:10]}", "family": "Testaceae", "is_edible": True,
+        "safety": "before",
+    }).json()["id"]
+    first = client.get(f"/plants/{plant_id}", headers=auth_headers)
+    assert first.json()["safety"] == "before"
+
+    # Another process writes the row: nothing tells this worker's plant cache.
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE plants SET safety = 'after' WHERE id = :id"), {"id": plant_id})
+
+    second = client.get(f"/plants/{plant_id}", headers={**auth_headers, "If-None-Match": first.headers["etag"]})
+    assert second.status_code == 200
+    assert second.headers["etag"] != first.headers["etag"]
+    assert second.json()["safety"] == "after"
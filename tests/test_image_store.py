@@ -0,0 +1,30 @@
+# tests/test_image_store.py
+import os
+
+import pytest
+
+from app.services.image_store import ImageStore, LocalImageStore, image_key, is_valid_key
+
+
+def test_incomplete_backend_fails_when_created():
+    class NoGet(ImageStore):
+        async def put(self, data):
+            return image_key(data)
+
+        async def exists(self, key):
+            return False
+
+    with pytest.raises(TypeError):
+        NoGet()
+
+
+@pytest.mark.anyio
+async def test_local_store_is_content_addressed(tmp_path):
+    store = LocalImageStore(str(tmp_path))
+    key = await store.put(b"jpeg bytes")
+    assert key == image_key(b"jpeg bytes") and is_valid_key(key)
+    assert await store.put(b"jpeg bytes") == key  # Stored once.
+    assert await store.get(key) == b"jpeg bytes"
+    assert await store.exists(key)
+    assert store.local_path(key) == os.path.join(str(tmp_path), key[:2], key[2:4], f"{key}.jpg")
+    assert await store.get(image_key(b"other")) is None
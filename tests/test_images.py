@@ -0,0 +1,71 @@
+# tests/test_images.py
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from tests.conftest import scan, signup_and_login
+
+
+@pytest.fixture
+def sighting(client, auth_headers, flower_jpeg, fake_upstreams):
+    """The caller's headers and their first sighting, created by a scan."""
+    assert scan(client, auth_headers, flower_jpeg).status_code == 200
+    return auth_headers, client.get("/user_plants/me", headers=auth_headers).json()[0]
+
+
+def test_serves_the_uploaders_photo_with_range_and_caching(client, sighting):
+    headers, row = sighting
+    key = row["image"]
+    response = client.get(f"/images/{key}", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/jpeg"
+    assert response.headers["etag"] == f'"{key}"'
+    assert "immutable" in response.headers["cache-control"]
+
+    partial = client.get(f"/images/{key}", headers={**headers, "Range": "bytes=0-9"})
+    assert partial.status_code == 206
+    assert partial.content == response.content[:10]
+
+    assert client.get(f"/images/{key}", headers={**headers, "If-None-Match": f'"{key}"'}).status_code == 304
+
+
+def test_unknown_and_malformed_keys_are_not_found(client, sighting):
+    headers, _ = sighting
+    assert client.get("/images/" + "0" * 64, headers=headers).status_code == 404
+    assert client.get("/images/not-a-key", headers=headers).status_code == 404
+
+
+def test_other_users_cannot_read_or_claim_a_photo(client, sighting):
+    _, row = sighting
+    key = row["image"]
+    other = signup_and_login(client)
+
+    assert client.get(f"/images/{key}", headers=other).status_code == 404
+    # Attaching the key to a sighting of their own does not grant access either.
+    claim = {"user_id": row["user_id"] + 1000, "plant_id": row["plant_id"], "image": key}
+    assert client.post("/user_plants/", json=claim, headers=other).status_code == 400
+
+
+def test_a_sighting_can_only_be_given_the_callers_images(client, sighting):
+    headers, row = sighting
+    other = signup_and_login(client)
+    created = client.post("/user_plants/", headers=other, json={"user_id": 999999, "plant_id": row["plant_id"]})
+    assert created.status_code == 200
+    update = {"user_id": 999999, "plant_id": row["plant_id"], "image": row["image"]}
+    assert client.put(f"/user_plants/{created.json()['id']}", json=update, headers=other).status_code == 400
+
+    # The uploader may attach their own key to another sighting.
+    own = {"user_id": 999998, "plant_id": row["plant_id"], "image": row["image"]}
+    assert client.post("/user_plants/", json=own, headers=headers).status_code == 200
+
+
+def test_every_photo_of_a_scan_is_kept(client, auth_headers, flower_jpeg, fake_upstreams):
+    second = BytesIO()
+    Image.open(BytesIO(flower_jpeg)).rotate(90, expand=True).save(second, format="JPEG")
+    assert scan(client, auth_headers, flower_jpeg, second.getvalue()).status_code == 200
+
+    row = client.get("/user_plants/me", headers=auth_headers).json()[0]
+    assert len(row["images"]) == 2 and row["image"] == row["images"][0]
+    for key in row["images"]:
+        assert client.get(f"/images/{key}", headers=auth_headers).status_code == 200
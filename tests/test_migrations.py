@@ -0,0 +1,26 @@
+# tests/test_migrations.py
+from datetime import datetime
+
+from sqlalchemy import create_engine, select, text
+
+from app.database.database import Base
+from app.database.migrations import image_uploads
+from app.database.models import ImageUpload
+
+
+def test_image_uploads_backfills_only_store_keys(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    key = "ab" * 32
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        ImageUpload.__table__.drop(conn)
+        # Before uploads were recorded, clients could put any text in user_plants.image.
+        for user_id, image in [(1, key), (2, key), (1, "https://example.com/" + "x" * 80),
+                               (1, "AB" * 32), (2, "not a key"), (2, None)]:
+            conn.execute(text("INSERT INTO user_plants (user_id, plant_id, image, date) VALUES (:u, 1, :i, :d)"),
+                         {"u": user_id, "i": image, "d": datetime.utcnow()})
+
+        image_uploads(conn)
+        granted = conn.execute(select(ImageUpload.user_id, ImageUpload.key)).all()
+    engine.dispose()
+    assert granted == [(1, key)]
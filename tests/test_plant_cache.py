@@ -0,0 +1,130 @@
+# tests/test_plant_cache.py
+import json
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.database.database import AsyncSessionLocal
+from app.database.models import Plant
+from app.database.operations import add_plant
+from app.services import plant_cache as plant_cache_module
+from app.services.plant_cache import PlantCache
+
+
+def plant(plant_id: int, name: str) -> Plant:
+    return Plant(id=plant_id, scientific_name=name, family="Testaceae", is_edible=True,
+                 edible_parts=["leaves"], safety=None, created_at=datetime.utcnow())
+
+
+class _Cursor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        pass
+
+
+class FakeNotifyConnection:
+    """
+    Stands in for psycopg2's connection in the listener: select() waits on a socket,
+    poll() turns each line written to it into a notify.
+    """
+    def __init__(self):
+        self._ours, self._theirs = socket.socketpair()
+        self.autocommit = False
+        self.notifies = []
+        self.waiting = threading.Event()
+
+    def fileno(self):
+        self.waiting.set()  # Only called by select(), once LISTEN is set up.
+        return self._ours.fileno()
+
+    def cursor(self):
+        return _Cursor()
+
+    def poll(self):
+        for line in self._ours.recv(65536).decode().splitlines():
+            self.notifies.append(SimpleNamespace(payload=line))
+
+    def notify(self, message: dict) -> None:
+        self._theirs.sendall(json.dumps(message).encode() + b"\n")
+
+    def close(self):
+        self._ours.close()
+        self._theirs.close()
+
+
+@pytest.fixture
+def listening_cache(monkeypatch):
+    conn = FakeNotifyConnection()
+    raw = SimpleNamespace(driver_connection=conn, invalidate=lambda: None)
+    monkeypatch.setattr(plant_cache_module, "engine", SimpleNamespace(raw_connection=lambda: raw))
+
+    cache = PlantCache(channel="plant_cache_test")
+    listener = threading.Thread(target=cache._listen, daemon=True)
+    listener.start()
+    assert conn.waiting.wait(5), "listener never started waiting for notifies"
+    yield cache, conn
+    cache._stop.set()
+    conn.notify({"wake": True})
+    listener.join(5)
+    conn.close()
+
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_notify_evicts_exactly_one_entry(listening_cache):
+    cache, conn = listening_cache
+    cache._store(plant(1, "Urtica dioica"))
+    cache._store(plant(2, "Rumex acetosa"))
+
+    conn.notify({"id": 1, "name": "Urtica dioica"})
+    assert wait_for(lambda: 1 not in cache._by_id)
+    # The listener keeps running and drops nothing else (an error would clear() on reconnect).
+    time.sleep(0.1)
+    assert list(cache._by_id) == [2]
+    assert "Urtica dioica" not in cache._id_by_name
+
+
+def test_notify_all_clears_the_cache(listening_cache):
+    cache, conn = listening_cache
+    cache._store(plant(1, "Urtica dioica"))
+    conn.notify({"all": True})
+    assert wait_for(lambda: not cache._by_id)
+
+
+@pytest.mark.anyio
+async def test_reads_through_and_invalidates():
+    cache = PlantCache(ttl=60, max_entries=2, channel="")
+    names = [f"Testus {uuid.uuid4().hex[:10]}" for _ in range(3)]
+    async with AsyncSessionLocal() as db:
+        stored = [await add_plant(db=db, scientific_name=name, family="Testaceae", is_edible=True) for name in names]
+
+        first = await cache.get_by_scientific_name(db, names[0])
+        assert first.id == stored[0].id
+        assert await cache.get_by_id(db, stored[0].id) is first
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        await cache.invalidate(scientific_name=names[0])
+        assert await cache.get_by_id(db, stored[0].id) is not first
+
+        # Past max_entries the least recently used plant goes.
+        await cache.get_by_id(db, stored[1].id)
+        await cache.get_by_id(db, stored[2].id)
+        assert list(cache._by_id) == [stored[1].id, stored[2].id]
+        assert await cache.get_by_scientific_name(db, "Testus missing") is None
@@ -0,0 +1,155 @@
+# tests/test_resilience.py
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.api.routers import identify_routes
+from app.services.identification_cache import identification_cache, make_cache_key
+from app.services.plantnet_client import plantnet_client
+from app.services.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, Upstream
+
+RESULT = {"results": [{"species": {"scientificNameWithoutAuthor": "Urtica dioica"}}]}
+
+
+def upstream(threshold: int = 3, retries: int = 2, reset_timeout: float = 30) -> Upstream:
+    return Upstream("test", lambda e: isinstance(e, ConnectionError), retries=retries,
+                    failure_threshold=threshold, reset_timeout=reset_timeout, base_delay=0)
+
+
+def flaky(failures: int, exc: Exception = ConnectionError("down")):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise exc
+        return "ok"
+
+    return fn, calls
+
+
+def test_breaker_opens_after_threshold_and_rejects():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as rejected:
+        breaker.before_call()
+    assert 0 < rejected.value.retry_after <= 30
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # The probe is still out.
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=5, reset_timeout=0.01)
+    for _ in range(5):
+        breaker.record_failure()
+    time.sleep(0.02)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+
+def test_call_sync_retries_transient_failures():
+    fn, calls = flaky(2)
+    assert upstream().call_sync(fn) == "ok"
+    assert len(calls) == 3
+
+
+def test_call_sync_gives_up_after_retries():
+    fn, calls = flaky(10)
+    with pytest.raises(ConnectionError):
+        upstream(threshold=10).call_sync(fn)
+    assert len(calls) == 3
+
+
+def test_permanent_errors_are_not_retried_nor_counted():
+    service = upstream(threshold=1)
+    fn, calls = flaky(1, ValueError("bad request"))
+    with pytest.raises(ValueError):
+        service.call_sync(fn)
+    assert len(calls) == 1
+    assert service.breaker.state == CLOSED
+
+
+@pytest.mark.anyio
+async def test_call_retries_then_breaker_fails_fast():
+    service = upstream(threshold=2, retries=5)
+    attempts = []
+
+    async def down():
+        attempts.append(1)
+        raise ConnectionError("down")
+
+    # The second failure opens the breaker, so the third attempt is rejected without a call.
+    with pytest.raises(CircuitOpenError):
+        await service.call(down)
+    assert len(attempts) == 2
+
+
+@pytest.mark.anyio
+async def test_cancelled_probe_frees_the_half_open_breaker():
+    service = upstream(threshold=1, reset_timeout=0.01)
+    service.breaker.record_failure()
+    await asyncio.sleep(0.02)
+
+    probe = asyncio.create_task(service.call(lambda: asyncio.sleep(10)))
+    await asyncio.sleep(0.01)
+    assert service.breaker.state == HALF_OPEN
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+
+    async def answer():
+        return "ok"
+
+    assert await service.call(answer) == "ok"
+    assert service.breaker.state == CLOSED
+
+
+@pytest.fixture
+def plantnet_down(monkeypatch):
+    breaker = CircuitBreaker("plantnet", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    monkeypatch.setattr(plantnet_client.upstream, "breaker", breaker)
+
+
+@pytest.mark.anyio
+async def test_open_circuit_answers_503_with_retry_after(plantnet_down):
+    with pytest.raises(HTTPException) as failure:
+        await identify_routes._query_plantnet([("a.jpg", b"never seen", "image/jpeg")], ["leaf"])
+    assert failure.value.status_code == 503
+    assert 1 <= int(failure.value.headers["Retry-After"]) <= 31
+
+
+@pytest.mark.anyio
+async def test_serves_stale_answer_while_plantnet_is_down(plantnet_down):
+    files = [("a.jpg", b"seen before", "image/jpeg")]
+    identification_cache._set_local(make_cache_key([b"seen before"], ["leaf"]), RESULT, ttl=-1)
+    assert await identify_routes._query_plantnet(files, ["leaf"]) == RESULT
+
+
+@pytest.mark.anyio
+async def test_timeout_without_stale_answer_is_504(monkeypatch):
+    async def timeout(files, organs):
+        raise httpx.ReadTimeout("slow")
+
+    monkeypatch.setattr(plantnet_client, "identify", timeout)
+    with pytest.raises(HTTPException) as failure:
+        await identify_routes._query_plantnet([("a.jpg", b"timed out", "image/jpeg")], ["leaf"])
+    assert failure.value.status_code == 504
@@ -0,0 +1,15 @@
+# tests/test_scan.py
+from app.core.metrics import SCAN_STAGE_DURATION
+from tests.conftest import scan
+
+
+def stage_count(stage: str) -> int:
+    series = SCAN_STAGE_DURATION._series.get((stage,))
+    return sum(series[0]) if series else 0
+
+
+def test_each_stage_is_observed_once_per_scan(client, auth_headers, flower_jpeg, fake_upstreams):
+    stages = ("convert", "identify", "lookup", "enrich", "names", "persist")
+    before = {stage: stage_count(stage) for stage in stages}
+    assert scan(client, auth_headers, flower_jpeg).status_code == 200
+    assert {stage: stage_count(stage) - before[stage] for stage in stages} == dict.fromkeys(stages, 1)
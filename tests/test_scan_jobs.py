@@ -0,0 +1,126 @@
+# tests/test_scan_jobs.py
+import asyncio
+import os
+import signal
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import selectinload
+
+from app.api.routers.image_convert_routes import ConvertedImage
+from app.api.routers.scan_routes import process_scan_job
+from app.commands import scan_worker
+from app.database.database import AsyncSessionLocal
+from app.database.models import ScanJob, ScanJobImage
+from app.services import scan_jobs
+from app.services.scan_jobs import (
+    FAILED, QUEUED, RUNNING, SCAN_JOB_MAX_ATTEMPTS, SUCCEEDED, claim_next_job, enqueue_scan_job, finish_job, purge_jobs,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def empty_queue():
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(ScanJobImage))
+        await db.execute(delete(ScanJob))
+        await db.commit()
+
+
+async def new_job() -> str:
+    async with AsyncSessionLocal() as db:
+        job = await enqueue_scan_job(db, 1, ["flower"], [ConvertedImage("a.jpg", b"jpeg", "image/jpeg")])
+        return job.id
+
+
+async def load(job_id: str) -> ScanJob:
+    async with AsyncSessionLocal() as db:
+        return await db.get(ScanJob, job_id, options=[selectinload(ScanJob.images)])
+
+
+async def set_fields(job_id: str, **values) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(ScanJob).where(ScanJob.id == job_id).values(**values))
+        await db.commit()
+
+
+async def test_a_job_is_claimed_once(empty_queue):
+    job_id = await new_job()
+    assert await claim_next_job() == job_id
+    assert await claim_next_job() is None
+    job = await load(job_id)
+    assert (job.status, job.attempts) == (RUNNING, 1)
+
+
+async def test_retry_waits_for_backoff(empty_queue):
+    job_id = await new_job()
+    await claim_next_job()
+    await finish_job(job_id, error="PlantNet timed out", retry=True)
+
+    job = await load(job_id)
+    assert job.status == QUEUED
+    assert job.not_before > datetime.utcnow()
+    assert await claim_next_job() is None
+
+    await set_fields(job_id, not_before=datetime.utcnow() - timedelta(seconds=1))
+    assert await claim_next_job() == job_id
+
+
+async def test_backoff_grows_and_is_capped(monkeypatch):
+    monkeypatch.setattr(scan_jobs, "SCAN_JOB_RETRY_DELAY", 10)
+    monkeypatch.setattr(scan_jobs, "SCAN_JOB_RETRY_MAX_DELAY", 30)
+    now = datetime(2024, 1, 1)
+    delays = [(scan_jobs.retry_at(attempts, now) - now).total_seconds() for attempts in (1, 2, 3, 4)]
+    assert delays == [10, 20, 30, 30]
+
+
+async def test_stale_job_is_requeued_with_backoff(empty_queue):
+    job_id = await new_job()
+    await claim_next_job()
+    await set_fields(job_id, updated_at=datetime.utcnow() - timedelta(hours=1))
+
+    await purge_jobs()
+    job = await load(job_id)
+    assert job.status == QUEUED
+    assert job.not_before > datetime.utcnow()
+    assert await claim_next_job() is None
+
+
+async def test_stale_job_out_of_attempts_fails(empty_queue):
+    job_id = await new_job()
+    await claim_next_job()
+    await set_fields(job_id, attempts=SCAN_JOB_MAX_ATTEMPTS, updated_at=datetime.utcnow() - timedelta(hours=1))
+
+    await purge_jobs()
+    job = await load(job_id)
+    assert job.status == FAILED
+    assert "Gave up" in job.error
+    async with AsyncSessionLocal() as db:
+        assert await db.scalar(select(func.count()).select_from(ScanJobImage).where(ScanJobImage.job_id == job_id)) == 0
+
+
+async def test_processing_a_deleted_job_reports_it_gone(empty_queue):
+    with pytest.raises(HTTPException) as gone:
+        await process_scan_job("00000000-0000-0000-0000-000000000000")
+    assert gone.value.status_code == 410
+
+
+async def test_worker_command_runs_jobs_until_sigterm(empty_queue, monkeypatch):
+    async def handler(job_id):
+        return {"job": job_id}
+
+    monkeypatch.setattr(scan_worker, "process_scan_job", handler)
+    monkeypatch.setattr(scan_worker, "shutdown_executor", lambda: None)
+    monkeypatch.setattr(scan_worker, "shutdown_tracing", lambda: None)
+    job_id = await new_job()
+
+    worker = asyncio.create_task(scan_worker.run(1))
+    async with asyncio.timeout(10):
+        while (await load(job_id)).status != SUCCEEDED:
+            await asyncio.sleep(0.05)
+    os.kill(os.getpid(), signal.SIGTERM)
+    await asyncio.wait_for(worker, 10)
+    assert (await load(job_id)).result == {"job": job_id}
@@ -0,0 +1,52 @@
+# tests/test_thumbnails.py
+import os
+
+from app.services.thumbnails import DiskLRU
+
+from tests.conftest import scan
+
+
+def write_elsewhere(cache: DiskLRU, name: str, data: bytes) -> None:
+    """A file rendered by another worker process: on disk, but not in this process's index."""
+    os.makedirs(os.path.dirname(cache.path(name)), exist_ok=True)
+    with open(cache.path(name), "wb") as f:
+        f.write(data)
+
+
+def test_adopts_files_rendered_by_other_workers(tmp_path):
+    cache = DiskLRU(root=str(tmp_path), max_bytes=10)
+    cache.read("warm")  # Index the (empty) directory before the other worker writes.
+    write_elsewhere(cache, "aa-other", b"x" * 6)
+
+    assert cache.read("aa-other") == b"x" * 6
+    assert cache.stats()["entries"] == 1 and cache.stats()["bytes"] == 6
+
+    cache.put("bb-mine", b"y" * 6)
+    assert not os.path.exists(cache.path("aa-other"))
+    assert cache.stats()["bytes"] == 6 and cache.stats()["evictions"] == 1
+
+
+def test_read_survives_eviction_after_open(tmp_path, monkeypatch):
+    cache = DiskLRU(root=str(tmp_path), max_bytes=100)
+    cache.put("aa-thumb", b"z" * 50)
+    real_open = open
+
+    def open_then_evict(path, mode="r", *args, **kwargs):
+        f = real_open(path, mode, *args, **kwargs)
+        os.unlink(path)  # Another request (or worker) evicts it before we read a byte.
+        return f
+
+    monkeypatch.setattr("builtins.open", open_then_evict)
+    assert cache.read("aa-thumb") == b"z" * 50
+    monkeypatch.setattr("builtins.open", real_open)
+    assert cache.read("aa-thumb") is None
+
+
+def test_serves_thumbnail(client, auth_headers, flower_jpeg, fake_upstreams):
+    assert scan(client, auth_headers, flower_jpeg).status_code == 200
+    key = client.get("/user_plants/me", headers=auth_headers).json()[0]["image"]
+    for _ in range(2):  # Rendered, then from the cache.
+        response = client.get(f"/images/{key}", params={"w": 128, "format": "webp"}, headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/webp"
+        assert response.content[8:12] == b"WEBP"
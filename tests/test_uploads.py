@@ -0,0 +1,26 @@
+# tests/test_uploads.py
+import pytest
+
+from app.main import app
+from app.services.uploads import UPLOAD_PATHS, UploadLimitMiddleware
+
+ORIGIN = "http://localhost:3000"
+
+
+@pytest.fixture
+def tiny_upload_limit(monkeypatch):
+    # Rebuild the middleware stack with a 16-byte cap; monkeypatch restores both afterwards.
+    monkeypatch.setattr(UploadLimitMiddleware.__init__, "__defaults__", (UPLOAD_PATHS, 16))
+    monkeypatch.setattr(app, "middleware_stack", None)
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_rejected_upload_carries_cors_headers(client, auth_headers, tiny_upload_limit, chunked):
+    body = b"--b\r\n" + b"x" * 1024
+    # Without Content-Length the cap trips while the body streams in, inside the route.
+    content = iter([body[:512], body[512:]]) if chunked else body
+    response = client.post("/convert/", content=content, headers={
+        **auth_headers, "Origin": ORIGIN, "Content-Type": "multipart/form-data; boundary=b",
+    })
+    assert response.status_code == 413
+    assert response.headers["access-control-allow-origin"] == ORIGIN